@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Benchmarks on synthetic fixture trees.
+
+    python3 bench.py [--suite themes|cache|gamma|hyprconf] [--sizes N,N,...] [--repeat 5]
+                     [--output FILE] [--compare OLD.json]
+
+Every case builds its fixtures in a temporary directory, so nothing
+outside it is read or written. Per phase the wall time (min and median of
+--repeat runs), the read- and write-family calls of the process (syscr and
+syscw from /proc/self/io, thread pools included; stat, getdents and openat
+are not counted, so scans mostly show up in the wall time) and the peak
+Python heap (a separate run under tracemalloc, so it does not distort the
+timings) are reported.
+Results are saved as JSON (bench_output.json beside this script unless
+--output says otherwise) together with the commit they were taken at;
+--compare prints the median wall time change against an earlier file.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+
+import hyprconf
+import pacman_cache
+from desktop_settings import StubBackend
+from theme_manager import ThemeManager
+
+# Fixture sizes per suite unless --sizes is given: themes, cache files,
+# connected outputs and config lines
+DEFAULT_SIZES = {
+    'themes': (10, 1000, 10000),
+    'cache': (10, 1000, 10000),
+    'gamma': (1, 2, 4),
+    'hyprconf': (100, 500, 2500),
+}
+OUTPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_output.json")
+CACHE_VERSIONS = 5
+# The theme suite alternates between two looks
+MIN_THEMES = 2
+HYPR_LINES_PER_FILE = 100
+ICON_NAMES = ("folder", "user-home", "text-x-generic")
+CONFIG_FILES = {
+    "gtk-3.0/settings.ini": "[Settings]\ngtk-theme-name = Adwaita\ngtk-font-name = Sans 10\n"
+                            "gtk-application-prefer-dark-theme = 0\n",
+    "gtk-4.0/settings.ini": "[Settings]\ngtk-theme-name = Adwaita\n",
+    "qt5ct/qt5ct.conf": "[Appearance]\nicon_theme = hicolor\n[Fonts]\nfixed = Monospace,10\n",
+    "kdeglobals": "[General]\nColorScheme = Breeze\n[Icons]\nTheme = hicolor\n",
+    "Kvantum/kvantum.kvconfig": "[General]\ntheme = KvFlat\n",
+}
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def make_theme_fixture(base, count):
+    """Create count GTK, icon and Kvantum themes plus a config home under base.
+
+    At least MIN_THEMES of each are made, and the first icon theme always
+    has cursors, so the looks bench_themes() picks exist at any size.
+    """
+    count = max(count, MIN_THEMES)
+    gtk_root = os.path.join(base, "share", "themes")
+    icon_root = os.path.join(base, "share", "icons")
+    config_dir = os.path.join(base, "config")
+    for i in range(count):
+        os.makedirs(os.path.join(gtk_root, f"Theme-{i:05d}", "gtk-3.0"))
+        icon_dir = os.path.join(icon_root, f"Icons-{i:05d}")
+        _write(os.path.join(icon_dir, "index.theme"),
+               f"[Icon Theme]\nName=Icons {i}\nInherits=hicolor\nDirectories=48x48/apps\n\n"
+               "[48x48/apps]\nSize=48\nType=Fixed\n")
+        for name in ICON_NAMES:
+            _write(os.path.join(icon_dir, "48x48", "apps", f"{name}.svg"), "<svg/>")
+        if i % 4 == 0:
+            os.makedirs(os.path.join(icon_dir, "cursors"))
+        _write(os.path.join(config_dir, "Kvantum", f"Kv-{i:05d}.kvconfig"), "[%General]\n")
+    for name, text in CONFIG_FILES.items():
+        _write(os.path.join(config_dir, name), text)
+    return {
+        'gtk_roots': [gtk_root],
+        'icon_roots': [icon_root],
+        'config_dir': config_dir,
+        'cache_dir': os.path.join(base, "cache"),
+        'profiles_file': os.path.join(base, "profiles.json"),
+    }
+
+
+def make_cache_fixture(base, count):
+    """Create count package files (CACHE_VERSIONS versions per package) plus signatures"""
+    cache_dir = os.path.join(base, "pkg")
+    os.makedirs(cache_dir)
+    for i in range(count):
+        package, version = divmod(i, CACHE_VERSIONS)
+        path = os.path.join(cache_dir, f"pkg{package:05d}-1.{version}.{i % 3}-{version % 2 + 1}"
+                                       "-x86_64.pkg.tar.zst")
+        with open(path, 'wb') as f:
+            # Sparse, so a large cache costs no disk space
+            f.truncate(4096 * (i % 7 + 1))
+        _write(path + ".sig", "sig")
+    return cache_dir
+
+
+def make_hypr_fixture(base, count):
+    """A hyprland.conf sourcing count lines of binds and sections, 100 per file"""
+    conf_dir = os.path.join(base, "hypr", "conf.d")
+    os.makedirs(conf_dir)
+    for start in range(0, count, HYPR_LINES_PER_FILE):
+        lines = []
+        for i in range(start, min(count, start + HYPR_LINES_PER_FILE)):
+            if i % 10 == 0:
+                lines.append(f"# group {i}\ndecoration {{\n    rounding = {i % 20}  # px\n}}\n")
+            else:
+                lines.append(f"bind = $mainMod, code:{i}, exec, app-{i} ## {i}\n")
+        _write(os.path.join(conf_dir, f"{start:06d}.conf"), "".join(lines))
+    main = os.path.join(base, "hypr", "hyprland.conf")
+    _write(main, "$mainMod = SUPER\nsource = ./conf.d/*.conf\n")
+    return main
+
+
+def _io_counters():
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f)}
+    except (OSError, ValueError):
+        return None
+
+
+def measure(fn, setup=None, repeat=5):
+    """Time fn() repeat times, then once more under tracemalloc"""
+    walls = []
+    calls = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        before = _io_counters()
+        start = time.perf_counter()
+        fn()
+        walls.append(time.perf_counter() - start)
+        after = _io_counters()
+        if before and after:
+            calls.append((after['syscr'] - before['syscr'], after['syscw'] - before['syscw']))
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'wall_ms_min': round(min(walls) * 1000, 3),
+        'wall_ms_median': round(statistics.median(walls) * 1000, 3),
+        'peak_heap_kib': round(peak / 1024, 1),
+    }
+    if calls:
+        reads, writes = min(calls)
+        result['read_calls'] = reads
+        result['write_calls'] = writes
+    return result
+
+
+def bench_themes(base, count, repeat):
+    """ThemeManager start (cold and warm cache), _get_current_theme, apply and profile switch"""
+    kwargs = make_theme_fixture(base, count)
+    backend = StubBackend()
+    results = {}
+
+    def clear_cache():
+        shutil.rmtree(kwargs['cache_dir'], ignore_errors=True)
+
+    results['init_cold'] = measure(lambda: ThemeManager(backend, **kwargs), clear_cache, repeat)
+    results['init_warm'] = measure(lambda: ThemeManager(backend, **kwargs), None, repeat)
+
+    manager = ThemeManager(backend, **kwargs)
+    results['get_current_theme'] = measure(manager._get_current_theme, None, repeat)
+
+    # Alternate between two complete looks so every run really writes
+    looks = [(manager.gtk_themes[i], manager.kvantum_themes[i], manager.icon_themes[i],
+              manager.cursor_themes[0]) for i in (0, 1)]
+    turn = [0]
+
+    def apply_next():
+        turn[0] += 1
+        manager.apply_theme(*looks[turn[0] % 2])
+
+    results['apply_theme'] = measure(apply_next, None, repeat)
+
+    for name, look in zip(("a", "b"), looks):
+        manager.apply_theme(*look)
+        manager.save_profile(name)
+
+    # b is current now, so the first switch already goes to a
+    turn = [1]
+
+    def switch_next():
+        turn[0] += 1
+        manager.switch_profile("ab"[turn[0] % 2])
+
+    results['switch_profile'] = measure(switch_next, None, repeat)
+    manager.icon_index.close()
+    return results
+
+
+def bench_cache(base, count, repeat):
+    """Package cache scan, prune plan and prune"""
+    cache_dir = make_cache_fixture(base, count)
+    results = {}
+    results['scan'] = measure(lambda: pacman_cache.scan([cache_dir]), None, repeat)
+
+    report = pacman_cache.scan([cache_dir])
+    results['prune_plan'] = measure(report.prune_plan, None, repeat)
+
+    plan = report.prune_plan()
+
+    def restore():
+        for f in plan:
+            with open(f.path, 'wb'), open(f.path + ".sig", 'w'):
+                pass
+
+    results['prune'] = measure(lambda: pacman_cache.prune(plan), restore, repeat)
+    return results
+
+
+def bench_gamma(base, count, repeat):
+    """Gamma ramps of count outputs: one animation frame, with and without new settings"""
+    # NumPy is optional for the rest of the tree
+    from gamma_ramp import RampEngine
+
+    outputs = [f"OUT-{i}" for i in range(count)]
+    engine = RampEngine(outputs)
+    results = {}
+    results['compute'] = measure(engine.compute, None, repeat)
+
+    frame = [0]
+
+    def animate():
+        frame[0] += 1
+        step = (frame[0] % 100) / 100
+        for output in outputs:
+            engine.set(output, 1.0 + step, 1.0, 1.0 - step / 4, (1.0, 1.0 - step / 5, 1.0 - step / 2))
+        engine.compute()
+
+    results['frame'] = measure(animate, None, repeat)
+    return results
+
+
+def bench_hyprconf(base, count, repeat):
+    """Hyprland config: cold parse, reload through the parse cache, write back"""
+    main = make_hypr_fixture(base, count)
+    results = {}
+    results['parse_cold'] = measure(lambda: hyprconf.HyprConfig(main, hyprconf.ParseCache()).load(),
+                                    None, repeat)
+    cache = hyprconf.ParseCache()
+    config = hyprconf.HyprConfig(main, cache).load()
+    results['reload_cached'] = measure(config.load, None, repeat)
+
+    def write_all():
+        for document in config.documents:
+            document.write()
+
+    results['write'] = measure(write_all, None, repeat)
+    return results
+
+
+SUITES = {
+    'themes': bench_themes,
+    'cache': bench_cache,
+    'gamma': bench_gamma,
+    'hyprconf': bench_hyprconf,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suites, sizes, repeat):
+    report = {
+        'commit': _commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'suites': {},
+    }
+    for suite in suites:
+        cases = report['suites'][suite] = {}
+        for size in sizes or DEFAULT_SIZES[suite]:
+            with tempfile.TemporaryDirectory(prefix=f"arc-bench-{suite}-") as base:
+                cases[str(size)] = SUITES[suite](base, size, repeat)
+            print_case(suite, size, cases[str(size)])
+    report['max_rss_kib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def print_case(suite, size, phases):
+    print(f"{suite} x{size}")
+    for phase, r in phases.items():
+        calls = (f"{r['read_calls']:>7} read {r['write_calls']:>6} write calls"
+                 if 'read_calls' in r else "")
+        print(f"  {phase:<18} {r['wall_ms_median']:>10.2f} ms (min {r['wall_ms_min']:.2f}) "
+              f"{r['peak_heap_kib']:>10.1f} KiB  {calls}")
+
+
+def compare(old, new):
+    print(f"median wall time, {old.get('commit')} -> {new.get('commit')}")
+    for suite, cases in new['suites'].items():
+        for size, phases in cases.items():
+            old_phases = old.get('suites', {}).get(suite, {}).get(size, {})
+            for phase, r in phases.items():
+                before = old_phases.get(phase, {}).get('wall_ms_median')
+                if not before:
+                    continue
+                change = (r['wall_ms_median'] - before) / before * 100
+                print(f"  {suite} x{size} {phase:<18} {before:>10.2f} -> "
+                      f"{r['wall_ms_median']:>10.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark arc-config on synthetic fixtures")
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help="suite to run (default: all)")
+    parser.add_argument('--sizes', help="comma separated fixture sizes for every suite "
+                                        "(default: per suite)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default=OUTPUT_FILE, help="where to save the results")
+    parser.add_argument('--compare', metavar="OLD", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size] if args.sizes else None
+    report = run(args.suite or list(SUITES), sizes, max(1, args.repeat))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
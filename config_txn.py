@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _read_bytes(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def render_ini(old_data, updates):
+    """Return the ini text produced by applying updates to old_data.
+
+    updates maps section -> {key: value}; a value of None leaves the key
+    untouched.
+    """
+    config = configparser.ConfigParser()
+    config.optionxform = str  # Maintain case sensitivity
+    if old_data:
+        config.read_string(old_data.decode('utf-8'))
+
+    for section, values in updates.items():
+        if section not in config:
+            config[section] = {}
+        for key, value in values.items():
+            if value is not None:
+                config[section][key] = value
+
+    buf = io.StringIO()
+    config.write(buf)
+    return buf.getvalue().encode('utf-8')
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigTransaction:
+    """A set of config file writes that either all land or none do.
+
+    Files are staged with their target contents first; commit() skips the
+    ones that would not change, writes the rest in parallel through a temp
+    file plus rename, and restores the previous contents of every written
+    file if any single write fails.
+    """
+
+    def __init__(self):
+        # real path -> (old bytes or None, new bytes)
+        self.files = {}
+
+    def _old_data(self, path):
+        if path in self.files:
+            return self.files[path][1]
+        return _read_bytes(path)
+
+    def read(self, path):
+        """Return the contents path will have after commit(), None if missing"""
+        path = os.path.realpath(path)
+        if path not in self.files:
+            old = _read_bytes(path)
+            self.files[path] = (old, old)
+        return self.files[path][1]
+
+    def stage(self, path, data):
+        """Stage the complete new contents of path"""
+        path = os.path.realpath(path)
+        old = self.files[path][0] if path in self.files else _read_bytes(path)
+        self.files[path] = (old, data)
+
+    def update_ini(self, path, updates, create=True):
+        """Stage updates to an ini file, optionally only if it already exists"""
+        real_path = os.path.realpath(path)
+        old = self._old_data(real_path)
+        if old is None and not create:
+            return
+        self.stage(real_path, render_ini(old, updates))
+
+    def changes(self):
+        """Return the staged paths whose contents actually differ"""
+        return [path for path, (old, new) in self.files.items() if old != new]
+
+    def commit(self, max_workers=4):
+        """Write every changed file, rolling all of them back on failure"""
+        pending = self.changes()
+        if not pending:
+            return []
+
+        written = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            futures = {pool.submit(_atomic_write, path, self.files[path][1]): path
+                       for path in pending}
+            for future, path in futures.items():
+                try:
+                    future.result()
+                    written.append(path)
+                except OSError as e:
+                    errors.append(e)
+
+        if errors:
+            self._rollback(written)
+            raise errors[0]
+        return written
+
+    def _rollback(self, paths):
+        for path in paths:
+            old = self.files[path][0]
+            try:
+                if old is None:
+                    os.unlink(path)
+                else:
+                    _atomic_write(path, old)
+            except OSError:
+                pass
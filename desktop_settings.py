@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import os
+import abc
+import shutil
+import subprocess
+import time
+
+from config_txn import ConfigTransaction
+
+INTERFACE_SCHEMA = "org.gnome.desktop.interface"
+INTERFACE_PATH = "/org/gnome/desktop/interface/"
+COMMAND_TIMEOUT = 5
+
+
+def run_commands(commands, timeout=COMMAND_TIMEOUT):
+    """Run reload commands concurrently, killing any that outlive timeout.
+
+    Returns a list of (command, error) for the ones that failed.
+    """
+    procs = []
+    failures = []
+    for command in commands:
+        try:
+            procs.append((command, subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                                    stdout=subprocess.DEVNULL,
+                                                    stderr=subprocess.DEVNULL)))
+        except OSError as e:
+            failures.append((command, str(e)))
+
+    # The processes run in parallel, so they share one deadline
+    deadline = time.monotonic() + timeout
+    for command, proc in procs:
+        try:
+            proc.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            failures.append((command, f"timed out after {timeout}s"))
+    return failures
+
+
+def _gvariant_string(value):
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+class SettingsBackend(abc.ABC):
+    """Writes desktop interface keys in one batch and reloads clients"""
+
+    name = "base"
+    # (what, problem) found while picking this backend, reported by apply()
+    notices = ()
+
+    @abc.abstractmethod
+    def set_interface(self, values):
+        """Write {key: value} of org.gnome.desktop.interface at once"""
+
+    def apply(self, values, reload_commands=(), timeout=COMMAND_TIMEOUT):
+        values = {k: v for k, v in values.items() if v}
+        failures = list(self.notices)
+        if values:
+            try:
+                self.set_interface(values)
+            except Exception as e:
+                failures.append((self.name, str(e)))
+        failures += self.run_commands(reload_commands, timeout)
+        return failures
+
+    def run_commands(self, commands, timeout):
+        return run_commands(commands, timeout)
+
+
+class GioBackend(SettingsBackend):
+    """Sets every key on one delayed Gio.Settings object, applied at once"""
+
+    name = "gio"
+
+    def __init__(self):
+        from gi.repository import Gio
+        self.Gio = Gio
+        self.settings = Gio.Settings.new(INTERFACE_SCHEMA)
+
+    @staticmethod
+    def available():
+        if not os.environ.get("DBUS_SESSION_BUS_ADDRESS"):
+            return False
+        try:
+            from gi.repository import Gio
+        except ImportError:
+            return False
+        source = Gio.SettingsSchemaSource.get_default()
+        return source is not None and source.lookup(INTERFACE_SCHEMA, True) is not None
+
+    def set_interface(self, values):
+        self.settings.delay()
+        for key, value in values.items():
+            self.settings.set_string(key, value)
+        self.settings.apply()
+        self.Gio.Settings.sync()
+
+
+class DconfBackend(SettingsBackend):
+    """Loads every key with a single `dconf load` keyfile write"""
+
+    name = "dconf"
+
+    @staticmethod
+    def available():
+        return bool(os.environ.get("DBUS_SESSION_BUS_ADDRESS")) and shutil.which("dconf") is not None
+
+    def set_interface(self, values):
+        keyfile = "[/]\n" + "".join(f"{k}={_gvariant_string(v)}\n" for k, v in values.items())
+        subprocess.run(["dconf", "load", INTERFACE_PATH], input=keyfile, text=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                       timeout=COMMAND_TIMEOUT, check=True)
+
+
+class KeyfileBackend(SettingsBackend):
+    """Writes the GSettings keyfile backend file, for sessions without D-Bus.
+
+    GSettings only reads this file when the session runs with
+    GSETTINGS_BACKEND=keyfile (set it in the compositor's environment, e.g.
+    'env = GSETTINGS_BACKEND,keyfile' in hyprland.conf); otherwise the GTK
+    settings.ini files written by ThemeManager are what takes effect.
+    """
+
+    name = "keyfile"
+
+    def __init__(self, path=None):
+        config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+        self.path = path or os.path.join(config_home, "glib-2.0", "settings", "keyfile")
+
+    def set_interface(self, values):
+        group = INTERFACE_PATH.strip("/")
+        txn = ConfigTransaction()
+        txn.update_ini(self.path, {group: {k: _gvariant_string(v) for k, v in values.items()}})
+        txn.commit()
+
+
+class StubBackend(SettingsBackend):
+    """Records writes and commands instead of touching the session"""
+
+    name = "stub"
+
+    def __init__(self):
+        self.writes = []
+        self.commands = []
+
+    def set_interface(self, values):
+        self.writes.append(dict(values))
+
+    def run_commands(self, commands, timeout):
+        self.commands.extend(list(c) for c in commands)
+        return []
+
+
+BACKENDS = {
+    "gio": GioBackend,
+    "dconf": DconfBackend,
+    "keyfile": KeyfileBackend,
+    "stub": StubBackend,
+}
+
+
+def get_backend(name=None):
+    """Pick a backend by name, $ARC_CONFIG_SETTINGS_BACKEND, or availability.
+
+    Without a D-Bus session neither dconf writer can work, so the keys go to
+    the GSettings keyfile instead of hanging on the bus; see KeyfileBackend
+    for when that file is read. An unknown name falls back to detection, and
+    apply() reports it with its failures; nothing is printed, since the
+    caller may be drawing a curses screen.
+    """
+    name = name or os.environ.get("ARC_CONFIG_SETTINGS_BACKEND")
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    backend = _detect_backend()
+    if name:
+        backend.notices = [("settings backend", f"unknown backend '{name}' (choose from "
+                                                f"{', '.join(BACKENDS)}); used {backend.name}")]
+    return backend
+
+
+def _detect_backend():
+    for backend in (GioBackend, DconfBackend):
+        if backend.available():
+            try:
+                return backend()
+            except Exception:
+                continue
+    return KeyfileBackend()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+SEPARATORS = frozenset(" -_./")
+
+PREFIX = 3000
+SUBSTRING = 2000
+SUBSEQUENCE = 1000
+
+
+def _substring_score(text, pos):
+    if pos == 0:
+        return PREFIX - len(text)
+    bonus = 100 if text[pos - 1] in SEPARATORS else 0
+    return SUBSTRING + bonus - pos - len(text)
+
+
+def _step(text, ch, last, walk):
+    """Extend a greedy subsequence match by ch; returns (last, walk) or None"""
+    found = text.find(ch, last + 1)
+    if found < 0:
+        return None
+    if found == last + 1:
+        walk += 10
+    elif text[found - 1] in SEPARATORS:
+        walk += 5
+    else:
+        walk -= min(found - last - 1, 10)
+    return found, walk
+
+
+def score(text, query):
+    """Score how well the lowercase query matches the lowercase text.
+
+    Prefix matches beat substring matches, which beat subsequence matches;
+    within a class shorter names and tighter matches rank higher. Returns
+    None if query is not a subsequence of text.
+    """
+    last, walk = -1, 0
+    for ch in query:
+        state = _step(text, ch, last, walk)
+        if state is None:
+            return None
+        last, walk = state
+    pos = text.find(query)
+    if pos >= 0:
+        return _substring_score(text, pos)
+    return SUBSEQUENCE + walk - len(text)
+
+
+class FuzzyIndex:
+    """The one-character search levels over a fixed list of names, built once.
+
+    first_levels maps every character to the level FuzzySearch.push()
+    would compute for it, so the first keystroke, the only one that has
+    to look at every name, is a dictionary lookup.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.lower = [item.lower() for item in self.items]
+        count = len(self.lower)
+        keys = {}
+        states = {}
+        for i, text in enumerate(self.lower):
+            for ch in set(text):
+                state = _step(text, ch, -1, 0)
+                # Rank and index in one int, which sorts much faster than tuples
+                keys.setdefault(ch, []).append(-_substring_score(text, state[0]) * count + i)
+                states.setdefault(ch, {})[i] = state
+        self.first_levels = {}
+        for ch, level in keys.items():
+            level.sort()
+            self.first_levels[ch] = ([key % count for key in level], states[ch])
+
+
+class FuzzySearch:
+    """Type-to-filter session over a FuzzyIndex.
+
+    Each level of the stack keeps, per matching name, the end of its greedy
+    subsequence match. Typing a character extends those matches with one
+    find() per surviving name instead of rescoring the whole list, and
+    backspace pops back to the cached level of the shorter query.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.query = ""
+        # (ranked indices, {index: (last, walk)})
+        self.stack = [(list(range(len(index.items))), None)]
+
+    @property
+    def results(self):
+        return self.stack[-1][0]
+
+    def items(self):
+        return [self.index.items[i] for i in self.results]
+
+    def push(self, ch):
+        """Append ch to the query and refine the current results"""
+        self.query += ch
+        query = self.query.lower()
+        ch = query[-1]
+        lower = self.index.lower
+        prev_states = self.stack[-1][1]
+        if prev_states is None:
+            self.stack.append(self.index.first_levels.get(query, ([], {})))
+            return
+
+        states = {}
+        scored = []
+        for i, (last, walk) in prev_states.items():
+            text = lower[i]
+            state = _step(text, ch, last, walk)
+            if state is None:
+                continue
+            states[i] = state
+            pos = text.find(query)
+            if pos >= 0:
+                scored.append((-_substring_score(text, pos), i))
+            else:
+                scored.append((len(text) - SUBSEQUENCE - state[1], i))
+        scored.sort()
+        self.stack.append(([i for _, i in scored], states))
+
+    def pop(self):
+        """Remove the last query character, restoring the previous results"""
+        if self.query:
+            self.query = self.query[:-1]
+            self.stack.pop()
+
+    def clear(self):
+        self.query = ""
+        del self.stack[1:]
@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
 
 import gi
-import subprocess
+import time
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib
 
+from gamma_backend import get_backend, list_outputs, IDENTITY
+try:
+    from gamma_ramp import RampEngine
+except ImportError:  # NumPy is optional; without it there is no curve preview
+    RampEngine = None
+from gamma_schedule import (Schedule, NightProfile, NEUTRAL_TEMPERATURE, load_schedule,
+                            save_schedule, blend, blend_temperature, temperature_rgb)
+
+SETTINGS_FILE = "wl-gamma-settings.conf"
+SCHEDULE_FILE = "wl-gamma-schedule.json"
+CURVE_COLORS = ((0.9, 0.2, 0.2), (0.2, 0.8, 0.2), (0.3, 0.4, 1.0))
+
 class GammaControlApp(Gtk.Window):
     def __init__(self):
         Gtk.Window.__init__(self, title="wl-gammactl Controller")
@@ -15,11 +27,52 @@ class GammaControlApp(Gtk.Window):
         self.gamma_value = 1.0
         self.contrast_value = 1.0
         self.brightness_value = 1.0
+        # (gamma, contrast, brightness) per output; None is every other output
+        self.outputs = list_outputs()
+        self.current_output = None
+        self.output_settings = {None: IDENTITY}
+        # Nilai yang terakhir disimpan, dipulihkan saat keluar dari preview
+        self.saved_settings = dict(self.output_settings)
+        self.applied_settings = None
+        self.updating = False
+        
+        # One long-lived backend; live changes are applied once per frame.
+        # It reports back from its own thread, so that goes via the main loop
+        self.backend = get_backend()
+        self.backend.on_applied = lambda error: GLib.idle_add(self.on_backend_applied, error)
+        self.tick_id = None
+        self.changed_at = None
+        self.preview_since = None
+        self.engine = RampEngine([None] + self.outputs) if RampEngine else None
+        
+        # Night light: 0 is day, 1 night; one GLib timeout drives it
+        self.schedule_path = GLib.get_user_config_dir() + "/" + SCHEDULE_FILE
+        self.schedule_enabled, self.schedule = load_schedule(self.schedule_path)
+        self.night_factor = 0.0
+        self.schedule_id = None
         
         # Main container
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
         self.add(vbox)
         
+        # Output selection
+        self.output_combo = Gtk.ComboBoxText()
+        self.output_combo.append("", "All outputs")
+        for output in self.outputs:
+            self.output_combo.append(output, output)
+        self.output_combo.set_active_id("")
+        self.output_combo.connect("changed", self.on_output_changed)
+        vbox.pack_start(self.output_combo, False, False, 0)
+        
+        # Curve preview
+        if self.engine is not None:
+            self.curve = Gtk.DrawingArea()
+            self.curve.set_size_request(-1, 120)
+            self.curve.connect("draw", self.on_curve_draw)
+            vbox.pack_start(self.curve, False, False, 0)
+        else:
+            self.curve = None
+        
         # Gamma control
         gamma_label = Gtk.Label(label="Gamma (0.1 - 2.0)")
         vbox.pack_start(gamma_label, False, False, 0)
@@ -53,57 +106,296 @@ class GammaControlApp(Gtk.Window):
         self.brightness_scale.connect("value-changed", self.on_brightness_changed)
         vbox.pack_start(self.brightness_scale, False, False, 0)
         
+        # Live preview
+        self.live_check = Gtk.CheckButton(label="Live preview while dragging")
+        self.live_check.connect("toggled", self.on_live_toggled)
+        vbox.pack_start(self.live_check, False, False, 0)
+        
+        # Night light schedule
+        night = self.schedule.night
+        schedule_frame = Gtk.Frame(label="Night light")
+        grid = Gtk.Grid(column_spacing=6, row_spacing=4, border_width=6)
+        schedule_frame.add(grid)
+        self.schedule_check = Gtk.CheckButton(label="Fade to the night profile on a schedule")
+        self.schedule_check.set_active(self.schedule_enabled)
+        grid.attach(self.schedule_check, 0, 0, 4, 1)
+        self.sunset_entry = Gtk.Entry(text=self.schedule.to_json()['sunset'], width_chars=5)
+        self.sunrise_entry = Gtk.Entry(text=self.schedule.to_json()['sunrise'], width_chars=5)
+        self.duration_spin = Gtk.SpinButton.new_with_range(1, 180, 5)
+        self.duration_spin.set_value(max(1, self.schedule.duration // 60))
+        self.temperature_spin = Gtk.SpinButton.new_with_range(1000, NEUTRAL_TEMPERATURE, 100)
+        self.temperature_spin.set_value(night.temperature)
+        self.night_brightness_spin = Gtk.SpinButton.new_with_range(0.1, 2.0, 0.05)
+        self.night_brightness_spin.set_digits(2)
+        self.night_brightness_spin.set_value(night.brightness)
+        for i, (label, widget) in enumerate((("Sunset", self.sunset_entry),
+                                             ("Sunrise", self.sunrise_entry),
+                                             ("Fade (min)", self.duration_spin),
+                                             ("Temperature (K)", self.temperature_spin),
+                                             ("Brightness", self.night_brightness_spin))):
+            grid.attach(Gtk.Label(label=label, xalign=0), (i % 2) * 2, 1 + i // 2, 1, 1)
+            grid.attach(widget, (i % 2) * 2 + 1, 1 + i // 2, 1, 1)
+        self.schedule_label = Gtk.Label(label="", xalign=0)
+        grid.attach(self.schedule_label, 0, 4, 4, 1)
+        self.schedule_check.connect("toggled", self.on_schedule_changed)
+        for entry in (self.sunset_entry, self.sunrise_entry):
+            entry.connect("activate", self.on_schedule_changed)
+            entry.connect("focus-out-event", lambda widget, event: self.on_schedule_changed(widget))
+        for spin in (self.duration_spin, self.temperature_spin, self.night_brightness_spin):
+            spin.connect("value-changed", self.on_schedule_changed)
+        vbox.pack_start(schedule_frame, False, False, 0)
+        
         # Apply button
         apply_btn = Gtk.Button(label="Apply Settings")
         apply_btn.connect("clicked", self.on_apply_clicked)
         vbox.pack_start(apply_btn, False, False, 10)
         
         # Status label
-        self.status_label = Gtk.Label(label="Ready")
+        self.status_label = Gtk.Label(label="\n".join(self.backend.notices) or "Ready")
         vbox.pack_start(self.status_label, False, False, 0)
         
         # Load saved values if any
         self.load_settings()
+        self.connect("destroy", self.on_destroy)
+        self.update_schedule()
         
     def on_gamma_changed(self, scale):
         self.gamma_value = scale.get_value()
+        self.store_values()
         
     def on_contrast_changed(self, scale):
         self.contrast_value = scale.get_value()
+        self.store_values()
         
     def on_brightness_changed(self, scale):
         self.brightness_value = scale.get_value()
+        self.store_values()
+    
+    def effective_settings(self, output):
+        return self.output_settings.get(output, self.output_settings[None])
+    
+    def store_values(self):
+        """Keep the slider values as the settings of the selected output"""
+        if self.updating:
+            return
+        self.output_settings[self.current_output] = (
+            self.gamma_value, self.contrast_value, self.brightness_value)
+        if self.curve is not None:
+            self.curve.queue_draw()
+        self.schedule_preview()
+    
+    def show_values(self, values):
+        """Move the sliders to values without storing them again"""
+        self.gamma_value, self.contrast_value, self.brightness_value = values
+        self.updating = True
+        try:
+            self.gamma_scale.set_value(self.gamma_value)
+            self.contrast_scale.set_value(self.contrast_value)
+            self.brightness_scale.set_value(self.brightness_value)
+        finally:
+            self.updating = False
+        if self.curve is not None:
+            self.curve.queue_draw()
+    
+    def on_output_changed(self, combo):
+        self.current_output = combo.get_active_id() or None
+        self.show_values(self.effective_settings(self.current_output))
+    
+    def compute_ramps(self, settings, whitepoint=(1.0, 1.0, 1.0)):
+        for output in self.engine.outputs:
+            self.engine.set(output, *settings.get(output, settings[None]), whitepoint)
+        return self.engine.compute()
+    
+    def scheduled_settings(self, settings):
+        """settings moved towards the night profile, with the white point to use"""
+        if not self.night_factor:
+            return settings, (1.0, 1.0, 1.0)
+        night = self.schedule.night
+        temperature = blend_temperature(NEUTRAL_TEMPERATURE, night.temperature, self.night_factor)
+        return ({output: blend(values, night, self.night_factor) for output, values in settings.items()},
+                temperature_rgb(temperature))
+    
+    def on_curve_draw(self, area, cr):
+        width = area.get_allocated_width()
+        height = area.get_allocated_height()
+        cr.set_source_rgb(0.1, 0.1, 0.1)
+        cr.paint()
+        # Identity for reference
+        cr.set_source_rgb(0.4, 0.4, 0.4)
+        cr.set_line_width(1)
+        cr.move_to(0, height)
+        cr.line_to(width, 0)
+        cr.stroke()
+        
+        self.compute_ramps(*self.scheduled_settings(self.output_settings))
+        ramp = self.engine.ramp(self.current_output)
+        size = ramp.shape[1]
+        step = max(1, size // max(1, width))
+        for channel, color in enumerate(CURVE_COLORS):
+            cr.set_source_rgb(*color)
+            for i in range(0, size, step):
+                x = i * (width - 1) / (size - 1)
+                y = (height - 1) * (1 - ramp[channel, i] / 65535)
+                if i == 0:
+                    cr.move_to(x, y)
+                else:
+                    cr.line_to(x, y)
+            cr.stroke()
+        return False
+    
+    def on_live_toggled(self, button):
+        self.schedule_preview()
+    
+    def schedule_preview(self):
+        """Apply the current values on the next frame, once per burst of changes"""
+        if not self.live_check.get_active():
+            return
+        if self.changed_at is None:
+            self.changed_at = time.monotonic()
+        if self.tick_id is None:
+            self.tick_id = self.add_tick_callback(self.on_preview_tick)
+    
+    def on_preview_tick(self, widget, frame_clock):
+        self.tick_id = None
+        # Measured until the backend reports the values applied
+        if self.preview_since is None:
+            self.preview_since = self.changed_at
+        self.changed_at = None
+        self.apply_values()
+        return GLib.SOURCE_REMOVE
+    
+    def on_backend_applied(self, error):
+        if error is not None:
+            self.status_label.set_text(f"Error: {str(error)}")
+        elif self.preview_since is not None:
+            latency = (time.monotonic() - self.preview_since) * 1000
+            self.status_label.set_text(f"Preview ({latency:.0f} ms)")
+        self.preview_since = None
+        return GLib.SOURCE_REMOVE
+    
+    def apply_settings(self, settings):
+        shown, whitepoint = self.scheduled_settings(settings)
+        ramps = None
+        if self.engine is not None:
+            ramps = self.compute_ramps(shown, whitepoint)
+        try:
+            self.backend.apply_outputs(shown, ramps)
+        except OSError as e:
+            self.status_label.set_text(f"Error: {str(e)}")
+            return False
+        self.applied_settings = dict(settings)
+        return True
+    
+    def apply_values(self):
+        return self.apply_settings(self.output_settings)
         
     def on_apply_clicked(self, button):
         self.save_settings()
+        if self.apply_values():
+            self.saved_settings = dict(self.applied_settings)
+            if len(self.output_settings) > 1 and not self.backend.per_output:
+                self.status_label.set_text(f"Applied; {self.backend.name} sets every output "
+                                           "to the 'All outputs' values")
+            else:
+                self.status_label.set_text("Settings applied successfully")
+    
+    def on_schedule_changed(self, widget):
         try:
-            cmd = f"wl-gammactl -g {self.gamma_value:.2f} -c {self.contrast_value:.2f} -b {self.brightness_value:.2f}"
-            subprocess.run(cmd, shell=True, check=True)
-            self.status_label.set_text("Settings applied successfully")
-        except subprocess.CalledProcessError as e:
-            self.status_label.set_text(f"Error: {str(e)}")
+            schedule = Schedule(self.sunset_entry.get_text(), self.sunrise_entry.get_text(),
+                                int(self.duration_spin.get_value()) * 60,
+                                NightProfile(self.schedule.night.gamma, self.schedule.night.contrast,
+                                             self.night_brightness_spin.get_value(),
+                                             self.temperature_spin.get_value()))
+        except ValueError as e:
+            self.schedule_label.set_text(f"Error: {str(e)}")
+            return False
+        # Only a new night profile changes what the current factor shows;
+        # new times or the checkbox change the factor itself, if anything
+        profile_changed = schedule.night != self.schedule.night
+        self.schedule = schedule
+        self.schedule_enabled = self.schedule_check.get_active()
+        try:
+            save_schedule(self.schedule_path, self.schedule_enabled, self.schedule)
+        except OSError as e:
+            print(f"Error saving schedule: {e}")
+        self.update_schedule(force=profile_changed)
+        return False
+    
+    def update_schedule(self, force=False):
+        """Apply the schedule's current position and sleep until it changes.
+        
+        Values are only applied when the night factor changed, or with
+        force when the night profile did while it is partly shown, and
+        they are blended from the saved settings: unsaved slider values
+        only reach the outputs through the live preview. While a
+        fade runs this wakes once per step; otherwise the single timeout
+        sleeps until the next fade starts, so an idle night light costs
+        nothing.
+        """
+        if self.schedule_id is not None:
+            GLib.source_remove(self.schedule_id)
+            self.schedule_id = None
+        factor, delay = self.schedule.at() if self.schedule_enabled else (0.0, None)
+        if factor != self.night_factor or (force and factor):
+            self.night_factor = factor
+            self.apply_settings(self.saved_settings)
+            if self.curve is not None:
+                self.curve.queue_draw()
+        if not self.schedule_enabled:
+            self.schedule_label.set_text("")
+            return
+        self.schedule_label.set_text(f"Night {factor * 100:.0f}%")
+        if delay >= 1:
+            # Second timeouts are batched with other wakeups of the system
+            self.schedule_id = GLib.timeout_add_seconds(int(delay), self.on_schedule_tick)
+        else:
+            self.schedule_id = GLib.timeout_add(max(1, int(delay * 1000)), self.on_schedule_tick)
+    
+    def on_schedule_tick(self):
+        self.schedule_id = None
+        self.update_schedule()
+        return GLib.SOURCE_REMOVE
+    
+    def on_destroy(self, window):
+        if self.tick_id is not None:
+            self.remove_tick_callback(self.tick_id)
+            self.tick_id = None
+        if self.schedule_id is not None:
+            GLib.source_remove(self.schedule_id)
+            self.schedule_id = None
+        # The window is going away; nothing is left to report to
+        self.backend.on_applied = None
+        # Undo a preview that was never applied
+        if self.applied_settings is not None and self.applied_settings != self.saved_settings:
+            self.output_settings = dict(self.saved_settings)
+            self.apply_settings(self.saved_settings)
+        self.backend.close()
     
     def save_settings(self):
+        # The first three lines are the values of every output, as before;
+        # one "<output> <gamma> <contrast> <brightness>" line per override follows
         try:
-            with open(GLib.get_user_config_dir() + "/wl-gamma-settings.conf", "w") as f:
-                f.write(f"{self.gamma_value:.2f}\n")
-                f.write(f"{self.contrast_value:.2f}\n")
-                f.write(f"{self.brightness_value:.2f}\n")
+            with open(GLib.get_user_config_dir() + "/" + SETTINGS_FILE, "w") as f:
+                for value in self.output_settings[None]:
+                    f.write(f"{value:.2f}\n")
+                for output, values in self.output_settings.items():
+                    if output is not None:
+                        f.write(f"{output} " + " ".join(f"{value:.2f}" for value in values) + "\n")
         except Exception as e:
             print(f"Error saving settings: {e}")
     
     def load_settings(self):
         try:
-            with open(GLib.get_user_config_dir() + "/wl-gamma-settings.conf", "r") as f:
+            with open(GLib.get_user_config_dir() + "/" + SETTINGS_FILE, "r") as f:
                 lines = f.readlines()
                 if len(lines) >= 3:
-                    self.gamma_value = float(lines[0].strip())
-                    self.contrast_value = float(lines[1].strip())
-                    self.brightness_value = float(lines[2].strip())
-                    
-                    self.gamma_scale.set_value(self.gamma_value)
-                    self.contrast_scale.set_value(self.contrast_value)
-                    self.brightness_scale.set_value(self.brightness_value)
+                    self.output_settings = {None: tuple(float(line.strip()) for line in lines[:3])}
+                    for line in lines[3:]:
+                        fields = line.split()
+                        if len(fields) == 4:
+                            self.output_settings[fields[0]] = tuple(float(v) for v in fields[1:])
+                    self.saved_settings = dict(self.output_settings)
+                    self.show_values(self.effective_settings(self.current_output))
         except FileNotFoundError:
             pass  # First run, use defaults
         except Exception as e:
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import os
+import abc
+import json
+import time
+import shutil
+import threading
+import subprocess
+
+STOP_TIMEOUT = 1
+COMMAND_TIMEOUT = 2
+# gamma, contrast, brightness
+IDENTITY = (1.0, 1.0, 1.0)
+
+
+def list_outputs():
+    """Names of the connected outputs, from Hyprland; empty if unknown"""
+    if shutil.which("hyprctl") is None:
+        return []
+    try:
+        result = subprocess.run(["hyprctl", "monitors", "-j"], capture_output=True, text=True,
+                                timeout=COMMAND_TIMEOUT, check=True)
+        return [monitor["name"] for monitor in json.loads(result.stdout)]
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError, TypeError):
+        return []
+
+
+class GammaBackend(abc.ABC):
+    """Applies gamma, contrast and brightness to the outputs.
+
+    apply() may return before the values are on screen; the backend then
+    calls on_applied(error) once they are (error None) or failed, from
+    whatever thread did the work.
+    """
+
+    name = "base"
+    # Whether apply_outputs() sets each output's own ramp
+    per_output = False
+    # Problems found while picking this backend, for the UI to show
+    notices = ()
+
+    def __init__(self):
+        self.on_applied = None
+
+    @abc.abstractmethod
+    def apply(self, gamma, contrast, brightness):
+        """Set the values of every output"""
+
+    def apply_outputs(self, settings, ramps=None):
+        """Apply {output: (gamma, contrast, brightness)}, None being every output.
+
+        ramps are the matching lookup tables from a RampEngine, if any.
+        A backend that can only set all outputs at once uses the None
+        entry.
+        """
+        self.apply(*settings.get(None, IDENTITY))
+
+    def applied(self, error=None):
+        if self.on_applied is not None:
+            self.on_applied(error)
+
+    def close(self):
+        pass
+
+
+class WlGammactlBackend(GammaBackend):
+    """Keeps one wl-gammactl process holding the gamma control.
+
+    The compositor restores the original ramp when the client that set it
+    disconnects, so wl-gammactl stays running for as long as its values
+    should. It has no control channel, and only one client may hold the
+    gamma control of an output, so new values still replace the process;
+    that restart (terminate, wait, spawn) runs on a worker thread, never
+    on the caller's. apply() only hands the newest values over: values
+    that arrive during a restart replace each other, and values equal to
+    the running ones start nothing. close() waits for the last values to
+    be started and leaves that process running, so they outlive the
+    controller.
+    """
+
+    name = "wl-gammactl"
+
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self.values = None
+        self.wanted = None
+        self.closed = False
+        self.lock = threading.Condition()
+        self.thread = None
+
+    @staticmethod
+    def available():
+        return bool(os.environ.get("WAYLAND_DISPLAY")) and shutil.which("wl-gammactl") is not None
+
+    def _stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def _start(self, values):
+        if values == self.values and self.process is not None and self.process.poll() is None:
+            return
+        self._stop()
+        self.values = None
+        self.process = subprocess.Popen(
+            ["wl-gammactl", "-g", values[0], "-c", values[1], "-b", values[2]],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True)
+        self.values = values
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.wanted is None and not self.closed:
+                    self.lock.wait()
+                if self.wanted is None:
+                    return
+                values, self.wanted = self.wanted, None
+            try:
+                self._start(values)
+            except OSError as e:
+                self.applied(e)
+            else:
+                self.applied()
+
+    def apply(self, gamma, contrast, brightness):
+        with self.lock:
+            self.wanted = (f"{gamma:.2f}", f"{contrast:.2f}", f"{brightness:.2f}")
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="wl-gammactl", daemon=True)
+                self.thread.start()
+            self.lock.notify()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.lock.notify()
+        if self.thread is not None:
+            self.thread.join()
+        self.process = None
+
+
+class StubBackend(GammaBackend):
+    """Records applied values with their time instead of touching the outputs"""
+
+    name = "stub"
+    per_output = True
+
+    def __init__(self):
+        super().__init__()
+        self.applied_values = []
+        self.ramps = None
+
+    def apply(self, gamma, contrast, brightness):
+        self.applied_values.append((time.monotonic(), gamma, contrast, brightness))
+        self.applied()
+
+    def apply_outputs(self, settings, ramps=None):
+        self.applied_values.append((time.monotonic(), dict(settings)))
+        if ramps is not None:
+            self.ramps = ramps.copy()
+        self.applied()
+
+
+BACKENDS = {
+    "wl-gammactl": WlGammactlBackend,
+    "stub": StubBackend,
+}
+
+
+def get_backend(name=None):
+    """Pick a backend by name, $ARC_CONFIG_GAMMA_BACKEND, or availability.
+
+    Outside a Wayland session there is nothing to apply gamma to, so the
+    stub is used and the controller still works as a preview. An unknown
+    name falls back to detection and is reported in the backend's notices.
+    """
+    name = name or os.environ.get("ARC_CONFIG_GAMMA_BACKEND")
+    if name in BACKENDS:
+        return BACKENDS[name]()
+    backend = WlGammactlBackend() if WlGammactlBackend.available() else StubBackend()
+    if name:
+        backend.notices = [f"Unknown gamma backend '{name}' (choose from "
+                           f"{', '.join(BACKENDS)}); using {backend.name}"]
+    return backend
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+RAMP_SIZE = 256
+# gamma, contrast, brightness
+IDENTITY = (1.0, 1.0, 1.0)
+CHANNELS = 3
+
+
+class RampEngine:
+    """Gamma lookup tables of every output, computed in one batched call.
+
+    The curve is wl-gammactl's: contrast * x ** (1 / gamma) + brightness - 1,
+    clamped to [0, 1] and scaled by a per-channel white point. Parameters
+    are kept per output and channel in one (outputs, 3, 3) array, so all
+    channels of all outputs are a single broadcast over the input ramp.
+    The input ramp, the float intermediate and the uint16 result are
+    allocated once and reused by every compute().
+    """
+
+    def __init__(self, outputs, size=RAMP_SIZE):
+        self.outputs = list(outputs)
+        self.index = {output: i for i, output in enumerate(self.outputs)}
+        self.size = size
+        count = len(self.outputs)
+        self.x = np.linspace(0.0, 1.0, size)
+        self.params = np.empty((count, CHANNELS, 3))
+        self.params[:] = IDENTITY
+        self.whitepoint = np.ones((count, CHANNELS))
+        self._work = np.empty((count, CHANNELS, size))
+        self.ramps = np.empty((count, CHANNELS, size), dtype=np.uint16)
+
+    def set(self, output, gamma, contrast, brightness, whitepoint=None):
+        """Set the curve of one output, the same for its three channels"""
+        i = self.index[output]
+        self.params[i] = (gamma, contrast, brightness)
+        if whitepoint is not None:
+            self.whitepoint[i] = whitepoint
+
+    def compute(self):
+        """Fill and return ramps, indexed [output, channel, entry]"""
+        params = self.params
+        work = self._work
+        np.power(self.x, 1.0 / params[:, :, 0, None], out=work)
+        work *= params[:, :, 1, None]
+        work += params[:, :, 2, None] - 1.0
+        np.clip(work, 0.0, 1.0, out=work)
+        work *= self.whitepoint[:, :, None] * 65535.0
+        # Truncated like wl-gammactl's (uint16_t) cast
+        np.copyto(self.ramps, work, casting='unsafe')
+        return self.ramps
+
+    def ramp(self, output):
+        """The (3, size) ramp of one output from the last compute()"""
+        return self.ramps[self.index[output]]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import math
+import time
+import json
+from collections import namedtuple
+
+DAY = 86400
+NEUTRAL_TEMPERATURE = 6500
+# Steps per transition, so a 30 minute fade updates the ramps every ~7s
+TRANSITION_STEPS = 256
+MIN_STEP = 1 / 60
+# Longest sleep while idle. GLib timeouts run on the monotonic clock, which
+# stops during suspend, so a laptop that wakes up past sunset catches up
+# within this long.
+MAX_IDLE = 600
+
+NightProfile = namedtuple('NightProfile', 'gamma contrast brightness temperature')
+DEFAULT_NIGHT = NightProfile(1.0, 1.0, 0.9, 3500)
+
+
+def _temperature_rgb(kelvin):
+    # Tanner Helland's fit of the black body colour
+    t = kelvin / 100
+    if t <= 66:
+        red = 255.0
+        green = 99.4708025861 * math.log(t) - 161.1195681661
+    else:
+        red = 329.698727446 * (t - 60) ** -0.1332047592
+        green = 288.1221695283 * (t - 60) ** -0.0755148492
+    if t >= 66:
+        blue = 255.0
+    elif t <= 19:
+        blue = 0.0
+    else:
+        blue = 138.5177312231 * math.log(t - 10) - 305.0447927307
+    return tuple(min(max(c, 0.0), 255.0) / 255 for c in (red, green, blue))
+
+
+_NEUTRAL_RGB = _temperature_rgb(NEUTRAL_TEMPERATURE)
+
+
+def temperature_rgb(kelvin):
+    """Per-channel white point of a colour temperature, 6500K being (1, 1, 1)"""
+    return tuple(min(c / n, 1.0) for c, n in zip(_temperature_rgb(kelvin), _NEUTRAL_RGB))
+
+
+def blend_temperature(day, night, factor):
+    """Interpolate in mireds, where equal steps look equally large"""
+    mired = (1 - factor) * 1e6 / day + factor * 1e6 / night
+    return 1e6 / mired
+
+
+def blend(values, night, factor):
+    """(gamma, contrast, brightness) moved factor of the way to the night profile"""
+    return tuple(v + (n - v) * factor for v, n in zip(values, night[:3]))
+
+
+def parse_clock(text):
+    """'HH:MM' as seconds since midnight"""
+    hours, _, minutes = text.strip().partition(':')
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"invalid time {text!r}")
+    return hours * 3600 + minutes * 60
+
+
+def seconds_of_day(now=None):
+    if now is None:
+        now = time.time()
+    local = time.localtime(now)
+    return local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + now % 1
+
+
+class Schedule:
+    """Night light timing: fade to the night profile at sunset, back at sunrise.
+
+    at() returns how far towards night the given moment is (0 day, 1
+    night) and how long until that changes: one step of the fade while a
+    transition runs, otherwise the time until the next one starts, so
+    the caller can sleep on a single timeout for all of it.
+    """
+
+    def __init__(self, sunset="20:00", sunrise="07:00", duration=1800, night=DEFAULT_NIGHT):
+        self.sunset = parse_clock(sunset)
+        self.sunrise = parse_clock(sunrise)
+        gap = min((self.sunrise - self.sunset) % DAY, (self.sunset - self.sunrise) % DAY)
+        self.duration = max(1, min(duration, gap))
+        self.night = night
+
+    def at(self, now=None):
+        t = seconds_of_day(now)
+        since_sunset = (t - self.sunset) % DAY
+        since_sunrise = (t - self.sunrise) % DAY
+        step = max(MIN_STEP, self.duration / TRANSITION_STEPS)
+        if since_sunset < since_sunrise:
+            if since_sunset < self.duration:
+                return since_sunset / self.duration, min(step, self.duration - since_sunset)
+            return 1.0, min(MAX_IDLE, DAY - since_sunrise)
+        if since_sunrise < self.duration:
+            return 1 - since_sunrise / self.duration, min(step, self.duration - since_sunrise)
+        return 0.0, min(MAX_IDLE, DAY - since_sunset)
+
+    def to_json(self):
+        return {'sunset': f"{self.sunset // 3600:02d}:{self.sunset % 3600 // 60:02d}",
+                'sunrise': f"{self.sunrise // 3600:02d}:{self.sunrise % 3600 // 60:02d}",
+                'duration': self.duration, 'night': list(self.night)}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['sunset'], data['sunrise'], data['duration'],
+                   NightProfile(*data['night']))
+
+
+def load_schedule(path):
+    """(enabled, Schedule) saved by save_schedule(), defaults if there is none"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return bool(data.get('enabled')), Schedule.from_json(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False, Schedule()
+
+
+def save_schedule(path, enabled, schedule):
+    with open(path, 'w') as f:
+        json.dump(dict(schedule.to_json(), enabled=enabled), f, indent=2)
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import glob
+
+CONFIG_PATH = os.path.expanduser("~/.config/hypr/hyprland.conf")
+ENCODING = 'utf-8'
+# Undecodable bytes survive a load/save as lone surrogates
+ERRORS = 'surrogateescape'
+
+LINE_RE = re.compile(r'[^\n]*\n|[^\n]+$')
+ASSIGNMENT_RE = re.compile(r'^(\s*)([^\s={}][^={}]*?)(\s*)=(\s*)(.*?)(\s*)$')
+SECTION_OPEN_RE = re.compile(r'^\s*([^\s={}#][^={}#]*?)\s*\{\s*$')
+SECTION_CLOSE_RE = re.compile(r'^\s*\}\s*$')
+VARIABLE_RE = re.compile(r'\$([A-Za-z0-9_]+)')
+
+
+def _split_comment(text):
+    """Split a line into (code, comment) at the first '#' that is not '##'"""
+    pos = 0
+    while True:
+        pos = text.find('#', pos)
+        if pos < 0:
+            return text, ''
+        if text.startswith('##', pos):
+            pos += 2
+            continue
+        return text[:pos], text[pos:]
+
+
+def unescape(value):
+    return value.replace('##', '#')
+
+
+def escape(value):
+    return value.replace('#', '##')
+
+
+class Line:
+    """One physical line; raw is its exact text including the line ending"""
+
+    __slots__ = ('raw', 'document', 'section')
+    kind = 'line'
+
+    def __init__(self, raw, document=None, section=None):
+        self.raw = raw
+        self.document = document
+        self.section = section
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class Blank(Line):
+    __slots__ = ()
+    kind = 'blank'
+
+
+class Comment(Line):
+    __slots__ = ()
+    kind = 'comment'
+
+
+class Unknown(Line):
+    """A line the parser does not understand, kept verbatim"""
+
+    __slots__ = ()
+    kind = 'unknown'
+
+
+class SectionOpen(Line):
+    __slots__ = ('name',)
+    kind = 'open'
+
+    def __init__(self, raw, name, document=None, section=None):
+        super().__init__(raw, document, section)
+        self.name = name
+
+
+class SectionClose(Line):
+    __slots__ = ()
+    kind = 'close'
+
+
+class Assignment(Line):
+    """'key = value  # comment', split so the value can be replaced in place.
+
+    raw == head + escape(value) + tail, where head is the indentation, key,
+    '=' and their spacing and tail the trailing space, comment and line
+    ending.
+    """
+
+    __slots__ = ('key', 'value', 'head', 'tail', 'included')
+    kind = 'assignment'
+
+    def __init__(self, raw, key, value, head, tail, document=None, section=None):
+        super().__init__(raw, document, section)
+        self.key = key
+        self.value = value
+        self.head = head
+        self.tail = tail
+        # Documents a 'source' line pulled in, filled by HyprConfig
+        self.included = ()
+
+    @classmethod
+    def create(cls, key, value, indent="", ending="\n"):
+        head = f"{indent}{key} = "
+        return cls(head + escape(value) + ending, key, value, head, ending)
+
+    @property
+    def path(self):
+        """'section:subsection:key', the key as Hyprland addresses it"""
+        names = []
+        section = self.section
+        while section is not None and section.name is not None:
+            names.append(section.name)
+            section = section.parent
+        return ':'.join(names[::-1] + [self.key])
+
+    def set_key(self, key):
+        if key == self.key:
+            return
+        # head starts with the indentation, so the first match is the key
+        self.head = self.head.replace(self.key, key, 1)
+        self.key = key
+        self.raw = self.head + escape(self.value) + self.tail
+        if self.document is not None:
+            self.document.dirty = True
+
+    def set_value(self, value):
+        if value == self.value:
+            return
+        self.value = value
+        self.raw = self.head + escape(value) + self.tail
+        if self.document is not None:
+            self.document.dirty = True
+
+
+def parse_line(raw):
+    content = raw.rstrip('\r\n')
+    code, comment = _split_comment(content)
+    if not code.strip():
+        return Comment(raw) if comment else Blank(raw)
+    match = SECTION_OPEN_RE.match(code)
+    if match:
+        return SectionOpen(raw, match.group(1))
+    if SECTION_CLOSE_RE.match(code):
+        return SectionClose(raw)
+    match = ASSIGNMENT_RE.match(code)
+    if match:
+        indent, key, space_before, space_after, value, _ = match.groups()
+        head = f"{indent}{key}{space_before}={space_after}"
+        # The value starts right after head; strip the exact text back off
+        tail = raw[len(head) + len(value):]
+        return Assignment(raw, key, unescape(value), head, tail)
+    return Unknown(raw)
+
+
+class Section:
+    """A '{ ... }' block (or, with name None, a whole file) and its children"""
+
+    __slots__ = ('name', 'open', 'close', 'children', 'parent')
+
+    def __init__(self, name=None, open=None, parent=None):
+        self.name = name
+        self.open = open
+        self.close = None
+        self.children = []
+        self.parent = parent
+
+    def lines(self):
+        """Every Line of the block in file order, nested blocks included"""
+        if self.open is not None:
+            yield self.open
+        for child in self.children:
+            if isinstance(child, Section):
+                yield from child.lines()
+            else:
+                yield child
+        if self.close is not None:
+            yield self.close
+
+    def sections(self, name):
+        return [child for child in self.children if isinstance(child, Section) and child.name == name]
+
+
+class Document:
+    """The concrete syntax tree of one file.
+
+    Every line is kept with its exact text, so text() of an unedited
+    document is the file byte for byte; edits replace single lines.
+    """
+
+    def __init__(self, path, text):
+        self.path = path
+        self.dirty = False
+        self.root = Section()
+        section = self.root
+        for raw in LINE_RE.findall(text):
+            line = parse_line(raw)
+            line.document = self
+            if isinstance(line, SectionOpen):
+                line.section = section
+                child = Section(line.name, line, section)
+                section.children.append(child)
+                section = child
+            elif isinstance(line, SectionClose) and section.parent is not None:
+                line.section = section
+                section.close = line
+                section = section.parent
+            else:
+                line.section = section
+                section.children.append(line)
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r', encoding=ENCODING, errors=ERRORS, newline='') as f:
+            return cls(path, f.read())
+
+    def lines(self):
+        return self.root.lines()
+
+    def text(self):
+        return ''.join(line.raw for line in self.lines())
+
+    def insert(self, section, index, line):
+        """Add a new line to section before children[index]"""
+        last = None
+        for last in self.lines():
+            pass
+        # The file may end without a newline; the new line must not join it
+        if last is not None and not last.raw.endswith('\n'):
+            last.raw += '\n'
+            if isinstance(last, Assignment):
+                last.tail += '\n'
+        line.document = self
+        line.section = section
+        section.children.insert(index, line)
+        self.dirty = True
+
+    def append(self, line, section=None):
+        section = section or self.root
+        self.insert(section, len(section.children), line)
+
+    def remove(self, line):
+        line.section.children.remove(line)
+        self.dirty = True
+
+    def write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding=ENCODING, errors=ERRORS, newline='') as f:
+                f.write(self.text())
+            try:
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o7777)
+            except OSError:
+                pass
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.dirty = False
+
+
+class ParseCache:
+    """Parsed documents by path, reused while the file's mtime and size hold.
+
+    A document with unsaved edits is returned as it is, so edits are not
+    lost to a reload.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def get(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self.documents.get(path)
+        if cached is not None and (cached[0] == key or cached[1].dirty):
+            return cached[1]
+        document = Document.read(path)
+        self.documents[path] = (key, document)
+        return document
+
+    def saved(self, document):
+        try:
+            st = os.stat(document.path)
+        except OSError:
+            return
+        self.documents[document.path] = ((st.st_mtime_ns, st.st_size, st.st_ino), document)
+
+
+CACHE = ParseCache()
+
+
+class HyprConfig:
+    """A Hyprland config with its 'source' includes, variables and key index.
+
+    Files are read through a ParseCache, so loading again only re-parses
+    files that changed. index maps 'section:key' (e.g. 'general:gaps_in',
+    'bind') to its assignments in the order Hyprland reads them, includes
+    spliced in where they are sourced.
+    """
+
+    def __init__(self, path=CONFIG_PATH, cache=CACHE):
+        self.path = path
+        self.cache = cache
+        self.documents = []
+        self.assignments = []
+        self.index = {}
+        self.variables = {}
+        self.errors = []
+
+    def load(self):
+        self.documents = []
+        self.assignments = []
+        self.index = {}
+        self.variables = {}
+        self.errors = []
+        self._load(os.path.abspath(os.path.expanduser(self.path)), set())
+        return self
+
+    def _load(self, path, loading):
+        if path in loading:
+            self.errors.append(f"{path}: sourced from itself")
+            return None
+        try:
+            document = self.cache.get(path)
+        except OSError as e:
+            self.errors.append(f"{path}: {e.strerror or e}")
+            return None
+        loading.add(path)
+        self.documents.append(document)
+        for line in document.lines():
+            if not isinstance(line, Assignment):
+                continue
+            line.included = ()
+            if line.key.startswith('$'):
+                self.variables[line.key[1:]] = self.expand(line.value)
+                continue
+            self.assignments.append(line)
+            self.index.setdefault(line.path, []).append(line)
+            if line.key == 'source' and line.section.name is None:
+                line.included = self._source(line, os.path.dirname(path), loading)
+        loading.discard(path)
+        return document
+
+    def _source(self, line, directory, loading):
+        pattern = os.path.expanduser(self.expand(line.value.strip()))
+        pattern = os.path.join(directory, pattern)
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        included = []
+        for path in paths:
+            document = self._load(os.path.abspath(path), loading)
+            if document is not None:
+                included.append(document)
+        return tuple(included)
+
+    def expand(self, text):
+        """Substitute $variables, longest names first like Hyprland"""
+        if '$' not in text:
+            return text
+
+        def variable(match):
+            name = match.group(1)
+            # $foobar may be $foo followed by 'bar'
+            for end in range(len(name), 0, -1):
+                if name[:end] in self.variables:
+                    return self.variables[name[:end]] + name[end:]
+            return match.group(0)
+
+        return VARIABLE_RE.sub(variable, text)
+
+    def find(self, key):
+        return self.index.get(key, [])
+
+    def get(self, key, default=None):
+        """The effective (last) value of key, variables expanded"""
+        found = self.index.get(key)
+        return self.expand(found[-1].value) if found else default
+
+    def keybindings(self):
+        """Every bind, binde, bindm, ... assignment in order"""
+        return [line for line in self.assignments if line.key.startswith('bind')]
+
+    def add(self, key, value, document=None):
+        """Append 'key = value' to document, by default the main file"""
+        if document is None:
+            if not self.documents:
+                # The main file is missing; saving creates it
+                self.documents.append(Document(os.path.abspath(os.path.expanduser(self.path)), ""))
+            document = self.documents[0]
+        line = Assignment.create(key, value)
+        document.append(line)
+        self.assignments.append(line)
+        self.index.setdefault(line.path, []).append(line)
+        return line
+
+    def rename(self, line, key):
+        """Change the key of an assignment, keeping index in step"""
+        found = self.index.get(line.path)
+        if found and line in found:
+            found.remove(line)
+        line.set_key(key)
+        self.index[line.path] = [other for other in self.assignments if other.path == line.path]
+
+    def remove(self, line):
+        line.document.remove(line)
+        self.assignments.remove(line)
+        found = self.index.get(line.path)
+        if found and line in found:
+            found.remove(line)
+
+    def save(self):
+        """Write the documents that were edited; returns their paths"""
+        written = []
+        for document in self.documents:
+            if document.dirty:
+                document.write()
+                self.cache.saved(document)
+                written.append(document.path)
+        return written
@@ -1,36 +1,94 @@
 #!/usr/bin/env python3
 import os
+import sys
+import time
+import threading
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk, GLib
+from gi.repository import Gtk, Gdk, GLib, GObject
+
+from hyprconf import HyprConfig
+
+# As close to process start as the imports allow, for the first frame time
+START_TIME = time.monotonic()
+
+# Sidebar pages: title, builder, whether it needs the parsed config
+SECTIONS = [
+    ("Keybindings", "create_keybindings_section", True),
+    ("Animations", "create_animations_section", False),
+    ("Blur Effects", "create_blur_section", False),
+    ("Window Rules", "create_window_rules_section", False),
+    ("Workspaces", "create_workspaces_section", False),
+    ("Monitor Setup", "create_monitor_section", False),
+    ("Environment", "create_environment_section", False),
+]
 
 class HyprlandConfigGUI(Gtk.Window):
-    def __init__(self):
+    def __init__(self, timing=False):
         super().__init__(title="Hyprland Configuration Tool")
         self.set_default_size(1000, 700)
         
         # Path to Hyprland config file
         self.config_path = os.path.expanduser("~/.config/hypr/hyprland.conf")
         
-        # Load current config
-        self.config_data = self.load_config()
+        # The config is parsed on a worker thread while the window appears,
+        # and each page is only built the first time it is selected
+        self.timing = timing
+        self.config = None
+        self.built = set()
+        self.pending_page = None
+        self.first_frame_ms = None
+        self.config_ms = None
         
         # Create main interface
         self.create_main_interface()
+        self.first_draw_id = self.connect_after("draw", self.on_first_draw)
+        self.load_config_async()
         
     def load_config(self):
-        """Load the current Hyprland config file"""
-        try:
-            with open(self.config_path, 'r') as f:
-                return f.readlines()
-        except FileNotFoundError:
-            print("Hyprland config file not found!")
-            return []
+        """Load the current Hyprland config and the files it sources"""
+        config = HyprConfig(self.config_path).load()
+        for error in config.errors:
+            print(f"Hyprland config: {error}")
+        return config
+    
+    def load_config_async(self):
+        """Parse the config on a worker thread and hand it to the main loop"""
+        def parse():
+            start = time.monotonic()
+            config = self.load_config()
+            GLib.idle_add(self.on_config_loaded, config, time.monotonic() - start)
+        
+        threading.Thread(target=parse, name="hyprconf", daemon=True).start()
+    
+    def on_config_loaded(self, config, elapsed):
+        self.config = config
+        self.config_ms = elapsed * 1000
+        if self.timing:
+            print(f"Config parsed in {self.config_ms:.1f} ms ({len(config.documents)} file(s), "
+                  f"{len(config.assignments)} assignments)")
+        if self.pending_page is not None:
+            self.show_page(self.pending_page)
+        elif self.sidebar.get_selected_row() is None:
+            self.sidebar.select_row(self.sidebar.get_row_at_index(0))
+        return GLib.SOURCE_REMOVE
+    
+    def on_first_draw(self, widget, cr):
+        self.disconnect(self.first_draw_id)
+        self.first_frame_ms = (time.monotonic() - START_TIME) * 1000
+        if self.timing:
+            print(f"First frame after {self.first_frame_ms:.1f} ms")
+        return False
     
     def save_config(self):
-        """Save changes to the config file"""
-        with open(self.config_path, 'w') as f:
-            f.writelines(self.config_data)
+        """Save changes to the config files that were edited"""
+        # A bind without a value is an error in hyprland.conf, so keybindings
+        # that were added but never filled in are dropped instead of written
+        empty = [row.iter for row in self.keybind_store if not row[0].value.strip()]
+        for store_iter in empty:
+            self.config.remove(self.keybind_store[store_iter][0])
+            self.keybind_store.remove(store_iter)
+        self.config.save()
         # You might want to add a way to reload Hyprland config here
     
     def create_main_interface(self):
@@ -39,109 +97,177 @@ class HyprlandConfigGUI(Gtk.Window):
         self.add(main_box)
         
         # Sidebar with navigation
-        sidebar = Gtk.ListBox()
-        sidebar.set_size_request(200, -1)
-        main_box.pack_start(sidebar, False, False, 0)
+        self.sidebar = Gtk.ListBox()
+        self.sidebar.set_size_request(200, -1)
+        main_box.pack_start(self.sidebar, False, False, 0)
         
         # Add sidebar items
-        sections = [
-            "Keybindings", "Animations", "Blur Effects", 
-            "Window Rules", "Workspaces", "Monitor Setup", "Environment"
-        ]
-        
-        for section in sections:
+        for title, _, _ in SECTIONS:
             row = Gtk.ListBoxRow()
-            label = Gtk.Label(label=section)
+            label = Gtk.Label(label=title)
             row.add(label)
-            sidebar.add(row)
+            self.sidebar.add(row)
         
         # Main content area
         self.stack = Gtk.Stack()
         self.stack.set_transition_type(Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
         self.stack.set_transition_duration(300)
         
-        # Create each section
-        self.create_keybindings_section()
-        self.create_animations_section()
-        self.create_blur_section()
-        self.create_window_rules_section()
-        self.create_workspaces_section()
-        self.create_monitor_section()
-        self.create_environment_section()
+        # Shown until the config is parsed; the sections are built on demand
+        loading = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        spinner = Gtk.Spinner()
+        spinner.start()
+        loading.pack_start(spinner, True, False, 0)
+        loading.pack_start(Gtk.Label(label="Loading configuration..."), True, False, 0)
+        self.stack.add_named(loading, "loading")
         
         main_box.pack_start(self.stack, True, True, 0)
         
         # Connect sidebar selection to stack
-        sidebar.connect("row-selected", self.on_sidebar_selected)
+        self.sidebar.connect("row-selected", self.on_sidebar_selected)
     
     def on_sidebar_selected(self, listbox, row):
         """Handle sidebar selection changes"""
         if row is not None:
-            index = row.get_index()
-            self.stack.set_visible_child_name(str(index))
+            self.show_page(str(row.get_index()))
+    
+    def show_page(self, name):
+        """Show a sidebar page, building it the first time"""
+        title, builder, needs_config = SECTIONS[int(name)]
+        if needs_config and self.config is None:
+            self.pending_page = name
+            self.stack.set_visible_child_name("loading")
+            return
+        self.pending_page = None
+        if name not in self.built:
+            self.built.add(name)
+            getattr(self, builder)()
+            self.stack.get_child_by_name(name).show_all()
+        self.stack.set_visible_child_name(name)
     
     def create_keybindings_section(self):
         """Create the keybindings configuration section"""
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
         
-        # Scrollable area
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        # Search over the model; rows that do not match are never laid out
+        self.keybind_search = Gtk.SearchEntry()
+        self.keybind_search.set_placeholder_text("Search keybindings")
+        self.keybind_search.connect("search-changed", self.on_keybinding_search)
+        self.keybind_query = ""
         
-        # Keybindings list
-        self.keybind_list = Gtk.ListBox()
-        scrolled.add(self.keybind_list)
-        
-        # Add existing keybindings
+        # One row per bind assignment: the Assignment itself is the record,
+        # so edits go straight back to the line in its file
+        self.keybind_store = Gtk.ListStore(GObject.TYPE_PYOBJECT)
         self.load_keybindings()
+        self.keybind_filter = self.keybind_store.filter_new()
+        self.keybind_filter.set_visible_func(self.keybinding_visible)
+        
+        # The tree view only renders the rows in the viewport, and with
+        # fixed height rows it does not measure the others
+        self.keybind_view = Gtk.TreeView(model=self.keybind_filter)
+        self.keybind_view.set_enable_search(False)
+        self.keybind_view.get_selection().set_mode(Gtk.SelectionMode.MULTIPLE)
+        for title, width, attribute, handler in (
+                ("Type", 120, "key", self.on_keybinding_key_edited),
+                ("Binding", 600, "value", self.on_keybinding_value_edited)):
+            renderer = Gtk.CellRendererText(editable=True)
+            renderer.connect("edited", handler)
+            column = Gtk.TreeViewColumn(title, renderer)
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(width)
+            column.set_resizable(True)
+            column.set_cell_data_func(renderer, self.render_keybinding, attribute)
+            self.keybind_view.append_column(column)
+        self.keybind_view.set_fixed_height_mode(True)
+        
+        # Scrollable area
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.keybind_view)
         
-        # Add new keybinding button
+        # Add, remove and save buttons
+        buttons = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
         add_btn = Gtk.Button(label="Add New Keybinding")
         add_btn.connect("clicked", self.on_add_keybinding)
-        
+        del_btn = Gtk.Button(label="Delete Selected")
+        del_btn.connect("clicked", self.on_delete_keybinding)
+        save_btn = Gtk.Button(label="Save")
+        save_btn.connect("clicked", self.on_save)
+        buttons.pack_start(add_btn, False, False, 0)
+        buttons.pack_start(del_btn, False, False, 0)
+        buttons.pack_end(save_btn, False, False, 0)
+        
+        box.pack_start(self.keybind_search, False, False, 0)
         box.pack_start(scrolled, True, True, 0)
-        box.pack_start(add_btn, False, False, 0)
+        box.pack_start(buttons, False, False, 0)
+        
+        self.status_label = Gtk.Label(label="")
+        self.status_label.set_xalign(0)
+        box.pack_start(self.status_label, False, False, 0)
         
         self.stack.add_titled(box, "0", "Keybindings")
     
     def load_keybindings(self):
         """Load existing keybindings from config"""
-        # Parse the config file for bind directives
-        for line in self.config_data:
-            if line.strip().startswith("bind"):
-                parts = line.strip().split("=", 1)
-                if len(parts) == 2:
-                    keybind, action = parts
-                    self.add_keybinding_row(keybind.strip(), action.strip())
+        # bind, binde, bindm, ... from every sourced file, in order
+        for binding in self.config.keybindings():
+            self.keybind_store.append((binding,))
     
-    def add_keybinding_row(self, keybind, action):
-        """Add a keybinding row to the list"""
-        row = Gtk.ListBoxRow()
-        box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
-        
-        key_entry = Gtk.Entry()
-        key_entry.set_text(keybind)
-        
-        action_entry = Gtk.Entry()
-        action_entry.set_text(action)
-        
-        del_btn = Gtk.Button.new_from_icon_name("edit-delete", Gtk.IconSize.BUTTON)
-        del_btn.connect("clicked", self.on_delete_keybinding, row)
-        
-        box.pack_start(key_entry, True, True, 0)
-        box.pack_start(action_entry, True, True, 0)
-        box.pack_start(del_btn, False, False, 0)
-        
-        row.add(box)
-        self.keybind_list.add(row)
+    def render_keybinding(self, column, renderer, model, tree_iter, attribute):
+        """Fill a cell from its record; only called for rows on screen"""
+        renderer.set_property("text", getattr(model[tree_iter][0], attribute))
+    
+    def keybinding_visible(self, model, tree_iter, data=None):
+        binding = model[tree_iter][0]
+        if not self.keybind_query:
+            return True
+        return (self.keybind_query in binding.key.lower()
+                or self.keybind_query in binding.value.lower())
+    
+    def on_keybinding_search(self, entry):
+        self.keybind_query = entry.get_text().strip().lower()
+        self.keybind_filter.refilter()
+    
+    def keybinding_at(self, path):
+        """The store iter and record of a row path of the filtered view"""
+        filter_iter = self.keybind_filter.get_iter(path)
+        store_iter = self.keybind_filter.convert_iter_to_child_iter(filter_iter)
+        return store_iter, self.keybind_store[store_iter][0]
+    
+    def on_keybinding_key_edited(self, renderer, path, text):
+        store_iter, binding = self.keybinding_at(path)
+        key = text.strip()
+        # The key must stay a bind line, or it would drop out of this list
+        if not key.startswith("bind") or "=" in key or " " in key:
+            return
+        self.config.rename(binding, key)
+        self.keybind_store.row_changed(self.keybind_store.get_path(store_iter), store_iter)
+    
+    def on_keybinding_value_edited(self, renderer, path, text):
+        store_iter, binding = self.keybinding_at(path)
+        binding.set_value(text.strip())
+        self.keybind_store.row_changed(self.keybind_store.get_path(store_iter), store_iter)
     
     def on_add_keybinding(self, button):
         """Handle adding a new keybinding"""
-        self.add_keybinding_row("bind ", "")
+        binding = self.config.add("bind", "")
+        store_iter = self.keybind_store.append((binding,))
+        # Clear the search so the new row is visible, then edit it
+        self.keybind_search.set_text("")
+        self.on_keybinding_search(self.keybind_search)
+        found, filter_iter = self.keybind_filter.convert_child_iter_to_iter(store_iter)
+        if found:
+            path = self.keybind_filter.get_path(filter_iter)
+            self.keybind_view.set_cursor(path, self.keybind_view.get_column(1), True)
     
-    def on_delete_keybinding(self, button, row):
-        """Handle deleting a keybinding"""
-        self.keybind_list.remove(row)
+    def on_delete_keybinding(self, button):
+        """Handle deleting the selected keybindings"""
+        model, paths = self.keybind_view.get_selection().get_selected_rows()
+        # Remove from the end, so the earlier paths stay valid
+        for path in reversed(paths):
+            store_iter, binding = self.keybinding_at(path)
+            self.config.remove(binding)
+            self.keybind_store.remove(store_iter)
     
     # Similar methods would be created for other sections
     def create_animations_section(self):
@@ -206,7 +332,12 @@ class HyprlandConfigGUI(Gtk.Window):
     
     def on_save(self, button):
         """Handle save button click"""
-        self.save_config()
+        try:
+            self.save_config()
+        except OSError as e:
+            self.status_label.set_text(f"Error: {str(e)}")
+            return
+        self.status_label.set_text("")
         self.show_save_notification()
     
     def show_save_notification(self):
@@ -223,7 +354,7 @@ class HyprlandConfigGUI(Gtk.Window):
         dialog.destroy()
 
 def main():
-    app = HyprlandConfigGUI()
+    app = HyprlandConfigGUI(timing="--timing" in sys.argv[1:])
     app.connect("destroy", Gtk.main_quit)
     app.show_all()
     Gtk.main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import mmap
+import struct
+
+from theme_index import CACHE_DIR
+
+ICON_INDEX_DIR = os.path.join(CACHE_DIR, "icon-index")
+META_VERSION = 1
+TABLE_MAGIC = b'ARCI'
+TABLE_HEADER = struct.Struct('<4sI')
+TABLE_OFFSET = struct.Struct('<I')
+ICON_EXTENSIONS = ('.png', '.svg', '.xpm')
+FALLBACK_THEME = 'hicolor'
+
+
+def parse_index_theme(path):
+    """Parse an index.theme file into {group: {key: value}}"""
+    groups = {}
+    current = None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                current = groups.setdefault(line[1:-1], {})
+            elif current is not None and '=' in line:
+                key, value = line.split('=', 1)
+                current[key.strip()] = value.strip()
+    return groups
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def write_table(path, records):
+    """Write (name, size, path) records as a sorted, offset-indexed table.
+
+    Layout: magic, record count, one little-endian u32 offset per record,
+    then the records as "name\\tsize\\tpath\\n" sorted by name, so lookups
+    can binary search the mmapped file without loading it.
+    """
+    lines = sorted(f"{name}\t{size}\t{icon_path}\n".encode('utf-8')
+                   for name, size, icon_path in records)
+    offset = TABLE_HEADER.size + TABLE_OFFSET.size * len(lines)
+    offsets = []
+    for line in lines:
+        offsets.append(TABLE_OFFSET.pack(offset))
+        offset += len(line)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(TABLE_HEADER.pack(TABLE_MAGIC, len(lines)))
+        f.write(b''.join(offsets))
+        f.write(b''.join(lines))
+    os.replace(tmp_path, path)
+
+
+class IconTable:
+    """Read-only, mmapped name -> (size, path) table of one icon theme"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = TABLE_HEADER.unpack_from(self.map, 0)
+        if magic != TABLE_MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not an icon table")
+
+    def close(self):
+        self.map.close()
+
+    def _record(self, i):
+        start = TABLE_OFFSET.unpack_from(self.map, TABLE_HEADER.size + TABLE_OFFSET.size * i)[0]
+        end = self.map.find(b'\n', start)
+        return self.map[start:end].split(b'\t')
+
+    def find(self, name):
+        """Return every (size, path) registered for name"""
+        key = name.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.count:
+            record = self._record(lo)
+            if record[0] != key:
+                break
+            found.append((int(record[1]), record[2].decode('utf-8')))
+            lo += 1
+        return found
+
+
+class IconIndex:
+    """Inheritance graph and icon lookup tables for installed icon themes.
+
+    theme_dirs maps a theme name to the directories providing it (as
+    returned by ThemeIndex.locate). Per theme the resolved Inherits chain
+    and a key of its index.theme and icon directory mtimes are kept in
+    meta.json; the icon table is only rebuilt when that key changes, and
+    only when the theme is actually looked up.
+    """
+
+    def __init__(self, theme_dirs, path=ICON_INDEX_DIR):
+        self.theme_dirs = theme_dirs
+        self.path = path
+        self.meta = self._load()
+        self.tables = {}
+        self.checked = set()
+        self.dirty = False
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json'), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != META_VERSION:
+            return {}
+        return data.get('themes', {})
+
+    def save(self):
+        """Write meta.json back if any theme was reindexed"""
+        if not self.dirty:
+            return
+        meta_path = os.path.join(self.path, 'meta.json')
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': META_VERSION, 'themes': self.meta}, f)
+            os.replace(tmp_path, meta_path)
+            self.dirty = False
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _index_files(self, name):
+        return [os.path.join(d, 'index.theme') for d in self.theme_dirs.get(name, [])]
+
+    def _info(self, name):
+        """Return the cached meta entry of name, refreshing its header fields"""
+        if name in self.checked:
+            return self.meta[name]
+        self.checked.add(name)
+        index_files = self._index_files(name)
+        header_key = [_mtime(p) for p in index_files]
+        entry = self.meta.get(name)
+        if entry is not None and entry.get('header_key') == header_key:
+            return entry
+
+        groups = {}
+        for index_file in index_files:
+            if os.path.exists(index_file):
+                try:
+                    groups = parse_index_theme(index_file)
+                except OSError:
+                    continue
+                break
+        main = groups.get('Icon Theme', {})
+        directories = {}
+        for subdir in _split_list(main.get('Directories', '')) + \
+                _split_list(main.get('ScaledDirectories', '')):
+            try:
+                directories[subdir] = int(groups.get(subdir, {}).get('Size', '0'))
+            except ValueError:
+                directories[subdir] = 0
+
+        entry = {
+            'header_key': header_key,
+            'inherits': _split_list(main.get('Inherits', '')),
+            'directories': directories,
+        }
+        self.meta[name] = entry
+        self.dirty = True
+        return entry
+
+    def inherits(self, name):
+        """Direct parents declared by name's index.theme"""
+        return self._info(name)['inherits']
+
+    def chain(self, name):
+        """Resolved lookup order: name, its ancestors depth first, then hicolor"""
+        order = []
+        stack = [name]
+        while stack:
+            theme = stack.pop()
+            if theme in order or theme not in self.theme_dirs:
+                continue
+            order.append(theme)
+            stack.extend(reversed(self.inherits(theme)))
+        if FALLBACK_THEME not in order and FALLBACK_THEME in self.theme_dirs:
+            order.append(FALLBACK_THEME)
+        return order
+
+    def missing_parents(self, name):
+        """Themes named in Inherits= somewhere in the chain but not installed"""
+        missing = []
+        for theme in self.chain(name):
+            for parent in self.inherits(theme):
+                if parent not in self.theme_dirs and parent not in missing:
+                    missing.append(parent)
+        return missing
+
+    def _table_key(self, name, entry):
+        return [_mtime(os.path.join(d, subdir))
+                for d in self.theme_dirs.get(name, []) for subdir in sorted(entry['directories'])]
+
+    def _build_records(self, name, entry):
+        records = []
+        for base in self.theme_dirs.get(name, []):
+            for subdir, size in entry['directories'].items():
+                try:
+                    with os.scandir(os.path.join(base, subdir)) as it:
+                        for e in it:
+                            stem, ext = os.path.splitext(e.name)
+                            if ext in ICON_EXTENSIONS:
+                                records.append((stem, size, os.path.join(base, subdir, e.name)))
+                except OSError:
+                    continue
+        return records
+
+    def table(self, name):
+        """Return the IconTable of name, rebuilding it only if its dirs changed"""
+        if name in self.tables:
+            return self.tables[name]
+        entry = self._info(name)
+        key = self._table_key(name, entry)
+        table_path = os.path.join(self.path, f"{name}.idx")
+        if entry.get('table_key') != key or not os.path.exists(table_path):
+            os.makedirs(self.path, exist_ok=True)
+            write_table(table_path, self._build_records(name, entry))
+            entry['table_key'] = key
+            self.dirty = True
+        self.tables[name] = IconTable(table_path)
+        return self.tables[name]
+
+    def lookup(self, theme, icon_name, size=48):
+        """Resolve icon_name through theme's chain to (theme, size, path)"""
+        for candidate in self.chain(theme):
+            try:
+                found = self.table(candidate).find(icon_name)
+            except (OSError, ValueError):
+                continue
+            if found:
+                best_size, path = min(found, key=lambda item: abs(item[0] - size))
+                return candidate, best_size, path
+        return None
+
+    def forget(self, name):
+        """Recheck name on its next lookup, e.g. after it was reinstalled"""
+        self.checked.discard(name)
+        table = self.tables.pop(name, None)
+        if table is not None:
+            table.close()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
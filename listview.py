@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import curses
+
+
+class ListView:
+    """Virtualized, damage-tracked list in a fixed region of the screen.
+
+    Only the rows of the viewport are ever drawn, into a pad the size of
+    the viewport. Each screen row remembers what it last showed, so a
+    keystroke repaints just the rows whose text or highlight changed and
+    the cost depends on the viewport height, not on the number of items.
+    Callers batch output with noutrefresh() and a single curses.doupdate().
+    With multi set, Space marks and unmarks items for batch actions.
+    """
+
+    def __init__(self, y, x, height, width, center=False, highlight=None, format=str,
+                 multi=False):
+        self.y = y
+        self.x = x
+        self.height = max(1, height)
+        self.width = max(1, width)
+        self.center = center
+        self.highlight = highlight if highlight is not None else curses.color_pair(1)
+        self.format = format
+        self.multi = multi
+        self.marked = set()
+        self.pad = curses.newpad(self.height, self.width + 1)
+        self.items = []
+        self.selected = 0
+        self.top = 0
+        self.rows = [None] * self.height
+
+    def set_items(self, items):
+        self.items = items
+        self.selected = min(self.selected, max(0, len(items) - 1))
+        self._scroll()
+
+    def invalidate(self):
+        """Forget what is on screen, e.g. after stdscr.clear()"""
+        self.rows = [None] * self.height
+
+    def current(self):
+        if not self.items:
+            return None
+        return self.items[self.selected]
+
+    def select(self, index):
+        if self.items:
+            self.selected = max(0, min(index, len(self.items) - 1))
+            self._scroll()
+
+    def toggle_mark(self):
+        """Mark or unmark the current item and move to the next one"""
+        item = self.current()
+        if item is None:
+            return
+        if item in self.marked:
+            self.marked.discard(item)
+        else:
+            self.marked.add(item)
+        self.select(self.selected + 1)
+
+    def marked_items(self):
+        """The marked items in list order"""
+        return [item for item in self.items if item in self.marked]
+
+    def _scroll(self):
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + self.height:
+            self.top = self.selected - self.height + 1
+        self.top = max(0, min(self.top, max(0, len(self.items) - self.height)))
+
+    def handle_key(self, key):
+        """Move the selection for navigation keys; returns True if handled"""
+        if key == curses.KEY_UP:
+            self.select(self.selected - 1)
+        elif key == curses.KEY_DOWN:
+            self.select(self.selected + 1)
+        elif key == curses.KEY_PPAGE:
+            self.select(self.selected - self.height)
+        elif key == curses.KEY_NPAGE:
+            self.select(self.selected + self.height)
+        elif key == curses.KEY_HOME:
+            self.select(0)
+        elif key == curses.KEY_END:
+            self.select(len(self.items) - 1)
+        elif key == ord(' ') and self.multi:
+            self.toggle_mark()
+        else:
+            return False
+        return True
+
+    def label(self, index):
+        item = self.items[index]
+        if self.multi:
+            return ("[x] " if item in self.marked else "[ ] ") + self.format(item)
+        return self.format(item)
+
+    def attr(self, index):
+        return self.highlight if index == self.selected else curses.A_NORMAL
+
+    def render(self):
+        """Repaint the changed rows and queue the pad for the next doupdate()"""
+        for row in range(self.height):
+            index = self.top + row
+            if index < len(self.items):
+                content = (self.label(index)[:self.width], self.attr(index))
+            else:
+                content = ("", curses.A_NORMAL)
+            if self.rows[row] == content:
+                continue
+            text, attr = content
+            col = max(0, (self.width - len(text)) // 2) if self.center else 0
+            self.pad.move(row, 0)
+            self.pad.clrtoeol()
+            if text:
+                self.pad.addstr(row, col, text, attr)
+            self.rows[row] = content
+        self.pad.noutrefresh(0, 0, self.y, self.x,
+                             self.y + self.height - 1, self.x + self.width - 1)
+
+
+class TextView(ListView):
+    """Read-only scrolling text in a fixed region of the screen.
+
+    Navigation keys move the viewport instead of a cursor. While follow is
+    set the view sticks to the last line as lines are added, like tail -f;
+    scrolling up clears it and End sets it again. items only needs len()
+    and indexing, so a ring buffer can be shown without copying it.
+    """
+
+    def __init__(self, y, x, height, width, format=str):
+        super().__init__(y, x, height, width, highlight=curses.A_NORMAL, format=format)
+        self.follow = True
+
+    def set_items(self, items):
+        self.items = items
+        self._scroll()
+
+    def _max_top(self):
+        return max(0, len(self.items) - self.height)
+
+    def _scroll(self):
+        if self.follow:
+            self.top = self._max_top()
+        else:
+            self.top = max(0, min(self.top, self._max_top()))
+
+    def scroll(self, delta):
+        self.top = max(0, min(self.top + delta, self._max_top()))
+        self.follow = self.top >= self._max_top()
+
+    def current(self):
+        return None
+
+    def handle_key(self, key):
+        if key == curses.KEY_UP:
+            self.scroll(-1)
+        elif key == curses.KEY_DOWN:
+            self.scroll(1)
+        elif key == curses.KEY_PPAGE:
+            self.scroll(-self.height)
+        elif key == curses.KEY_NPAGE:
+            self.scroll(self.height)
+        elif key == curses.KEY_HOME:
+            self.top = 0
+            self.follow = False
+        elif key == curses.KEY_END:
+            self.follow = True
+            self._scroll()
+        else:
+            return False
+        return True
+
+    def attr(self, index):
+        return curses.A_NORMAL
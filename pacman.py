@@ -1,72 +1,369 @@
 #!/usr/bin/env python3
 
 import curses
-import subprocess
 from curses import wrapper
 
-def run_command(command):
+from listview import ListView, TextView
+from pacman_db import LocalDB, EXPLICIT, DEPENDENCY, ALL
+from pacman_graph import graph_of
+import pacman_cache
+from pacman_log import PacmanLog
+from pacman_jobs import JobQueue, RUNNING, CLOSE_TIMEOUT
+from pacman_sync import SyncIndex
+
+PACKAGE_FILTERS = [EXPLICIT, DEPENDENCY, ALL]
+JOB_POLL_INTERVAL = 100  # ms
+JOB_PANEL_ROWS = 3
+JOB_LIST_ROWS = 5
+HISTORY_POLL_INTERVAL = 1000  # ms
+
+def wait_key(stdscr, jobs, version):
+    """getch() that also returns -1 as soon as the job queue changed"""
+    stdscr.timeout(JOB_POLL_INTERVAL)
+    try:
+        while True:
+            key = stdscr.getch()
+            if key != -1 or jobs.version != version:
+                return key
+    finally:
+        stdscr.timeout(-1)
+
+def output_size(stdscr):
+    """Rows and columns of the job output pane, also used as the pty size"""
+    h, w = stdscr.getmaxyx()
+    return max(1, h - JOB_LIST_ROWS - 6), w - 1
+
+def draw_progress(stdscr, y, w, progress):
+    stdscr.move(y, 0)
+    stdscr.clrtoeol()
+    if progress:
+        fraction, label = progress
+        bar_width = max(10, min(40, w // 3))
+        filled = int(fraction * bar_width)
+        text = f"[{'#' * filled}{'-' * (bar_width - filled)}] {fraction * 100:3.0f}% {label}"
+        stdscr.addstr(y, 0, text[:w-1])
+
+def draw_status(stdscr, h, w, text):
+    stdscr.move(h-1, 0)
+    stdscr.clrtoeol()
+    stdscr.addstr(h-1, 0, text[:w-1], curses.A_DIM)
+
+def read_input(stdscr, y, w, prompt, echo=False):
+    """Read one line at row y, by default without echoing it (it may be a password)"""
+    stdscr.move(y, 0)
+    stdscr.clrtoeol()
+    stdscr.addstr(y, 0, prompt[:w-1])
+    stdscr.timeout(-1)
+    curses.curs_set(1)
+    if echo:
+        curses.echo()
     try:
-        result = subprocess.run(command, shell=True, check=True, 
-                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                              text=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        return f"Error: {e.stderr}"
-
-def display_menu(stdscr, selected_row_idx, packages):
+        return stdscr.getstr(y, min(len(prompt), w - 1)).decode('utf-8', 'replace')
+    finally:
+        if echo:
+            curses.noecho()
+        curses.curs_set(0)
+
+def show_jobs(stdscr, jobs, title="Jobs (run in order, one at a time):"):
+    """Job queue and the live output of the selected job"""
     stdscr.clear()
     h, w = stdscr.getmaxyx()
+    rows, columns = output_size(stdscr)
+    stdscr.addstr(0, 0, title[:w-1], curses.A_BOLD)
+    
+    job_list = ListView(1, 0, JOB_LIST_ROWS, w - 1, format=lambda job: job.summary())
+    output = TextView(JOB_LIST_ROWS + 2, 0, rows, columns)
+    with jobs.lock:
+        job_list.set_items(list(jobs.jobs))
+        running = [i for i, job in enumerate(jobs.jobs) if job.state == RUNNING]
+        job_list.select(running[0] if running else len(jobs.jobs) - 1)
+    shown = None
+    
+    while True:
+        draw_status(stdscr, h, w, "↑/↓: job  PgUp/PgDn Home/End: scroll  c: cancel  i: send input  q: back")
+        with jobs.lock:
+            version = jobs.version
+            job_list.set_items(list(jobs.jobs))
+            job = job_list.current()
+            if job is not shown:
+                shown = job
+                output.follow = True
+                output.invalidate()
+            job_list.render()
+            output.set_items(job.buffer if job is not None and job.buffer is not None else [])
+            output.render()
+            draw_progress(stdscr, h - 3, w, job.progress if job is not None else None)
+        stdscr.noutrefresh()
+        curses.doupdate()
+        
+        key = wait_key(stdscr, jobs, version)
+        if key in (curses.KEY_UP, curses.KEY_DOWN):
+            job_list.handle_key(key)
+        elif output.handle_key(key):
+            pass
+        elif key == ord('c') and job is not None:
+            jobs.cancel(job)
+        elif key == ord('i') and job is not None and job.state == RUNNING:
+            text = read_input(stdscr, h - 2, w, f"Input for #{job.id} (not shown): ")
+            jobs.send(job, text.encode('utf-8') + b'\n')
+            stdscr.move(h - 2, 0)
+            stdscr.clrtoeol()
+        elif key in (ord('q'), 27):
+            break
+
+def draw_jobs_panel(stdscr, jobs, h, w):
+    with jobs.lock:
+        active = [job for job in jobs.jobs if job.active]
+        finished = [job for job in reversed(jobs.jobs) if not job.active]
+        lines = [job.summary() for job in (active + finished)[:JOB_PANEL_ROWS]]
+    top = h - 2 - JOB_PANEL_ROWS
+    for row in range(top, h - 1):
+        stdscr.move(row, 0)
+        stdscr.clrtoeol()
+    if lines:
+        stdscr.addstr(top, 0, f"Jobs: {len(active)} active"[:w-1], curses.A_BOLD)
+        for i, line in enumerate(lines):
+            stdscr.addstr(top + 1 + i, 0, line[:w-1])
+
+def confirm_quit(stdscr, jobs):
+    """Ask before quitting with jobs left; True if the app may exit"""
+    active = jobs.active()
+    if not active:
+        return True
+    h, w = stdscr.getmaxyx()
+    draw_status(stdscr, h, w, f"{len(active)} job(s) still queued or running. Cancel them and quit? (y/n)")
+    stdscr.refresh()
+    if stdscr.getch() not in (ord('y'), ord('Y')):
+        return False
+    draw_status(stdscr, h, w, "Cancelling jobs...")
+    stdscr.refresh()
+    jobs.cancel_all()
+    if jobs.wait_idle(CLOSE_TIMEOUT):
+        return True
+    # Never kill pacman mid-transaction; let the job stop by itself
+    show_jobs(stdscr, jobs, "Interrupted jobs still finishing; quit again once they are done:")
+    return False
+
+MENU_ROWS = 8
+
+def create_menu(stdscr):
+    h, w = stdscr.getmaxyx()
+    return ListView(h//2 - MENU_ROWS//2, 0, MENU_ROWS, w - 1, center=True)
+
+def display_menu(stdscr, menu, jobs, full=False):
+    h, w = stdscr.getmaxyx()
     
-    # Judul
-    title = "Arch Linux Package Manager (TUI)"
-    stdscr.addstr(0, w//2 - len(title)//2, title, curses.A_BOLD)
+    if full:
+        stdscr.clear()
+        menu.invalidate()
+        
+        # Judul
+        title = "Arch Linux Package Manager (TUI)"
+        stdscr.addstr(0, w//2 - len(title)//2, title, curses.A_BOLD)
+        
+        # Status bar
+        status = "Navigate: ↑/↓  Select: Enter  Quit: q"
+        stdscr.addstr(h-1, 0, status, curses.A_DIM)
+        stdscr.noutrefresh()
     
     # Menu utama
-    menu_items = [
+    menu.set_items([
         "Install Package",
         "Remove Package",
         "Upgrade All Packages",
         "List Installed Packages",
+        "Clean Package Cache",
+        "History",
+        "Jobs",
         "Exit"
-    ]
-    
-    for idx, item in enumerate(menu_items):
-        x = w//2 - len(item)//2
-        y = h//2 - len(menu_items)//2 + idx
-        if idx == selected_row_idx:
-            stdscr.attron(curses.color_pair(1))
-            stdscr.addstr(y, x, item)
-            stdscr.attroff(curses.color_pair(1))
-        else:
-            stdscr.addstr(y, x, item)
+    ])
+    menu.render()
+    draw_jobs_panel(stdscr, jobs, h, w)
+    stdscr.noutrefresh()
+    curses.doupdate()
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def job_title(action, names):
+    if len(names) <= 3:
+        return f"{action} {' '.join(names)}"
+    return f"{action} {len(names)} packages ({', '.join(names[:2])}, ...)"
+
+def preview_transaction(stdscr, title, lines, summary, actions=(('y', "run as one transaction"),)):
+    """Show every package of a batch before it is queued.
     
-    # Status bar
-    status = "Navigate: ↑/↓  Select: Enter  Quit: q"
-    stdscr.addstr(h-1, 0, status, curses.A_DIM)
+    actions are (key, description) pairs; returns the key chosen, Enter
+    meaning the first one, or None to go back.
+    """
+    stdscr.clear()
+    h, w = stdscr.getmaxyx()
+    stdscr.addstr(0, 0, title[:w-1], curses.A_BOLD)
+    stdscr.addstr(h-3, 0, summary[:w-1])
+    keys = "  ".join(f"{'Enter/' if i == 0 else ''}{key}: {text}" for i, (key, text) in enumerate(actions))
+    draw_status(stdscr, h, w, f"{keys}  q: back  Scroll: ↑/↓ PgUp/PgDn")
+    stdscr.noutrefresh()
     
-    stdscr.refresh()
+    view = TextView(2, 0, h - 6, w - 1)
+    view.follow = False
+    view.set_items(lines)
+    while True:
+        view.render()
+        curses.doupdate()
+        key = stdscr.getch()
+        if key == ord('\n'):
+            return actions[0][0]
+        for action, _ in actions:
+            if key == ord(action):
+                return action
+        if key in (ord('q'), 27):
+            return None
+        view.handle_key(key)
 
-def install_package(stdscr):
+def prompt_packages(stdscr, sync_table, errors=()):
+    """Line editor for package names that completes the word being typed.
+    
+    Suggestions come from the sync index: names starting with the word
+    first, then names containing it. errors are the sync databases that
+    could not be indexed. Returns the text, or None on Esc.
+    """
     stdscr.clear()
     h, w = stdscr.getmaxyx()
+    prompt = "> "
+    stdscr.addstr(0, 0, "Enter package name(s) to install:"[:w-1], curses.A_BOLD)
+    if errors:
+        stdscr.addstr(2, 0, f"(could not index {'; '.join(errors)})"[:w-1], curses.A_DIM)
+    elif sync_table is None or not len(sync_table):
+        stdscr.addstr(2, 0, "(no sync databases indexed, run an upgrade first for completions)"[:w-1],
+                      curses.A_DIM)
+    draw_status(stdscr, h, w, "Tab: complete  ↑/↓: pick  Enter: continue  Esc: cancel")
+    
+    def describe(i):
+        package = sync_table.record(i)
+        return f"{package.name} {package.version} [{package.repo}]  {package.desc}"
     
-    curses.echo()
-    stdscr.addstr(0, 0, "Enter package name to install: ")
-    package = stdscr.getstr().decode('utf-8')
-    curses.noecho()
-    
-    if package:
-        stdscr.addstr(2, 0, f"Installing {package}...")
-        stdscr.refresh()
-        output = run_command(f"sudo pacman -S --noconfirm {package}")
-        stdscr.addstr(4, 0, output)
-    else:
+    suggestions = ListView(3, 0, h - 5, w - 1, format=describe)
+    text = ""
+    shown_word = None
+    curses.curs_set(1)
+    try:
+        while True:
+            word = text.rsplit(' ', 1)[-1]
+            if word != shown_word:
+                shown_word = word
+                found = sync_table.complete(word, suggestions.height) if sync_table and word else []
+                suggestions.set_items(found)
+                suggestions.select(0)
+            line = (prompt + text)[-(w - 1):]
+            stdscr.move(1, 0)
+            stdscr.clrtoeol()
+            stdscr.addstr(1, 0, line)
+            stdscr.noutrefresh()
+            suggestions.render()
+            curses.setsyx(1, len(line))
+            curses.doupdate()
+            
+            key = stdscr.getch()
+            if key == ord('\n'):
+                return text
+            elif key == 27:
+                return None
+            elif key in (curses.KEY_UP, curses.KEY_DOWN):
+                suggestions.handle_key(key)
+            elif key == ord('\t') and suggestions.current() is not None:
+                text = text[:len(text) - len(word)] + sync_table.name(suggestions.current()) + " "
+            elif key in (curses.KEY_BACKSPACE, 127, 8):
+                text = text[:-1]
+            elif 32 <= key < 127:
+                text += chr(key)
+    finally:
+        curses.curs_set(0)
+
+def install_package(stdscr, jobs, local_db, sync_index):
+    h, w = stdscr.getmaxyx()
+    try:
+        sync_table = sync_index.table()
+        errors = sync_index.errors
+    except OSError as e:
+        sync_table = None
+        errors = [f"{sync_index.path}: {e.strerror or e}"]
+    
+    text = prompt_packages(stdscr, sync_table, errors)
+    if text is None:
+        return
+    names = list(dict.fromkeys(text.split()))
+    
+    if not names:
+        stdscr.clear()
         stdscr.addstr(2, 0, "No package name entered!")
+        stdscr.addstr(h-1, 0, "Press any key to continue...")
+        stdscr.getch()
+        return
+    
+    table = local_db.table()
+    lines = []
+    unknown = 0
+    for name in names:
+        line = name
+        found = sync_table.find(name) if sync_table else []
+        if found:
+            package = sync_table.record(found[0])
+            line = f"{name} {package.version} [{package.repo}]"
+        elif sync_table:
+            providers = [sync_table.name(i) for i in sync_table.providers(name)]
+            if providers:
+                line += f"  (provided by {', '.join(providers[:5])})"
+            else:
+                line += "  (not found in the sync databases)"
+                unknown += 1
+        installed = table.get(name)
+        if installed:
+            line += f"  (installed {installed.version}, reinstall)"
+        lines.append(line)
+    
+    summary = "All of them are installed by a single pacman -S."
+    if unknown:
+        summary = f"{unknown} name(s) not found, pacman will refuse the transaction. " + summary
+    if preview_transaction(stdscr, f"Install {len(names)} package(s):", lines, summary) == 'y':
+        jobs.submit(job_title("Install", names), ["sudo", "pacman", "-S", "--noconfirm"] + names)
+
+def removal_preview(table, graph, names):
+    """Lines and summary of removing names, with what -Rs would add"""
+    names = [name for name in names if name in table]
+    targets = [table.index[name] for name in names]
+    removed, broken = graph.removal_plan(targets)
+    sizes = table.sizes
+    
+    def line(i):
+        return f"  {table.package_names[i]} {table.versions[i]}  {format_size(sizes[i])}"
+    
+    lines = ["Selected:"]
+    for i in targets:
+        text = line(i)
+        if i in broken:
+            users = [table.package_names[r] for r in broken[i]]
+            text += f"  (required by {', '.join(users[:5])}{', ...' if len(users) > 5 else ''})"
+        lines.append(text)
+    extra = removed[len(targets):]
+    if extra:
+        lines.append("")
+        lines.append("Also removed by -Rs (dependencies nothing else needs):")
+        lines.extend(line(i) for i in extra)
     
-    stdscr.addstr(h-1, 0, "Press any key to continue...")
-    stdscr.getch()
+    freed = sum(sizes[i] for i in targets)
+    summary = f"Frees {format_size(freed)}"
+    if extra:
+        summary += f", {format_size(freed + sum(sizes[i] for i in extra))} with -Rs"
+    summary += "; one pacman transaction for all of them."
+    if broken:
+        summary = f"{len(broken)} package(s) still required, pacman will refuse. " + summary
+    return names, lines, summary, bool(extra)
 
-def remove_package(stdscr, packages):
+def remove_package(stdscr, packages, jobs, local_db):
     stdscr.clear()
     h, w = stdscr.getmaxyx()
     
@@ -76,68 +373,196 @@ def remove_package(stdscr, packages):
         stdscr.getch()
         return
     
-    selected = 0
+    table = local_db.table()
+    graph = graph_of(table)
+    
+    def label(name):
+        i = table.index.get(name)
+        if i is None:
+            return name
+        text = f"{name} {table.versions[i]}"
+        count = graph.required_by_count(i)
+        return f"{text}  (required by {count})" if count else text
+    
+    view = ListView(2, 0, h - 4, w - 1, format=label, multi=True)
+    view.set_items(packages)
+    redraw = True
     while True:
-        stdscr.clear()
-        stdscr.addstr(0, 0, "Select package to remove (Enter to confirm, q to cancel):")
-        
-        for idx, pkg in enumerate(packages):
-            if idx == selected:
-                stdscr.attron(curses.color_pair(1))
-                stdscr.addstr(idx+2, 0, pkg)
-                stdscr.attroff(curses.color_pair(1))
-            else:
-                stdscr.addstr(idx+2, 0, pkg)
+        if redraw:
+            stdscr.clear()
+            view.invalidate()
+            stdscr.addstr(0, 0, "Select packages to remove (Space: mark, Enter: remove, q: cancel):"[:w-1])
+            stdscr.addstr(h-1, 0, "Navigate: ↑/↓ PgUp/PgDn Home/End  o: mark orphans"[:w-1], curses.A_DIM)
+            redraw = False
+        stdscr.move(1, 0)
+        stdscr.clrtoeol()
+        if view.marked:
+            stdscr.addstr(1, 0, f"{len(view.marked)} marked"[:w-1], curses.A_BOLD)
+        stdscr.noutrefresh()
+        view.render()
+        curses.doupdate()
         
         key = stdscr.getch()
         
-        if key == curses.KEY_UP and selected > 0:
-            selected -= 1
-        elif key == curses.KEY_DOWN and selected < len(packages)-1:
-            selected += 1
-        elif key == ord('\n'):
-            package = packages[selected]
-            stdscr.addstr(len(packages)+2, 0, f"Removing {package}...")
-            stdscr.refresh()
-            output = run_command(f"sudo pacman -R --noconfirm {package}")
-            stdscr.addstr(len(packages)+3, 0, output)
-            stdscr.addstr(len(packages)+4, 0, "Press any key to continue...")
-            stdscr.getch()
-            break
+        if view.handle_key(key):
+            pass
+        elif key == ord('o'):
+            # Orphans are dependencies, so usually not in the explicit list
+            orphans = [table.package_names[i] for i in graph.orphans()]
+            if orphans:
+                view.set_items(orphans)
+                view.marked = set(orphans)
+                view.select(0)
+                redraw = True
+        elif key == ord('\n') and view.current() is not None:
+            names, lines, summary, recursive = removal_preview(
+                table, graph, view.marked_items() or [view.current()])
+            if not names:
+                continue
+            actions = [('y', "pacman -R")]
+            if recursive:
+                actions.append(('s', "pacman -Rs"))
+            action = preview_transaction(stdscr, f"Remove {len(names)} package(s):", lines,
+                                         summary, actions)
+            if action is not None:
+                flag = "-Rs" if action == 's' else "-R"
+                jobs.submit(job_title("Remove", names), ["sudo", "pacman", flag, "--noconfirm"] + names)
+                break
+            redraw = True
         elif key == ord('q'):
             break
     
-def upgrade_packages(stdscr):
+def upgrade_packages(jobs):
+    jobs.submit("Upgrade all packages", ["sudo", "pacman", "-Syu", "--noconfirm"])
+
+def clean_cache(stdscr, jobs, local_db):
+    """Report what pruning the package cache frees; prune it as a job"""
     stdscr.clear()
     h, w = stdscr.getmaxyx()
-    
-    stdscr.addstr(0, 0, "Upgrading all packages...")
+    stdscr.addstr(0, 0, f"Scanning {pacman_cache.PKG_CACHE}..."[:w-1])
     stdscr.refresh()
-    output = run_command("sudo pacman -Syu --noconfirm")
-    stdscr.addstr(2, 0, output)
+    report = pacman_cache.scan()
+    table = local_db.table()
+    installed = dict(zip(table.package_names, table.versions))
+    keep = pacman_cache.DEFAULT_KEEP
     
-    stdscr.addstr(h-1, 0, "Press any key to continue...")
-    stdscr.getch()
-
-def list_installed_packages(stdscr):
     stdscr.clear()
+    stdscr.addstr(0, 0, (f"Package cache: {len(report.files)} files, {len(report.groups)} packages, "
+                         f"{format_size(report.total_size)}")[:w-1], curses.A_BOLD)
+    draw_status(stdscr, h, w, "+/-: versions to keep  Enter/y: prune  q: back  Scroll: ↑/↓ PgUp/PgDn")
+    view = TextView(3, 0, h - 5, w - 1,
+                    format=lambda f: f"{f.name} {f.version} {f.arch}  {format_size(f.size)}")
+    view.follow = False
+    while True:
+        plan = report.prune_plan(keep, installed)
+        view.set_items(plan)
+        view.invalidate()
+        stdscr.move(1, 0)
+        stdscr.clrtoeol()
+        stdscr.addstr(1, 0, (f"Keeping the last {keep} version(s) and the installed one: "
+                             f"{len(plan)} files, {format_size(sum(f.size for f in plan))} reclaimable")[:w-1])
+        stdscr.noutrefresh()
+        view.render()
+        curses.doupdate()
+        
+        key = stdscr.getch()
+        if key in (ord('+'), ord('=')):
+            keep += 1
+        elif key == ord('-') and keep > 0:
+            keep -= 1
+        elif key in (ord('\n'), ord('y')) and plan:
+            # Only rm runs as root, on the files listed here
+            commands = pacman_cache.removal_commands(plan)
+            for i, argv in enumerate(commands, 1):
+                part = f" {i}/{len(commands)}" if len(commands) > 1 else ""
+                jobs.submit(f"Prune package cache (keep {keep}){part}", argv)
+            break
+        elif key in (ord('q'), 27):
+            break
+        else:
+            view.handle_key(key)
+
+def show_history(stdscr, history):
+    """Page through pacman.log events, following what is appended to it"""
     h, w = stdscr.getmaxyx()
-    
-    stdscr.addstr(0, 0, "Fetching installed packages...")
+    stdscr.clear()
+    stdscr.addstr(0, 0, "Indexing pacman.log..."[:w-1])
     stdscr.refresh()
-    output = run_command("pacman -Qe | awk '{print $1}'")
-    packages = output.splitlines()
+    history.refresh()
     
-    stdscr.clear()
-    stdscr.addstr(0, 0, "Installed Packages (q to return):")
+    def label(i):
+        event = history.event(i)
+        return f"{event.time[:16].replace('T', ' ')}  #{event.transaction:<6} {event.action:<11} {event.name} ({event.versions})"
+    
+    view = TextView(2, 0, h - 4, w - 1, format=label)
+    query = ""
+    events = history.select(query)
+    redraw = True
+    stdscr.timeout(HISTORY_POLL_INTERVAL)
+    try:
+        while True:
+            if redraw:
+                stdscr.clear()
+                view.set_items(events)
+                view.invalidate()
+                header = f"History: {len(events)} of {len(history)} events"
+                if query:
+                    header += f" matching '{query}'"
+                stdscr.addstr(0, 0, header[:w-1], curses.A_BOLD)
+                draw_status(stdscr, h, w, "/: filter (package, action, 2024-03, 2023..2024)  "
+                                          "↑/↓ PgUp/PgDn Home/End  q: back")
+                stdscr.noutrefresh()
+                redraw = False
+            view.render()
+            curses.doupdate()
+            
+            key = stdscr.getch()
+            if key == -1:
+                # Tail the log: only the appended bytes are parsed
+                if history.refresh():
+                    events = history.select(query)
+                    redraw = True
+            elif key == ord('/'):
+                query = read_input(stdscr, h - 2, w, "Filter: ", echo=True).strip()
+                stdscr.timeout(HISTORY_POLL_INTERVAL)
+                events = history.select(query)
+                view.follow = True
+                redraw = True
+            elif key in (ord('q'), 27):
+                break
+            else:
+                view.handle_key(key)
+    finally:
+        stdscr.timeout(-1)
+
+def list_installed_packages(stdscr, local_db, kind=EXPLICIT):
+    h, w = stdscr.getmaxyx()
+    table = local_db.table()
     
-    for idx, pkg in enumerate(packages):
-        if idx < h-2:
-            stdscr.addstr(idx+1, 0, pkg)
+    def label(name):
+        package = table.get(name)
+        return f"{name} {package.version}" if package else name
     
-    stdscr.addstr(h-1, 0, "Press q to return...")
-    while stdscr.getch() != ord('q'):
-        pass
+    view = ListView(1, 0, h - 2, w - 1, highlight=curses.A_REVERSE, format=label)
+    while True:
+        packages = table.names(kind)
+        view.set_items(packages)
+        view.invalidate()
+        stdscr.clear()
+        stdscr.addstr(0, 0, f"Installed Packages: {kind}, {len(packages)} (q to return):"[:w-1])
+        stdscr.addstr(h-1, 0, "Tab: explicit/dependency/all  Press q to return..."[:w-1], curses.A_DIM)
+        stdscr.noutrefresh()
+        
+        while True:
+            view.render()
+            curses.doupdate()
+            key = stdscr.getch()
+            if key in (ord('q'), ord('\t')):
+                break
+            view.handle_key(key)
+        if key == ord('q'):
+            break
+        kind = PACKAGE_FILTERS[(PACKAGE_FILTERS.index(kind) + 1) % len(PACKAGE_FILTERS)]
     
     return packages
 
@@ -145,33 +570,54 @@ def main(stdscr):
     # Inisialisasi warna
     curses.curs_set(0)
     curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE)
+    curses.set_escdelay(25)
     
-    current_row = 0
+    menu = create_menu(stdscr)
+    local_db = LocalDB()
+    sync_index = SyncIndex()
+    history = PacmanLog()
+    rows, columns = output_size(stdscr)
+    jobs = JobQueue(rows, columns)
+    full_redraw = True
     packages = []
     
     while True:
-        display_menu(stdscr, current_row, packages)
+        version = jobs.version
+        display_menu(stdscr, menu, jobs, full_redraw)
+        full_redraw = False
         
-        key = stdscr.getch()
+        key = wait_key(stdscr, jobs, version)
         
-        if key == curses.KEY_UP and current_row > 0:
-            current_row -= 1
-        elif key == curses.KEY_DOWN and current_row < 4:
-            current_row += 1
+        if menu.handle_key(key):
+            pass
         elif key == ord('\n'):
+            current_row = menu.selected
+            full_redraw = True
             if current_row == 0:  # Install
-                install_package(stdscr)
+                install_package(stdscr, jobs, local_db, sync_index)
             elif current_row == 1:  # Remove
-                packages = list_installed_packages(stdscr)
-                remove_package(stdscr, packages)
+                packages = list_installed_packages(stdscr, local_db)
+                remove_package(stdscr, packages, jobs, local_db)
             elif current_row == 2:  # Upgrade
-                upgrade_packages(stdscr)
+                upgrade_packages(jobs)
             elif current_row == 3:  # List
-                packages = list_installed_packages(stdscr)
-            elif current_row == 4:  # Exit
+                packages = list_installed_packages(stdscr, local_db)
+            elif current_row == 4:  # Clean cache
+                clean_cache(stdscr, jobs, local_db)
+            elif current_row == 5:  # History
+                show_history(stdscr, history)
+            elif current_row == 6:  # Jobs
+                show_jobs(stdscr, jobs)
+            elif current_row == 7 and confirm_quit(stdscr, jobs):  # Exit
                 break
         elif key == ord('q'):
-            break
+            full_redraw = True
+            if confirm_quit(stdscr, jobs):
+                break
+    
+    jobs.close()
+    sync_index.close()
+    history.close()
 
 if __name__ == "__main__":
     wrapper(main)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Package cache analyzer and pruner, like paccache -r.
+
+    sudo python3 pacman_cache.py [--keep 3] [--dir /var/cache/pacman/pkg] [--prune]
+
+Without --prune it only reports what would be removed.
+"""
+
+import os
+import re
+import sys
+import argparse
+from functools import cmp_to_key
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from pacman_db import LocalDB
+
+PKG_CACHE = "/var/cache/pacman/pkg"
+DEFAULT_KEEP = 3
+# Entries stat()ed per task; one directory is listed by a single scandir
+STAT_CHUNK = 2048
+# Bytes of paths per rm command line, well below ARG_MAX (usually 2 MiB,
+# shared with the environment)
+MAX_ARGV_BYTES = 128 * 1024
+
+# name-[epoch:]pkgver-pkgrel-arch.pkg.tar[.ext]
+PACKAGE_FILE_RE = re.compile(r'^(.+)-([^-]+)-([^-]+)-([^-]+)\.pkg\.tar(?:\.[A-Za-z0-9]+)?$')
+
+CacheFile = namedtuple('CacheFile', 'name version arch path size')
+
+
+def _split_segment(s, pos, digits):
+    end = pos
+    test = str.isdigit if digits else str.isalpha
+    while end < len(s) and s[end].isascii() and test(s[end]):
+        end += 1
+    return end
+
+
+def _isalnum(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+def rpmvercmp(a, b):
+    """Compare two version segments like libalpm's rpmvercmp: -1, 0 or 1"""
+    if a == b:
+        return 0
+    one = two = 0
+    ptr1 = ptr2 = 0
+    while one < len(a) and two < len(b):
+        while one < len(a) and not _isalnum(a[one]):
+            one += 1
+        while two < len(b) and not _isalnum(b[two]):
+            two += 1
+        if one >= len(a) or two >= len(b):
+            break
+        # Different separator lengths decide on their own
+        if one - ptr1 != two - ptr2:
+            return -1 if one - ptr1 < two - ptr2 else 1
+
+        digits = a[one].isdigit()
+        ptr1 = _split_segment(a, one, digits)
+        ptr2 = _split_segment(b, two, digits)
+        if two == ptr2:
+            # Numeric segments are newer than alphabetic ones
+            return 1 if digits else -1
+
+        seg1, seg2 = a[one:ptr1], b[two:ptr2]
+        if digits:
+            seg1, seg2 = seg1.lstrip('0'), seg2.lstrip('0')
+            if len(seg1) != len(seg2):
+                return 1 if len(seg1) > len(seg2) else -1
+        if seg1 != seg2:
+            return 1 if seg1 > seg2 else -1
+        one, two = ptr1, ptr2
+
+    rest1, rest2 = a[one:], b[two:]
+    if not rest1 and not rest2:
+        return 0
+    # "1.0" < "1.0.1" but "1.0alpha" < "1.0"
+    if (not rest1 and not rest2[0].isalpha()) or (rest1 and rest1[0].isalpha()):
+        return -1
+    return 1
+
+
+def _parse_evr(version):
+    pos = 0
+    while pos < len(version) and version[pos].isdigit():
+        pos += 1
+    if pos < len(version) and version[pos] == ':':
+        epoch, rest = version[:pos] or '0', version[pos + 1:]
+    else:
+        epoch, rest = '0', version
+    ver, sep, rel = rest.rpartition('-')
+    if not sep:
+        return epoch, rest, None
+    return epoch, ver, rel
+
+
+def vercmp(a, b):
+    """Compare two full [epoch:]pkgver[-pkgrel] versions like pacman's vercmp"""
+    if a == b:
+        return 0
+    epoch1, ver1, rel1 = _parse_evr(a)
+    epoch2, ver2, rel2 = _parse_evr(b)
+    result = rpmvercmp(epoch1, epoch2)
+    if result == 0:
+        result = rpmvercmp(ver1, ver2)
+        if result == 0 and rel1 is not None and rel2 is not None:
+            result = rpmvercmp(rel1, rel2)
+    return result
+
+
+def parse_package_file(filename):
+    """Split a package file name into (name, version, arch), or None"""
+    match = PACKAGE_FILE_RE.match(filename)
+    if not match:
+        return None
+    name, pkgver, pkgrel, arch = match.groups()
+    return name, f"{pkgver}-{pkgrel}", arch
+
+
+def _stat_chunk(directory, names):
+    files = []
+    for filename in names:
+        parsed = parse_package_file(filename)
+        if parsed is None:
+            continue
+        path = os.path.join(directory, filename)
+        size = 0
+        for candidate in (path, path + '.sig'):
+            try:
+                size += os.stat(candidate).st_size
+            except OSError:
+                pass
+        files.append(CacheFile(*parsed, path, size))
+    return files
+
+
+class CacheReport:
+    """Cached package files grouped per package and sorted by version.
+
+    prune_plan() keeps the newest keep versions of every package (and the
+    installed one, if given); everything older is a candidate, together
+    with its detached .sig file.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.total_size = sum(f.size for f in files)
+        groups = {}
+        for f in files:
+            groups.setdefault((f.name, f.arch), []).append(f)
+        key = cmp_to_key(vercmp)
+        for versions in groups.values():
+            versions.sort(key=lambda f: key(f.version), reverse=True)
+        self.groups = groups
+
+    def prune_plan(self, keep=DEFAULT_KEEP, installed=None):
+        """Files to remove, oldest versions beyond the newest keep per package"""
+        remove = []
+        for (name, _), versions in self.groups.items():
+            current = installed.get(name) if installed else None
+            remove.extend(f for f in versions[keep:] if f.version != current)
+        return remove
+
+
+def scan(dirs=None, max_workers=8):
+    """Scan package cache directories into a CacheReport.
+
+    Each directory is listed once with scandir; the stat() calls, which
+    is where the time goes on tens of thousands of files, are spread
+    over a thread pool in chunks.
+    """
+    tasks = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for directory in dirs or [PKG_CACHE]:
+            try:
+                with os.scandir(directory) as it:
+                    names = [e.name for e in it if not e.name.endswith('.sig')]
+            except OSError:
+                continue
+            for start in range(0, len(names), STAT_CHUNK):
+                tasks.append(pool.submit(_stat_chunk, directory, names[start:start + STAT_CHUNK]))
+        files = [f for task in tasks for f in task.result()]
+    return CacheReport(files)
+
+
+def prune(files):
+    """Delete the given package files and their signatures; returns (count, bytes)"""
+    removed = freed = 0
+    for f in files:
+        for path in (f.path, f.path + '.sig'):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+        removed += 1
+        freed += f.size
+    return removed, freed
+
+
+def removal_commands(files):
+    """`sudo rm` command lines deleting files and their signatures.
+
+    The plan is made unprivileged; root only runs rm on the explicit
+    paths, split so that no command line gets near ARG_MAX.
+    """
+    commands = []
+    argv = None
+    size = 0
+    for f in files:
+        for path in (f.path, f.path + '.sig'):
+            length = len(os.fsencode(path)) + 1
+            if argv is None or size + length > MAX_ARGV_BYTES:
+                argv = ["sudo", "rm", "-f", "--"]
+                commands.append(argv)
+                size = 0
+            argv.append(path)
+            size += length
+    return commands
+
+
+def installed_versions():
+    """{name: version} of the installed packages, for prune_plan()"""
+    table = LocalDB(cache_path=None).table()
+    return dict(zip(table.package_names, table.versions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report or prune old pacman cache files")
+    parser.add_argument('--dir', action='append', help=f"cache directory (default: {PKG_CACHE})")
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP,
+                        help="versions to keep per package")
+    parser.add_argument('--prune', action='store_true', help="delete instead of only reporting")
+    args = parser.parse_args()
+
+    report = scan(args.dir)
+    plan = report.prune_plan(max(0, args.keep), installed_versions())
+    reclaimable = sum(f.size for f in plan)
+    print(f"{len(report.files)} package files, {len(report.groups)} packages, "
+          f"{report.total_size / 1048576:.1f} MiB")
+    if not args.prune:
+        for f in plan:
+            print(f.path)
+        print(f"{len(plan)} files, {reclaimable / 1048576:.1f} MiB reclaimable")
+        return 0
+    try:
+        removed, freed = prune(plan)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Removed {removed} files, freed {freed / 1048576:.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+import os
+import json
+from array import array
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from theme_index import CACHE_DIR
+
+LOCAL_DB = "/var/lib/pacman/local"
+LOCAL_CACHE_FILE = os.path.join(CACHE_DIR, "pacman-local.json")
+CACHE_VERSION = 1
+
+# Filters of PackageTable.names()
+EXPLICIT = 'explicit'
+DEPENDENCY = 'dependency'
+ALL = 'all'
+
+# %REASON% values of a desc file; a missing %REASON% means explicit
+REASON_EXPLICIT = 0
+REASON_DEPEND = 1
+
+Package = namedtuple('Package', 'name version reason size depends provides')
+
+
+def parse_desc_lines(lines):
+    """Parse the lines of a pacman desc file into {'%FIELD%': [values]}"""
+    fields = {}
+    current = None
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line:
+            current = None
+        elif current is None and line.startswith('%') and line.endswith('%'):
+            current = fields.setdefault(line, [])
+        elif current is not None:
+            current.append(line)
+    return fields
+
+
+def parse_desc(path):
+    """Parse a pacman desc file into {'%FIELD%': [values]}"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return parse_desc_lines(f)
+
+
+def dep_name(dep):
+    """Strip the version constraint from a depends/provides entry"""
+    for i, ch in enumerate(dep):
+        if ch in '<>=:':
+            return dep[:i]
+    return dep
+
+
+def _read_entry(path):
+    try:
+        fields = parse_desc(os.path.join(path, 'desc'))
+    except OSError:
+        return None
+    name = fields.get('%NAME%')
+    if not name:
+        return None
+    try:
+        reason = int(fields.get('%REASON%', ['0'])[0])
+    except ValueError:
+        reason = REASON_EXPLICIT
+    try:
+        size = int(fields.get('%SIZE%', ['0'])[0])
+    except ValueError:
+        size = 0
+    return (name[0], fields.get('%VERSION%', [''])[0], reason, size,
+            tuple(fields.get('%DEPENDS%', ())), tuple(fields.get('%PROVIDES%', ())))
+
+
+class PackageTable:
+    """Installed packages as parallel columns sorted by name.
+
+    Reasons and sizes live in flat arrays and depends/provides in tuples,
+    so a few thousand packages cost a handful of lists rather than one
+    dict per package.
+    """
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda row: row[0])
+        self.package_names = [row[0] for row in rows]
+        self.versions = [row[1] for row in rows]
+        self.reasons = bytearray(min(row[2], 255) for row in rows)
+        self.sizes = array('q', (row[3] for row in rows))
+        self.depends = [row[4] for row in rows]
+        self.provides = [row[5] for row in rows]
+        self.index = {name: i for i, name in enumerate(self.package_names)}
+
+    def __len__(self):
+        return len(self.package_names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def row(self, i):
+        return Package(self.package_names[i], self.versions[i], self.reasons[i],
+                       self.sizes[i], self.depends[i], self.provides[i])
+
+    def get(self, name):
+        i = self.index.get(name)
+        return None if i is None else self.row(i)
+
+    def names(self, kind=ALL):
+        """Package names, optionally only the explicit or dependency ones"""
+        if kind == ALL:
+            return list(self.package_names)
+        wanted = REASON_EXPLICIT if kind == EXPLICIT else REASON_DEPEND
+        reasons = self.reasons
+        return [name for i, name in enumerate(self.package_names) if reasons[i] == wanted]
+
+    def rows(self):
+        return [(self.package_names[i], self.versions[i], self.reasons[i], self.sizes[i],
+                 list(self.depends[i]), list(self.provides[i])) for i in range(len(self))]
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls((name, version, reason, size, tuple(depends), tuple(provides))
+                   for name, version, reason, size, depends, provides in rows)
+
+
+class LocalDB:
+    """Reader of pacman's local database (one <name>-<version>/desc per package).
+
+    Installing, removing or upgrading a package adds or removes an entry
+    directory, which bumps the mtime of the database directory; the table
+    is only read again when that changes. It is kept in memory and in a
+    JSON cache so a fresh start costs one stat() plus the cache read.
+    A reason changed in place with pacman -D does not touch the directory
+    and is picked up with the next install or removal.
+    """
+
+    def __init__(self, root=LOCAL_DB, cache_path=LOCAL_CACHE_FILE, max_workers=8):
+        self.root = root
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.key = None
+        self._table = None
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.root)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_ino, st.st_dev]
+
+    def _load_cache(self, key):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(data, dict) or data.get('version') != CACHE_VERSION
+                or data.get('root') != self.root or data.get('key') != key):
+            return None
+        try:
+            return PackageTable.from_rows(data['packages'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _save_cache(self, key, table):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'root': self.root, 'key': key,
+                           'packages': table.rows()}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _scan(self):
+        try:
+            with os.scandir(self.root) as it:
+                entries = [e.path for e in it if e.is_dir()]
+        except OSError:
+            return PackageTable()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            rows = [row for row in pool.map(_read_entry, entries) if row is not None]
+        return PackageTable(rows)
+
+    def table(self):
+        """Return the PackageTable, rereading the database only if it changed"""
+        key = self._stat_key()
+        if self._table is not None and key == self.key:
+            return self._table
+        table = self._load_cache(key) if key is not None else None
+        if table is None:
+            table = self._scan() if key is not None else PackageTable()
+            if key is not None:
+                self._save_cache(key, table)
+        self.key = key
+        self._table = table
+        return table
+
+    def packages(self, kind=EXPLICIT):
+        return self.table().names(kind)
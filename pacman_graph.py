@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import weakref
+from array import array
+
+from pacman_db import dep_name, REASON_DEPEND
+
+_graphs = weakref.WeakKeyDictionary()
+
+
+def _reverse(n, start, targets):
+    """Transpose a CSR adjacency: count the in-degrees, then fill"""
+    counts = array('I', bytes(4 * (n + 1)))
+    for target in targets:
+        counts[target + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    fill = counts[:n]
+    reverse = array('I', bytes(4 * len(targets)))
+    for source in range(n):
+        for k in range(start[source], start[source + 1]):
+            target = targets[k]
+            reverse[fill[target]] = source
+            fill[target] += 1
+    return counts, reverse
+
+
+class DepGraph:
+    """Dependency graph of the installed packages of a PackageTable.
+
+    Packages are the row numbers of the table. Every %DEPENDS% entry is
+    resolved once, to the package of that name or else to the first one
+    providing it, and the edges are kept in both directions as flat
+    arrays (CSR: the neighbours of i are targets[start[i]:start[i + 1]]),
+    so queries walk integers instead of dicts of strings. The local
+    database stores no %REQUIREDBY%; pacman computes it the same way.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        n = len(table)
+        satisfiers = {}
+        for i, name in enumerate(table.package_names):
+            satisfiers[name] = i
+        for i, provides in enumerate(table.provides):
+            for provided in provides:
+                satisfiers.setdefault(dep_name(provided), i)
+
+        self.unresolved = []
+        start = array('I', [0])
+        targets = array('I')
+        for i, depends in enumerate(table.depends):
+            resolved = set()
+            for dep in depends:
+                target = satisfiers.get(dep_name(dep))
+                if target is None:
+                    self.unresolved.append((i, dep))
+                elif target != i:
+                    resolved.add(target)
+            targets.extend(sorted(resolved))
+            start.append(len(targets))
+        self.dep_start, self.dep_targets = start, targets
+        self.rdep_start, self.rdep_targets = _reverse(n, start, targets)
+
+    def depends(self, i):
+        return self.dep_targets[self.dep_start[i]:self.dep_start[i + 1]]
+
+    def required_by(self, i):
+        return self.rdep_targets[self.rdep_start[i]:self.rdep_start[i + 1]]
+
+    def required_by_count(self, i):
+        return self.rdep_start[i + 1] - self.rdep_start[i]
+
+    def orphans(self):
+        """Packages installed as dependencies that nothing requires (pacman -Qdt)"""
+        reasons = self.table.reasons
+        start = self.rdep_start
+        return [i for i in range(len(self.table))
+                if reasons[i] == REASON_DEPEND and start[i] == start[i + 1]]
+
+    def removal_plan(self, targets, recursive=True):
+        """What removing targets takes with it, like pacman -R/-Rs.
+
+        Returns (removed, broken): removed lists the targets followed by
+        the dependencies -Rs removes as well, i.e. packages installed as
+        dependencies whose every dependent is being removed; broken maps
+        a target to the remaining packages that still require it, which
+        make pacman refuse the transaction.
+        """
+        removing = bytearray(len(self.table))
+        removed = []
+        for i in targets:
+            if not removing[i]:
+                removing[i] = 1
+                removed.append(i)
+
+        if recursive:
+            reasons = self.table.reasons
+            dep_start, dep_targets = self.dep_start, self.dep_targets
+            rdep_start, rdep_targets = self.rdep_start, self.rdep_targets
+            pending = list(removed)
+            while pending:
+                i = pending.pop()
+                for k in range(dep_start[i], dep_start[i + 1]):
+                    d = dep_targets[k]
+                    if removing[d] or reasons[d] != REASON_DEPEND:
+                        continue
+                    # Rechecked whenever another dependent of d joins the set
+                    if all(removing[rdep_targets[r]] for r in range(rdep_start[d], rdep_start[d + 1])):
+                        removing[d] = 1
+                        removed.append(d)
+                        pending.append(d)
+
+        broken = {}
+        for i in removed:
+            users = [r for r in self.required_by(i) if not removing[r]]
+            if users:
+                broken[i] = users
+        return removed, broken
+
+
+def graph_of(table):
+    """The DepGraph of table, built once per PackageTable"""
+    graph = _graphs.get(table)
+    if graph is None:
+        graph = _graphs[table] = DepGraph(table)
+    return graph
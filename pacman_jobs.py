@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import re
+import time
+import select
+import signal
+import threading
+from collections import deque
+
+from pacman_run import StreamingCommand
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Finished jobs kept for the job list; their output goes with them
+MAX_FINISHED = 20
+POLL_INTERVAL = 0.25
+# How long quitting waits for an interrupted job to wind down
+CLOSE_TIMEOUT = 3
+
+PASSWORD_PROMPT_RE = re.compile(r'password.*:\s*$', re.IGNORECASE)
+
+
+class Job:
+    """One queued command and, once started, its StreamingCommand"""
+
+    def __init__(self, job_id, title, argv):
+        self.id = job_id
+        self.title = title
+        self.argv = argv
+        self.state = QUEUED
+        self.command = None
+        self.returncode = None
+        self.error = None
+        self.cancelled = False
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def buffer(self):
+        return self.command.buffer if self.command is not None else None
+
+    @property
+    def progress(self):
+        return self.buffer.progress if self.command is not None else None
+
+    @property
+    def waiting_for_input(self):
+        """True while the open output line looks like a password prompt"""
+        return (self.state == RUNNING and self.command is not None
+                and bool(PASSWORD_PROMPT_RE.search(self.command.buffer.partial)))
+
+    def summary(self):
+        text = f"#{self.id} {self.state:<9} {self.title}"
+        if self.state == RUNNING and self.waiting_for_input:
+            text += "  (waiting for input)"
+        elif self.state == RUNNING and self.progress:
+            text += f"  {self.progress[0] * 100:3.0f}%"
+        elif self.state == FAILED:
+            text += f"  ({self.error or f'exit status {self.returncode}'})"
+        return text
+
+
+class JobQueue:
+    """Runs commands one after another on a worker thread.
+
+    The worker owns the child processes and pumps their output; the UI
+    thread only submits, cancels and draws. Everything shared is guarded
+    by lock, which the UI also holds while it draws a job's buffer, and
+    version is bumped on every change so the UI can poll it from a
+    nodelay/timeout getch() loop and redraw only when something happened.
+    """
+
+    def __init__(self, rows=24, columns=80):
+        self.rows = rows
+        self.columns = columns
+        self.jobs = []
+        self.pending = deque()
+        self.lock = threading.Condition()
+        self.version = 0
+        self.next_id = 1
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="pacman-jobs", daemon=True)
+        self.thread.start()
+
+    def _changed(self):
+        self.version += 1
+        self.lock.notify_all()
+
+    def submit(self, title, argv):
+        """Queue argv to run after every job submitted before it"""
+        with self.lock:
+            job = Job(self.next_id, title, argv)
+            self.next_id += 1
+            self.jobs.append(job)
+            self.pending.append(job)
+            self._prune()
+            self._changed()
+            self.lock.notify()
+        return job
+
+    def _prune(self):
+        finished = [job for job in self.jobs if not job.active]
+        for job in finished[:-MAX_FINISHED]:
+            self.jobs.remove(job)
+
+    def cancel(self, job):
+        """Drop a queued job, or interrupt a running one.
+
+        A running job only ever gets SIGINT, like Ctrl-C: pacman stops at
+        a point where the transaction and db.lck are left consistent,
+        which SIGTERM or SIGKILL in the middle of a commit would not.
+        """
+        with self.lock:
+            if job.state == QUEUED:
+                self.pending.remove(job)
+                job.state = CANCELLED
+                self._changed()
+            elif job.state == RUNNING:
+                job.command.interrupt(signal.SIGINT)
+                job.cancelled = True
+                self._changed()
+
+    def cancel_all(self):
+        with self.lock:
+            for job in list(self.pending):
+                self.cancel(job)
+            for job in self.jobs:
+                if job.state == RUNNING:
+                    self.cancel(job)
+
+    def wait_idle(self, timeout):
+        """Wait until no job is running; False if one still is after timeout"""
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while any(job.state == RUNNING for job in self.jobs):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.lock.wait(remaining)
+        return True
+
+    def send(self, job, data):
+        with self.lock:
+            if job.state == RUNNING:
+                job.command.write(data)
+
+    def active(self):
+        with self.lock:
+            return [job for job in self.jobs if job.active]
+
+    def close(self, cancel=True, timeout=None):
+        """Stop the worker, cancelling what is still queued or running.
+
+        Returns False if a job is still running after timeout; it is not
+        signalled any further but left to finish on its own.
+        """
+        with self.lock:
+            self.closed = True
+            if cancel:
+                self.cancel_all()
+            self.lock.notify_all()
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if not self.pending:
+                    return
+                job = self.pending.popleft()
+                try:
+                    job.command = StreamingCommand(job.argv, self.rows, self.columns)
+                    job.state = RUNNING
+                except OSError as e:
+                    job.state = FAILED
+                    job.error = str(e)
+                self._changed()
+            if job.state == RUNNING:
+                self._pump(job)
+
+    def _pump(self, job):
+        command = job.command
+        while True:
+            # At end of file the pty stays readable; just wait for the exit
+            select.select([] if command.eof else [command], [], [], POLL_INTERVAL)
+            # Reap first, then read, so output written just before the exit
+            # is kept; neither holds the lock the UI draws under
+            exited = command.process.poll() is not None
+            data, eof = command.drain()
+            with self.lock:
+                if command.feed(data, eof or exited):
+                    self._changed()
+                # Everything is read by now, so this only records the status
+                if exited and command.poll() is not None:
+                    job.returncode = command.returncode
+                    if job.cancelled:
+                        job.state = CANCELLED
+                    else:
+                        job.state = DONE if job.returncode == 0 else FAILED
+                    self._changed()
+                    return
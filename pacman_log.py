@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+from collections import namedtuple
+
+from theme_index import CACHE_DIR
+
+PACMAN_LOG = "/var/log/pacman.log"
+LOG_INDEX_FILE = os.path.join(CACHE_DIR, "pacman-log.bin")
+INDEX_MAGIC = b'ARCL'
+# magic, format version, event count, length of the JSON key that follows
+INDEX_HEADER = struct.Struct('<4sIII')
+INDEX_VERSION = 1
+# The start of the log is hashed to notice it was rotated or rewritten
+HEAD_SIZE = 4096
+
+ACTIONS = ('installed', 'upgraded', 'removed', 'downgraded', 'reinstalled')
+# "[2024-01-05T10:22:33+0100] [ALPM] upgraded foo (1.0-1 -> 1.1-1)"; logs
+# older than pacman 5 use "[2012-01-05 10:22]" and may lack the [ALPM] tag
+EVENT_RE = re.compile(rb'^\[([^\]]+)\] (?:\[ALPM\] )?(?:(' + b'|'.join(a.encode() for a in ACTIONS)
+                      + rb') (\S+) \(|(transaction started))', re.MULTILINE)
+DATE_RE = re.compile(r'^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?$')
+
+LogEvent = namedtuple('LogEvent', 'time action name versions transaction')
+
+
+def _date(timestamp):
+    """YYYYMMDD of a log timestamp as an int, 0 if it has no date"""
+    try:
+        return int(timestamp[0:4]) * 10000 + int(timestamp[5:7]) * 100 + int(timestamp[8:10])
+    except ValueError:
+        return 0
+
+
+def date_range(text):
+    """'2024', '2024-03' or '2024-03-05' as an inclusive YYYYMMDD range, or None"""
+    match = DATE_RE.match(text)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    start = int(year) * 10000 + int(month or 1) * 100 + int(day or 1)
+    end = int(year) * 10000 + int(month or 12) * 100 + int(day or 31)
+    return start, end
+
+
+def parse_query(text):
+    """Split a filter like 'linux 2024-03 upgraded' into its parts.
+
+    Dates (or 'FROM..TO' ranges of them) limit the time, action names the
+    kind of event, and every other word matches package names by
+    substring. Returns (words, actions, (first, last) or None).
+    """
+    words, actions = [], []
+    dates = None
+    for word in text.split():
+        if word in ACTIONS:
+            actions.append(word)
+            continue
+        first, sep, last = word.partition('..')
+        if sep:
+            start = date_range(first) if first else (0, 0)
+            end = date_range(last) if last else (0, 99999999)
+            found = (start[0], end[1]) if start and end else None
+        else:
+            found = date_range(word)
+        if found:
+            dates = found
+        else:
+            words.append(word)
+    return words, actions, dates
+
+
+class PacmanLog:
+    """Event index over pacman.log.
+
+    The log is mmapped and scanned for package events, which are kept as
+    parallel arrays: line offset, date, action, package name id and
+    transaction number. The text of an event is only read back from the
+    map when it is shown. The index is saved with the offset up to which
+    it covers the log, so a later refresh() or run only parses the bytes
+    appended since; a log that was rotated, truncated or rewritten (a
+    different inode or head) is indexed again from the start.
+    """
+
+    def __init__(self, path=PACMAN_LOG, index_path=LOG_INDEX_FILE):
+        self.path = path
+        self.index_path = index_path
+        self.map = None
+        self.loaded = False
+        self._reset(None)
+
+    def _reset(self, identity):
+        self.identity = identity
+        self.indexed = 0
+        self.head = None
+        self.transaction = 0
+        self.offsets = array('Q')
+        self.dates = array('I')
+        self.actions = bytearray()
+        self.name_ids = array('I')
+        self.transactions = array('I')
+        self.names = []
+        self.name_index = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _head_digest(self, length):
+        return hashlib.blake2b(self.map[:length], digest_size=16).hexdigest()
+
+    def _key(self):
+        return {'log': self.path, 'identity': self.identity, 'indexed': self.indexed,
+                'head': self.head, 'transaction': self.transaction, 'names': self.names}
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            magic, version, count, key_length = INDEX_HEADER.unpack_from(data, 0)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                return
+            start = INDEX_HEADER.size
+            key = json.loads(data[start:start + key_length])
+            if key['log'] != self.path:
+                return
+            pos = start + key_length
+            columns = {}
+            for name, typecode in (('offsets', 'Q'), ('dates', 'I'), ('name_ids', 'I'),
+                                   ('transactions', 'I')):
+                column = array(typecode)
+                size = column.itemsize * count
+                column.frombytes(data[pos:pos + size])
+                columns[name] = column
+                pos += size
+            actions = bytearray(data[pos:pos + count])
+            if len(actions) != count:
+                return
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return
+        self.identity = key['identity']
+        self.indexed = key['indexed']
+        self.head = key['head']
+        self.transaction = key['transaction']
+        self.names = key['names']
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+        self.actions = actions
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def _save(self):
+        if not self.index_path:
+            return
+        key_data = json.dumps(self._key()).encode('utf-8')
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self), len(key_data)))
+                f.write(key_data)
+                for column in (self.offsets, self.dates, self.name_ids, self.transactions):
+                    f.write(column.tobytes())
+                f.write(self.actions)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _map(self, size):
+        if self.map is not None and len(self.map) == size:
+            return
+        self.close()
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _parse(self, start, end):
+        offsets, dates, actions = self.offsets, self.dates, self.actions
+        name_ids, transactions = self.name_ids, self.transactions
+        names, name_index = self.names, self.name_index
+        codes = {a.encode(): i for i, a in enumerate(ACTIONS)}
+        for match in EVENT_RE.finditer(self.map, start, end):
+            timestamp, action, name, started = match.groups()
+            if started:
+                self.transaction += 1
+                continue
+            name = name.decode('utf-8', 'replace')
+            name_id = name_index.get(name)
+            if name_id is None:
+                name_id = name_index[name] = len(names)
+                names.append(name)
+            offsets.append(match.start())
+            dates.append(_date(timestamp))
+            actions.append(codes[action])
+            name_ids.append(name_id)
+            transactions.append(self.transaction)
+
+    def refresh(self):
+        """Index whatever was appended to the log; returns the new event count"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.close()
+            self._reset(None)
+            return 0
+        identity = [st.st_ino, st.st_dev]
+        if not self.loaded:
+            self.loaded = True
+            self._load()
+        if st.st_size == 0:
+            self.close()
+            self._reset(identity)
+            return 0
+        self._map(st.st_size)
+
+        if (identity != self.identity or st.st_size < self.indexed
+                or (self.head is not None and self.head != self._head_digest(min(HEAD_SIZE, self.indexed)))):
+            self._reset(identity)
+        # Only complete lines; a line being written is picked up next time
+        end = self.map.rfind(b'\n', self.indexed) + 1
+        if end <= self.indexed:
+            return 0
+        before = len(self)
+        self._parse(self.indexed, end)
+        self.indexed = end
+        self.head = self._head_digest(min(HEAD_SIZE, self.indexed))
+        self._save()
+        return len(self) - before
+
+    def event(self, i):
+        offset = self.offsets[i]
+        line = self.map[offset:self.map.find(b'\n', offset)].decode('utf-8', 'replace')
+        timestamp, _, rest = line[1:].partition('] ')
+        if rest.startswith('[ALPM] '):
+            rest = rest[len('[ALPM] '):]
+        _, _, rest = rest.partition(' ')
+        _, _, versions = rest.partition(' ')
+        return LogEvent(timestamp, ACTIONS[self.actions[i]], self.names[self.name_ids[i]],
+                        versions.strip('()'), self.transactions[i])
+
+    def select(self, query=""):
+        """Indices of the events matching a parse_query() filter, in log order"""
+        words, actions, dates = parse_query(query)
+        count = len(self)
+        if not (words or actions or dates):
+            return range(count)
+        # Narrowed one criterion at a time with plain comprehensions
+        selected = range(count)
+        if words:
+            wanted = bytearray(len(self.names))
+            for i, name in enumerate(self.names):
+                if all(word in name for word in words):
+                    wanted[i] = 1
+            ids = self.name_ids
+            selected = [i for i in selected if wanted[ids[i]]]
+        if actions:
+            codes = bytearray(len(ACTIONS))
+            for action in actions:
+                codes[ACTIONS.index(action)] = 1
+            kinds = self.actions
+            selected = [i for i in selected if codes[kinds[i]]]
+        if dates:
+            first, last = dates
+            days = self.dates
+            selected = [i for i in selected if first <= days[i] <= last]
+        return array('I', selected)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import pty
+import fcntl
+import codecs
+import shutil
+import signal
+import struct
+import termios
+import subprocess
+from collections import deque
+
+# Lines of output kept per command; older lines are dropped
+MAX_LINES = 5000
+# A line without a newline (e.g. a redrawn progress bar) is capped too
+MAX_LINE_LENGTH = 4096
+READ_SIZE = 65536
+
+ANSI_RE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[()][0-9A-Za-z])')
+NEWLINE_RE = re.compile(r'\r\n|\n|\r')
+# "(3/12) installing foo   [#####-----]  50%", " foo-1.0  1.2 MiB  3.4 MiB/s 00:01 [###]  80%"
+PROGRESS_RE = re.compile(r'^\s*(?:\(\s*(\d+)/(\d+)\)\s*)?(.*?)\s*\[[^\]]*\]\s*(\d{1,3})%\s*$')
+
+
+def parse_progress(line):
+    """Parse a pacman progress line into (fraction, label), or None"""
+    match = PROGRESS_RE.match(line)
+    if not match:
+        return None
+    step, total, label, percent = match.groups()
+    fraction = min(int(percent), 100) / 100
+    if step and total and int(total) > 0:
+        label = f"({step}/{total}) {label}"
+        fraction = (min(int(step), int(total)) - 1 + fraction) / int(total)
+    return fraction, label.strip()
+
+
+class OutputBuffer:
+    """Bounded terminal output: the last MAX_LINES lines plus the open one.
+
+    A carriage return restarts the open line, which is how pacman redraws
+    its progress bars, so a bar that is redrawn a thousand times still
+    ends up as one line. Indexing covers the kept lines followed by the
+    open line, so the buffer can be shown by a TextView directly.
+    """
+
+    def __init__(self, max_lines=MAX_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = ""
+        self.restart = False
+        self.dropped = 0
+        self.progress = None
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def __len__(self):
+        return len(self.lines) + (1 if self.partial else 0)
+
+    def __getitem__(self, index):
+        if index == len(self.lines) and self.partial:
+            return self.partial
+        return self.lines[index]
+
+    def _text(self, text):
+        if self.restart:
+            self.partial = ""
+            self.restart = False
+        self.partial = (self.partial + text)[-MAX_LINE_LENGTH:]
+        progress = parse_progress(self.partial)
+        if progress is not None:
+            self.progress = progress
+
+    def _end_line(self):
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append(self.partial)
+        self.partial = ""
+        self.restart = False
+
+    def feed(self, data, final=False):
+        """Add raw output bytes"""
+        text = ANSI_RE.sub('', self.decoder.decode(data, final))
+        pos = 0
+        for match in NEWLINE_RE.finditer(text):
+            self._text(text[pos:match.start()])
+            if match.group() == '\r':
+                self.restart = True
+            else:
+                self._end_line()
+            pos = match.end()
+        self._text(text[pos:])
+        if final and self.partial:
+            self._end_line()
+
+
+def _set_window_size(fd, rows, columns):
+    try:
+        fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, columns, 0, 0))
+    except OSError:
+        pass
+
+
+# Execs argv[1:] with stdin, the pty, as controlling terminal so sudo can
+# prompt on it. A preexec_fn could do the same, but it is not safe to use
+# from the job worker thread; login_tty(3) just adds TIOCSCTTY to the new
+# session start_new_session already made.
+CTTY_WRAPPER = "import os, sys; os.login_tty(0); os.execvp(sys.argv[1], sys.argv[1:])"
+
+
+class StreamingCommand:
+    """A child process whose output is read incrementally without blocking.
+
+    The child runs on a pseudo-terminal sized like the output pane, so
+    pacman draws its progress bars and sudo can ask for a password (see
+    write()). If no pty is available it falls back to a plain pipe. Call
+    read() whenever fileno() is readable; the output collects in buffer.
+    """
+
+    def __init__(self, argv, rows=24, columns=80, max_lines=MAX_LINES):
+        self.argv = argv
+        self.buffer = OutputBuffer(max_lines)
+        self.returncode = None
+        try:
+            master, slave = pty.openpty()
+        except OSError:
+            master = slave = None
+
+        try:
+            if master is not None:
+                _set_window_size(master, rows, columns)
+                # The wrapper would only report a missing command as output
+                if shutil.which(argv[0]) is None:
+                    raise FileNotFoundError(f"{argv[0]}: command not found")
+                self.process = subprocess.Popen(
+                    [sys.executable, "-c", CTTY_WRAPPER, *argv],
+                    stdin=slave, stdout=slave, stderr=slave, close_fds=True,
+                    start_new_session=True)
+                os.close(slave)
+                self.fd = master
+            else:
+                self.process = subprocess.Popen(
+                    argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT)
+                self.fd = self.process.stdout.fileno()
+        except OSError:
+            if master is not None:
+                os.close(master)
+                os.close(slave)
+            raise
+        os.set_blocking(self.fd, False)
+        self.eof = False
+
+    def fileno(self):
+        return self.fd
+
+    def drain(self):
+        """Read whatever output is available, leaving buffer alone.
+
+        Returns (data, at_eof) for feed(), so a caller can read the pty
+        without holding the lock that guards the buffer.
+        """
+        chunks = []
+        eof = self.eof
+        while not eof:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                # EIO: the child side of the pty has been closed
+                data = b''
+            if not data:
+                eof = True
+            else:
+                chunks.append(data)
+        return b''.join(chunks), eof
+
+    def feed(self, data, eof=False):
+        """Add output from drain() to the buffer; True if there was any"""
+        if self.eof:
+            return False
+        if data:
+            self.buffer.feed(data)
+        if eof:
+            self.eof = True
+            self.buffer.feed(b'', final=True)
+        return bool(data) or eof
+
+    def read(self):
+        """Move whatever output is available into the buffer; True if any was"""
+        return self.feed(*self.drain())
+
+    def write(self, data):
+        """Send input, e.g. a typed password, to the child's terminal"""
+        if self.fd is None:
+            return
+        try:
+            os.write(self.fd, data)
+        except OSError:
+            pass
+
+    def poll(self):
+        """Return the exit status once the child exited and its output is read.
+
+        Never blocks: a child that closed its output but is still running
+        is just not done yet.
+        """
+        if self.returncode is None:
+            status = self.process.poll()
+            if status is not None:
+                # A daemon started by a hook may keep the pty open after exit
+                self.read()
+                if not self.eof:
+                    self.eof = True
+                    self.buffer.feed(b'', final=True)
+                self.returncode = status
+                self.close()
+        return self.returncode
+
+    def interrupt(self, sig=signal.SIGINT):
+        """Signal the child like Ctrl-C in a terminal would (its whole group)"""
+        if self.process.poll() is not None:
+            return
+        try:
+            if self.process.stdout is None:
+                os.killpg(self.process.pid, sig)
+            else:
+                self.process.send_signal(sig)
+        except OSError:
+            pass
+
+    def terminate(self):
+        self.interrupt(signal.SIGTERM)
+
+    def close(self):
+        if self.fd is not None:
+            if self.process.stdout is None:
+                os.close(self.fd)
+            else:
+                self.process.stdout.close()
+            self.fd = None
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import json
+import mmap
+import bisect
+import struct
+import tarfile
+import subprocess
+from collections import namedtuple
+
+from pacman_db import parse_desc_lines, dep_name
+from theme_index import CACHE_DIR
+
+SYNC_DIR = "/var/lib/pacman/sync"
+SYNC_INDEX_FILE = os.path.join(CACHE_DIR, "sync-index.bin")
+INDEX_MAGIC = b'ARCS'
+# magic, format version, package count, length of the JSON key that follows
+INDEX_HEADER = struct.Struct('<4sIII')
+INDEX_VERSION = 1
+# Offsets are native endian: the index is a local cache, and native u32
+# lets the mmapped tables be searched through memoryview.cast('I')
+OFFSET = struct.Struct('=I')
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+SyncPackage = namedtuple('SyncPackage', 'name version repo desc provides')
+
+
+def sync_dbs(sync_dir=SYNC_DIR):
+    """The repository databases in sync_dir as sorted (repo, path) pairs"""
+    try:
+        with os.scandir(sync_dir) as it:
+            found = [(e.name[:-len('.db')], e.path) for e in it
+                     if e.name.endswith('.db') and e.is_file()]
+    except OSError:
+        return []
+    return sorted(found)
+
+
+def _open_tar(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == ZSTD_MAGIC:
+        # tarfile has no zstd support before Python 3.14
+        try:
+            data = subprocess.run(['zstd', '-dcq', path], stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, check=True).stdout
+        except FileNotFoundError:
+            raise OSError(f"{path} is zstd compressed and the zstd tool is not installed") from None
+        return tarfile.open(fileobj=io.BytesIO(data), mode='r:')
+    return tarfile.open(path, mode='r:*')
+
+
+def read_sync_db(repo, path):
+    """Yield a SyncPackage for every package in one repository database"""
+    with _open_tar(path) as tar:
+        for member in tar:
+            if not member.isfile() or not member.name.endswith('/desc'):
+                continue
+            f = tar.extractfile(member)
+            if f is None:
+                continue
+            fields = parse_desc_lines(f.read().decode('utf-8', 'replace').splitlines())
+            name = fields.get('%NAME%')
+            if not name:
+                continue
+            yield SyncPackage(name[0], fields.get('%VERSION%', [''])[0], repo,
+                              ' '.join(fields.get('%DESC%', [])),
+                              tuple(dep_name(p) for p in fields.get('%PROVIDES%', ())))
+
+
+def _clean(text):
+    return text.replace('\t', ' ').replace('\n', ' ')
+
+
+def write_index(path, key, packages):
+    """Write packages as a sorted, offset-indexed, mmappable table.
+
+    Layout: header, the JSON cache key, a u32 offset table into the names
+    block and one into the records block, the names block ("name\\n" per
+    package, sorted) and the records block ("name\\tversion\\trepo\\tdesc\\t
+    ,provides,\\n"). Prefix lookups bisect the names; substring lookups
+    scan the names block with mmap.find().
+    """
+    packages = sorted(packages, key=lambda p: (p.name, p.repo))
+    key_data = json.dumps(key).encode('utf-8')
+    # Pad so the offset tables are 4-byte aligned
+    key_data += b' ' * (-(INDEX_HEADER.size + len(key_data)) % OFFSET.size)
+    names = [f"{p.name}\n".encode('utf-8') for p in packages]
+    records = [(f"{p.name}\t{p.version}\t{p.repo}\t{_clean(p.desc)}\t"
+                f",{','.join(p.provides)},\n").encode('utf-8') for p in packages]
+
+    tables_start = INDEX_HEADER.size + len(key_data)
+    offset = tables_start + 2 * OFFSET.size * len(packages)
+    name_offsets = []
+    for name in names:
+        name_offsets.append(offset)
+        offset += len(name)
+    record_offsets = []
+    for record in records:
+        record_offsets.append(offset)
+        offset += len(record)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(packages), len(key_data)))
+            f.write(key_data)
+            f.write(struct.pack(f'={len(packages)}I', *name_offsets))
+            f.write(struct.pack(f'={len(packages)}I', *record_offsets))
+            f.write(b''.join(names))
+            f.write(b''.join(records))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SyncTable:
+    """Read-only, mmapped view of an index written by write_index()"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.count, key_length = INDEX_HEADER.unpack_from(self.map, 0)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"{path} is not a sync index")
+            start = INDEX_HEADER.size
+            self.key = json.loads(self.map[start:start + key_length])
+            start += key_length
+            size = OFFSET.size * self.count
+            # Offsets as native u32 sequences that bisect can search directly
+            self.name_offsets = memoryview(self.map)[start:start + size].cast('I')
+            self.record_offsets = memoryview(self.map)[start + size:start + 2 * size].cast('I')
+        except Exception:
+            self.close()
+            raise
+        self.names_start = self.name_offsets[0] if self.count else start + 2 * size
+        self.names_end = self.record_offsets[0] if self.count else self.names_start
+
+    def close(self):
+        for view in ('name_offsets', 'record_offsets'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self.map.close()
+
+    def __len__(self):
+        return self.count
+
+    def name(self, i):
+        start = self.name_offsets[i]
+        return self.map[start:self.map.find(b'\n', start)].decode('utf-8')
+
+    def record(self, i):
+        start = self.record_offsets[i]
+        fields = self.map[start:self.map.find(b'\n', start)].decode('utf-8').split('\t')
+        provides = tuple(p for p in fields[4].split(',') if p)
+        return SyncPackage(fields[0], fields[1], fields[2], fields[3], provides)
+
+    def _name_index(self, pos):
+        """Index of the name whose line contains byte position pos"""
+        return bisect.bisect_right(self.name_offsets, pos) - 1
+
+    def _lower_bound(self, text):
+        key = text.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self.name_offsets[mid]
+            if self.map[start:self.map.find(b'\n', start)] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, name):
+        """Indices of the packages called exactly name (one per repository)"""
+        found = []
+        i = self._lower_bound(name)
+        while i < self.count and self.name(i) == name:
+            found.append(i)
+            i += 1
+        return found
+
+    def prefixed(self, prefix, limit):
+        found = []
+        i = self._lower_bound(prefix)
+        while i < self.count and len(found) < limit:
+            if not self.name(i).startswith(prefix):
+                break
+            found.append(i)
+            i += 1
+        return found
+
+    def containing(self, text, limit, exclude=()):
+        """Indices of names containing text, in name order"""
+        needle = text.encode('utf-8')
+        found = []
+        pos = self.names_start
+        while len(found) < limit:
+            pos = self.map.find(needle, pos, self.names_end)
+            if pos < 0:
+                break
+            i = self._name_index(pos)
+            if i not in exclude and (not found or found[-1] != i):
+                found.append(i)
+            # Continue after this name
+            pos = self.name_offsets[i + 1] if i + 1 < self.count else self.names_end
+        return found
+
+    def providers(self, name):
+        """Indices of the packages providing name"""
+        needle = f",{name},".encode('utf-8')
+        records_end = len(self.map)
+        found = []
+        pos = self.names_end
+        while True:
+            pos = self.map.find(needle, pos, records_end)
+            if pos < 0:
+                return found
+            i = bisect.bisect_right(self.record_offsets, pos) - 1
+            end = self.map.find(b'\n', pos)
+            # Only a hit in the last field, provides, counts; the same text
+            # in a description does not
+            provides_start = self.map.rfind(b'\t', self.record_offsets[i], end) + 1
+            if pos < provides_start:
+                pos = provides_start
+                continue
+            found.append(i)
+            pos = end + 1
+
+    def complete(self, text, limit=20):
+        """Names starting with text first, then names containing it"""
+        text = text.lower()
+        if not text:
+            return []
+        found = self.prefixed(text, limit)
+        if len(found) < limit:
+            found += self.containing(text, limit - len(found), set(found))
+        return found
+
+
+class SyncIndex:
+    """Package index over every repository database in sync_dir.
+
+    The databases are only extracted when one of them was refreshed
+    (pacman -Sy), which is detected from their mtimes and sizes; the
+    result is kept as one mmapped file, so opening it costs a stat() per
+    database and mapping the index. Databases that could not be read are
+    listed in errors, and such an index is built again on the next call.
+    """
+
+    def __init__(self, sync_dir=SYNC_DIR, path=SYNC_INDEX_FILE):
+        self.sync_dir = sync_dir
+        self.path = path
+        self.errors = []
+        self._table = None
+
+    def _key(self):
+        key = []
+        for repo, db_path in sync_dbs(self.sync_dir):
+            try:
+                st = os.stat(db_path)
+            except OSError:
+                continue
+            key.append([repo, st.st_mtime_ns, st.st_size])
+        return {'sync_dir': self.sync_dir, 'dbs': key}
+
+    def table(self):
+        """Return the SyncTable, rebuilding the index if a database changed"""
+        key = self._key()
+        if self._table is not None and self._table.key == key:
+            return self._table
+        if self._table is not None:
+            self._table.close()
+            self._table = None
+
+        try:
+            table = SyncTable(self.path)
+            if table.key == key:
+                self._table = table
+                return table
+            table.close()
+        except (OSError, ValueError):
+            pass
+
+        packages = []
+        self.errors = []
+        for repo, db_path in sync_dbs(self.sync_dir):
+            try:
+                packages.extend(read_sync_db(repo, db_path))
+            except OSError as e:
+                self.errors.append(f"{repo}: {e.strerror or e}")
+            except subprocess.CalledProcessError as e:
+                self.errors.append(f"{repo}: zstd failed with exit status {e.returncode}")
+            except tarfile.TarError as e:
+                self.errors.append(f"{repo}: {str(e).splitlines()[0]}")
+        # An incomplete index must not pass for the databases' contents
+        write_index(self.path, None if self.errors else key, packages)
+        self._table = SyncTable(self.path)
+        return self._table
+
+    def close(self):
+        if self._table is not None:
+            self._table.close()
+            self._table = None
@@ -1,168 +1,191 @@
 #!/usr/bin/env python3
 
-import os
 import sys
-import subprocess
-import configparser
+import bisect
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QComboBox, QPushButton, 
-                             QMessageBox, QListWidget)
-from PyQt5.QtCore import Qt
+                             QMessageBox, QListView, QLineEdit, QInputDialog)
+from PyQt5.QtCore import (Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel,
+                          QSocketNotifier, QTimer)
+from PyQt5.QtGui import QIcon
 
-class ThemeManager:
-    def __init__(self):
-        # Direktori tema
-        self.gtk_themes_dir = "/usr/share/themes"
-        self.icon_themes_dir = "/usr/share/icons"
-        self.kvantum_themes_dir = os.path.expanduser("~/.config/Kvantum")
-        
-        # File konfigurasi
-        self.gtk3_settings_file = os.path.expanduser("~/.config/gtk-3.0/settings.ini")
-        self.gtk4_settings_file = os.path.expanduser("~/.config/gtk-4.0/settings.ini")
-        self.qt_settings_file = os.path.expanduser("~/.config/qt5ct/qt5ct.conf")
-        self.kde_globals_file = os.path.expanduser("~/.config/kdeglobals")
-        
-        # Daftar tema
-        self.gtk_themes = self._get_themes(self.gtk_themes_dir)
-        self.icon_themes = self._get_themes(self.icon_themes_dir)
-        self.kvantum_themes = self._get_kvantum_themes()
-        self.current_theme = self._get_current_theme()
+from theme_manager import ThemeManager
 
-    def _get_themes(self, theme_dir):
-        try:
-            return [d for d in os.listdir(theme_dir) 
-                   if os.path.isdir(os.path.join(theme_dir, d)) and not d.startswith('.')]
-        except FileNotFoundError:
-            return []
+class ThemeListModel(QAbstractListModel):
+    """Theme lists of a ThemeManager as one lazily populated model.
 
-    def _get_kvantum_themes(self):
-        themes = []
-        if os.path.exists(self.kvantum_themes_dir):
-            for theme in os.listdir(self.kvantum_themes_dir):
-                if theme.endswith('.kvconfig') and theme != "Default.kvconfig":
-                    themes.append(theme.replace('.kvconfig', ''))
-        return themes
+    Rows are (kind, name) pairs addressed through the ThemeManager's lists
+    directly; views only get rows in BATCH_SIZE chunks as they scroll, so
+    no per-theme objects are allocated up front. kinds limits the model to
+    some of the lists: a single-kind model shows bare names and backs a
+    combo box, and loading it never touches the other kinds' rows.
+    """
+    KindRole = Qt.UserRole + 1
+    NameRole = Qt.UserRole + 2
+    BATCH_SIZE = 256
+    KINDS = [('gtk', "GTK", 'gtk_themes'),
+             ('kvantum', "Kvantum", 'kvantum_themes'),
+             ('icon', "Icon", 'icon_themes'),
+             ('cursor', "Cursor", 'cursor_themes')]
 
-    def _get_current_theme(self):
-        current = {'gtk': '', 'kvantum': '', 'icon': ''}
-        
-        # Get GTK theme
-        if os.path.exists(self.gtk3_settings_file):
-            config = configparser.ConfigParser()
-            config.read(self.gtk3_settings_file)
-            if 'Settings' in config and 'gtk-theme-name' in config['Settings']:
-                current['gtk'] = config['Settings']['gtk-theme-name']
-        
-        # Get Kvantum theme
-        kvantum_config = os.path.expanduser("~/.config/Kvantum/kvantum.kvconfig")
-        if os.path.exists(kvantum_config):
-            config = configparser.ConfigParser()
-            config.read(kvantum_config)
-            if 'General' in config and 'theme' in config['General']:
-                current['kvantum'] = config['General']['theme']
-        
-        # Get icon theme
-        if os.path.exists(self.kde_globals_file):
-            config = configparser.ConfigParser()
-            config.read(self.kde_globals_file)
-            if 'Icons' in config and 'Theme' in config['Icons']:
-                current['icon'] = config['Icons']['Theme']
-        
-        return current
+    def __init__(self, theme_manager, kinds=None, parent=None):
+        super().__init__(parent)
+        self.theme_manager = theme_manager
+        self.kinds = [entry for entry in self.KINDS if kinds is None or entry[0] in kinds]
+        self.labelled = len(self.kinds) > 1
+        self.loaded = 0
+        self._pending_row = None
+        self._starts = None
 
-    def apply_theme(self, gtk_theme, kvantum_theme, icon_theme):
-        # Apply GTK themes
-        if gtk_theme and gtk_theme in self.gtk_themes:
-            self._write_gtk_settings(3, gtk_theme, icon_theme)
-            self._write_gtk_settings(4, gtk_theme, icon_theme)
-        
-        # Apply Kvantum theme
-        if kvantum_theme and kvantum_theme in self.kvantum_themes:
-            self._write_kvantum_settings(kvantum_theme)
-            self._write_qt_settings(kvantum_theme)
-        
-        # Apply icon theme
-        if icon_theme and icon_theme in self.icon_themes:
-            self._write_kde_settings(icon_theme)
-        
-        # Update environment
-        subprocess.run(['gsettings', 'set', 'org.gnome.desktop.interface', 'gtk-theme', gtk_theme], check=False)
-        subprocess.run(['gsettings', 'set', 'org.gnome.desktop.interface', 'icon-theme', icon_theme], check=False)
-        subprocess.run(['qt5ct', '--apply'], check=False)
-        
-        return "Theme applied successfully!\nYou may need to restart applications to see changes."
+    def _lists(self):
+        """[(start row, kind, label, themes)], cached until a list changes"""
+        if self._starts is None:
+            self._starts = []
+            offset = 0
+            for kind, label, attr in self.kinds:
+                themes = getattr(self.theme_manager, attr)
+                self._starts.append((offset, kind, label, themes))
+                offset += len(themes)
+        return self._starts
 
-    def _write_gtk_settings(self, gtk_version, theme_name, icon_theme=None):
-        config = configparser.ConfigParser()
-        config.optionxform = str
-        
-        settings_file = self.gtk3_settings_file if gtk_version == 3 else self.gtk4_settings_file
-        os.makedirs(os.path.dirname(settings_file), exist_ok=True)
-        
-        if os.path.exists(settings_file):
-            config.read(settings_file)
-        
-        if 'Settings' not in config:
-            config['Settings'] = {}
-        
-        config['Settings']['gtk-theme-name'] = theme_name
-        if icon_theme:
-            config['Settings']['gtk-icon-theme-name'] = icon_theme
-        
-        with open(settings_file, 'w') as f:
-            config.write(f)
+    def _total(self):
+        start, _, _, themes = self._lists()[-1]
+        return start + len(themes)
 
-    def _write_kvantum_settings(self, theme_name):
-        config_path = os.path.expanduser("~/.config/Kvantum/kvantum.kvconfig")
-        os.makedirs(os.path.dirname(config_path), exist_ok=True)
-        
-        config = configparser.ConfigParser()
-        config.optionxform = str
-        
-        if os.path.exists(config_path):
-            config.read(config_path)
-        
-        if 'General' not in config:
-            config['General'] = {}
-        
-        config['General']['theme'] = theme_name
-        
-        with open(config_path, 'w') as f:
-            config.write(f)
+    def _entry(self, row):
+        lists = self._lists()
+        # At most four lists, so this is constant time
+        i = bisect.bisect_right([start for start, _, _, _ in lists], row) - 1
+        start, kind, label, themes = lists[i]
+        if row - start >= len(themes):
+            return None
+        return kind, label, themes[row - start]
+
+    def _offset(self, kind):
+        for start, list_kind, _, _ in self._lists():
+            if list_kind == kind:
+                return start
+        return None
 
-    def _write_qt_settings(self, theme_name):
-        if not os.path.exists(self.qt_settings_file):
+    def row_of(self, kind, name):
+        """Source row of a theme, or -1 if it is not listed"""
+        for start, list_kind, _, themes in self._lists():
+            if list_kind != kind:
+                continue
+            # The lists are sorted case-insensitively
+            index = bisect.bisect_left(themes, name.lower(), key=str.lower)
+            while index < len(themes) and themes[index].lower() == name.lower():
+                if themes[index] == name:
+                    return start + index
+                index += 1
+            return -1
+        return -1
+
+    def ensure_loaded(self, row):
+        """Fetch batches until row exists"""
+        while row >= self.loaded and self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    # Observer interface of ThemeManager.apply_watch_events
+    def themes_about_to_change(self, kind, action, index):
+        self._pending_row = None
+        offset = self._offset(kind)
+        if offset is None:
             return
-        
-        config = configparser.ConfigParser()
-        config.optionxform = str
-        config.read(self.qt_settings_file)
-        
-        if 'appearance' not in config:
-            config['appearance'] = {}
-        
-        config['appearance']['style'] = 'kvantum'
-        config['appearance']['color_scheme_path'] = ''
-        
-        with open(self.qt_settings_file, 'w') as f:
-            config.write(f)
+        row = offset + index
+        if row >= self.loaded:
+            return
+        self._pending_row = row
+        if action == 'add':
+            self.beginInsertRows(QModelIndex(), row, row)
+        else:
+            self.beginRemoveRows(QModelIndex(), row, row)
 
-    def _write_kde_settings(self, icon_theme):
-        config = configparser.ConfigParser()
-        config.optionxform = str
-        
-        if os.path.exists(self.kde_globals_file):
-            config.read(self.kde_globals_file)
-        
-        if 'Icons' not in config:
-            config['Icons'] = {}
-        
-        config['Icons']['Theme'] = icon_theme
-        
-        with open(self.kde_globals_file, 'w') as f:
-            config.write(f)
+    def themes_changed(self, kind, action, index):
+        if self._offset(kind) is None:
+            return
+        self._starts = None
+        if self._pending_row is None:
+            return
+        if action == 'add':
+            self.loaded += 1
+            self.endInsertRows()
+        else:
+            self.loaded -= 1
+            self.endRemoveRows()
+        self._pending_row = None
+
+    def reload(self):
+        self.beginResetModel()
+        self.loaded = 0
+        self._starts = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < self._total()
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(self.BATCH_SIZE, self._total() - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        entry = self._entry(index.row())
+        if entry is None:
+            return None
+        kind, label, name = entry
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return f"{label}: {name}" if self.labelled else name
+        if role == self.KindRole:
+            return kind
+        if role == self.NameRole:
+            return name
+        return None
+
+class ThemeModelGroup:
+    """Passes ThemeManager list changes on to several ThemeListModels"""
+
+    def __init__(self, models):
+        self.models = models
+
+    def themes_about_to_change(self, kind, action, index):
+        for model in self.models:
+            model.themes_about_to_change(kind, action, index)
+
+    def themes_changed(self, kind, action, index):
+        for model in self.models:
+            model.themes_changed(kind, action, index)
+
+    def reload(self):
+        for model in self.models:
+            model.reload()
+
+class ThemeFilterModel(QSortFilterProxyModel):
+    """Case-insensitive filtering and sorting proxy over a ThemeListModel"""
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setSortCaseSensitivity(Qt.CaseInsensitive)
 
 class ThemePreviewWidget(QWidget):
+    PREVIEW_ICONS = ["folder", "user-home", "text-x-generic", "utilities-terminal",
+                     "web-browser", "preferences-system", "edit-delete", "image-x-generic"]
+    PREVIEW_SIZE = 32
+    WATCH_POLL_INTERVAL = 2000
+    WATCH_FLUSH_INTERVAL = 350
+    
     def __init__(self, theme_manager):
         super().__init__()
         self.theme_manager = theme_manager
@@ -170,77 +193,216 @@ class ThemePreviewWidget(QWidget):
         
     def init_ui(self):
         layout = QVBoxLayout()
+        # The preview lists every kind; each combo gets a model of its own
+        self.theme_model = ThemeListModel(self.theme_manager, parent=self)
+        self.combo_models = {kind: ThemeListModel(self.theme_manager, [kind], self)
+                             for kind, _, _ in ThemeListModel.KINDS}
+        self.theme_models = ThemeModelGroup([self.theme_model] + list(self.combo_models.values()))
         
         # GTK Theme Selection
         gtk_layout = QHBoxLayout()
         gtk_layout.addWidget(QLabel("GTK Theme:"))
-        self.gtk_combo = QComboBox()
-        self.gtk_combo.addItems(self.theme_manager.gtk_themes)
-        if self.theme_manager.current_theme['gtk'] in self.theme_manager.gtk_themes:
-            self.gtk_combo.setCurrentText(self.theme_manager.current_theme['gtk'])
+        self.gtk_combo = self._create_theme_combo('gtk')
         gtk_layout.addWidget(self.gtk_combo)
         layout.addLayout(gtk_layout)
         
         # Kvantum Theme Selection
         kvantum_layout = QHBoxLayout()
         kvantum_layout.addWidget(QLabel("Kvantum Theme:"))
-        self.kvantum_combo = QComboBox()
-        self.kvantum_combo.addItems(self.theme_manager.kvantum_themes)
-        if self.theme_manager.current_theme['kvantum'] in self.theme_manager.kvantum_themes:
-            self.kvantum_combo.setCurrentText(self.theme_manager.current_theme['kvantum'])
+        self.kvantum_combo = self._create_theme_combo('kvantum')
         kvantum_layout.addWidget(self.kvantum_combo)
         layout.addLayout(kvantum_layout)
         
         # Icon Theme Selection
         icon_layout = QHBoxLayout()
         icon_layout.addWidget(QLabel("Icon Theme:"))
-        self.icon_combo = QComboBox()
-        self.icon_combo.addItems(self.theme_manager.icon_themes)
-        if self.theme_manager.current_theme['icon'] in self.theme_manager.icon_themes:
-            self.icon_combo.setCurrentText(self.theme_manager.current_theme['icon'])
+        self.icon_combo = self._create_theme_combo('icon')
         icon_layout.addWidget(self.icon_combo)
         layout.addLayout(icon_layout)
         
+        # Icon Preview
+        preview_layout = QHBoxLayout()
+        self.icon_preview_labels = []
+        for icon_name in self.PREVIEW_ICONS:
+            label = QLabel()
+            label.setFixedSize(self.PREVIEW_SIZE, self.PREVIEW_SIZE)
+            label.setToolTip(icon_name)
+            preview_layout.addWidget(label)
+            self.icon_preview_labels.append(label)
+        preview_layout.addStretch()
+        layout.addLayout(preview_layout)
+        self.icon_combo.currentTextChanged.connect(self.update_icon_preview)
+        self.update_icon_preview(self.icon_combo.currentText())
+        
+        # Cursor Theme Selection
+        cursor_layout = QHBoxLayout()
+        cursor_layout.addWidget(QLabel("Cursor Theme:"))
+        self.cursor_combo = self._create_theme_combo('cursor')
+        cursor_layout.addWidget(self.cursor_combo)
+        layout.addLayout(cursor_layout)
+        
         # Apply Button
         self.apply_button = QPushButton("Apply Theme")
         self.apply_button.clicked.connect(self.apply_theme)
         layout.addWidget(self.apply_button)
         
+        # Profiles
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Profile:"))
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(self.theme_manager.profile_store.names())
+        profile_layout.addWidget(self.profile_combo, 1)
+        self.switch_profile_button = QPushButton("Switch")
+        self.switch_profile_button.clicked.connect(self.switch_profile)
+        profile_layout.addWidget(self.switch_profile_button)
+        self.save_profile_button = QPushButton("Save Current...")
+        self.save_profile_button.clicked.connect(self.save_profile)
+        profile_layout.addWidget(self.save_profile_button)
+        self.delete_profile_button = QPushButton("Delete")
+        self.delete_profile_button.clicked.connect(self.delete_profile)
+        profile_layout.addWidget(self.delete_profile_button)
+        layout.addLayout(profile_layout)
+        self.update_profile_buttons()
+        
         # Theme Preview Area
-        self.preview_list = QListWidget()
-        self.preview_list.setSelectionMode(QListWidget.NoSelection)
+        self.preview_proxy = ThemeFilterModel(self.theme_model, self)
+        self.preview_proxy.sort(0)
+        self.preview_filter = QLineEdit()
+        self.preview_filter.setPlaceholderText("Filter themes...")
+        self.preview_filter.textChanged.connect(self.preview_proxy.setFilterFixedString)
+        self.preview_list = QListView()
+        self.preview_list.setSelectionMode(QListView.NoSelection)
+        self.preview_list.setUniformItemSizes(True)
+        self.preview_list.setModel(self.preview_proxy)
         layout.addWidget(QLabel("Available Themes:"))
+        layout.addWidget(self.preview_filter)
         layout.addWidget(self.preview_list)
         
-        self.update_preview_list()
         self.setLayout(layout)
+        self.start_watching()
+    
+    def _create_theme_combo(self, kind):
+        combo = QComboBox()
+        combo.setModel(self.combo_models[kind])
+        
+        # Only fetch as far as the row of the current (or else first) theme
+        themes = getattr(self.theme_manager, f"{kind}_themes")
+        current = self.theme_manager.current_theme[kind]
+        if current not in themes:
+            current = themes[0] if themes else None
+        self._select_theme(combo, kind, current)
+        return combo
+    
+    def _select_theme(self, combo, kind, name):
+        model = self.combo_models[kind]
+        row = model.row_of(kind, name) if name else -1
+        if row >= 0:
+            model.ensure_loaded(row)
+            combo.setCurrentIndex(row)
+    
+    def update_icon_preview(self, icon_theme):
+        icon_index = self.theme_manager.icon_index
+        for icon_name, label in zip(self.PREVIEW_ICONS, self.icon_preview_labels):
+            found = icon_index.lookup(icon_theme, icon_name, self.PREVIEW_SIZE) if icon_theme else None
+            if found:
+                pixmap = QIcon(found[2]).pixmap(self.PREVIEW_SIZE, self.PREVIEW_SIZE)
+                label.setPixmap(pixmap)
+                label.setToolTip(f"{icon_name} ({found[0]})")
+            else:
+                label.clear()
+                label.setToolTip(f"{icon_name} (missing)")
+        icon_index.save()
     
     def update_preview_list(self):
-        self.preview_list.clear()
-        
-        # Add GTK themes
-        self.preview_list.addItem("=== GTK Themes ===")
-        for theme in self.theme_manager.gtk_themes:
-            self.preview_list.addItem(f"GTK: {theme}")
-        
-        # Add Kvantum themes
-        self.preview_list.addItem("\n=== Kvantum Themes ===")
-        for theme in self.theme_manager.kvantum_themes:
-            self.preview_list.addItem(f"Kvantum: {theme}")
-        
-        # Add Icon themes
-        self.preview_list.addItem("\n=== Icon Themes ===")
-        for theme in self.theme_manager.icon_themes:
-            self.preview_list.addItem(f"Icon: {theme}")
+        self.theme_models.reload()
+    
+    def start_watching(self):
+        """Follow theme installs and removals while the window is open"""
+        self.watcher = self.theme_manager.watch()
+        if self.watcher.uses_inotify:
+            self.watch_notifier = QSocketNotifier(self.watcher.fileno(), QSocketNotifier.Read, self)
+            self.watch_notifier.activated.connect(self.on_watch_activity)
+        else:
+            self.watch_poll_timer = QTimer(self)
+            self.watch_poll_timer.timeout.connect(self.on_watch_activity)
+            self.watch_poll_timer.start(self.WATCH_POLL_INTERVAL)
+        
+        # Bursts are applied once they have been quiet for a moment
+        self.watch_flush_timer = QTimer(self)
+        self.watch_flush_timer.setSingleShot(True)
+        self.watch_flush_timer.timeout.connect(self.flush_watch_events)
+    
+    def on_watch_activity(self, *args):
+        self.watcher.poll()
+        if self.watcher.pending and not self.watch_flush_timer.isActive():
+            self.watch_flush_timer.start(self.WATCH_FLUSH_INTERVAL)
+    
+    def flush_watch_events(self):
+        events = self.watcher.take()
+        if not events:
+            if self.watcher.pending:
+                self.watch_flush_timer.start(self.WATCH_FLUSH_INTERVAL)
+            return
+        changes = self.theme_manager.apply_watch_events(events, self.theme_models)
+        if any(kind == 'icon' and name == self.icon_combo.currentText() for kind, name, _ in changes):
+            self.update_icon_preview(self.icon_combo.currentText())
     
     def apply_theme(self):
         gtk_theme = self.gtk_combo.currentText()
         kvantum_theme = self.kvantum_combo.currentText()
         icon_theme = self.icon_combo.currentText()
+        cursor_theme = self.cursor_combo.currentText()
         
-        result = self.theme_manager.apply_theme(gtk_theme, kvantum_theme, icon_theme)
+        result = self.theme_manager.apply_theme(gtk_theme, kvantum_theme, icon_theme, cursor_theme)
         QMessageBox.information(self, "Theme Applied", result)
 
+    def update_profile_buttons(self):
+        has_profile = self.profile_combo.count() > 0
+        self.switch_profile_button.setEnabled(has_profile)
+        self.delete_profile_button.setEnabled(has_profile)
+    
+    def reload_profiles(self, current=None):
+        self.profile_combo.clear()
+        self.profile_combo.addItems(self.theme_manager.profile_store.names())
+        if current:
+            self.profile_combo.setCurrentText(current)
+        self.update_profile_buttons()
+    
+    def save_profile(self):
+        name, ok = QInputDialog.getText(self, "Save Profile",
+                                        "Save the currently applied themes as:",
+                                        text=self.profile_combo.currentText())
+        name = name.strip()
+        if not ok or not name:
+            return
+        result = self.theme_manager.save_profile(name)
+        self.reload_profiles(name)
+        QMessageBox.information(self, "Profile Saved", result)
+    
+    def switch_profile(self):
+        name = self.profile_combo.currentText()
+        if not name:
+            return
+        result = self.theme_manager.switch_profile(name)
+        current = self.theme_manager.current_theme
+        for kind, combo in (('gtk', self.gtk_combo), ('kvantum', self.kvantum_combo),
+                            ('icon', self.icon_combo), ('cursor', self.cursor_combo)):
+            self._select_theme(combo, kind, current.get(kind))
+        QMessageBox.information(self, "Profile Switched", result)
+    
+    def delete_profile(self):
+        name = self.profile_combo.currentText()
+        if not name:
+            return
+        reply = QMessageBox.question(self, "Delete Profile", f"Delete profile '{name}'?")
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            self.theme_manager.profile_store.delete(name)
+        except OSError as e:
+            QMessageBox.warning(self, "Delete Profile", f"Error: {e}")
+        self.reload_profiles()
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import os
+import json
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                         "arc-config")
+INDEX_FILE = os.path.join(CACHE_DIR, "theme-index.json")
+INDEX_VERSION = 1
+
+
+def _data_home():
+    return os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+
+
+def _data_dirs():
+    dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    return [d for d in dirs.split(":") if d]
+
+
+def _unique(paths):
+    seen = set()
+    result = []
+    for path in paths:
+        path = os.path.normpath(path)
+        if path not in seen:
+            seen.add(path)
+            result.append(path)
+    return result
+
+
+def gtk_theme_roots():
+    """Directories searched for GTK themes, highest priority first"""
+    roots = [os.path.expanduser("~/.themes"), os.path.join(_data_home(), "themes")]
+    roots += [os.path.join(d, "themes") for d in _data_dirs()]
+    return _unique(roots + ["/usr/share/themes"])
+
+
+def icon_theme_roots():
+    """Directories searched for icon and cursor themes, highest priority first"""
+    roots = [os.path.expanduser("~/.icons"), os.path.join(_data_home(), "icons")]
+    roots += [os.path.join(d, "icons") for d in _data_dirs()]
+    return _unique(roots + ["/usr/share/icons"])
+
+
+def scan_dirs(root):
+    """List visible subdirectories of root"""
+    with os.scandir(root) as it:
+        return [e.name for e in it if not e.name.startswith('.') and e.is_dir()]
+
+
+def scan_kvconfigs(root):
+    """List Kvantum theme names from the *.kvconfig files in root"""
+    with os.scandir(root) as it:
+        return [e.name[:-len('.kvconfig')] for e in it
+                if e.name.endswith('.kvconfig') and e.name != "Default.kvconfig"]
+
+
+class ThemeIndex:
+    """On-disk cache of theme directory listings.
+
+    Every root is stored together with the mtime/inode of the directory at
+    scan time. Adding, removing or renaming a theme bumps the mtime of its
+    root, so only roots whose key changed are listed again; a warm start
+    costs one stat() per root.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.entries = self._load()
+        self.dirty = False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            return {}
+        return data.get('roots', {})
+
+    def save(self):
+        """Write the index back if anything was rescanned"""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'roots': self.entries}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            # The cache is only an optimisation, never fail because of it
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _stat_key(root):
+        try:
+            st = os.stat(root)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_ino, st.st_dev]
+
+    def list_root(self, root, scan=scan_dirs):
+        """Return the names found in root, rescanning only if it changed"""
+        cache_key = f"{scan.__name__}:{root}"
+        key = self._stat_key(root)
+        cached = self.entries.get(cache_key)
+        if key is None:
+            if cached is not None:
+                del self.entries[cache_key]
+                self.dirty = True
+            return []
+        if cached is not None and cached.get('key') == key:
+            return cached['names']
+        try:
+            names = scan(root)
+        except OSError:
+            names = []
+        self.entries[cache_key] = {'key': key, 'names': names}
+        self.dirty = True
+        return names
+
+    def invalidate(self, root, scan=scan_dirs):
+        """Drop the cached listing of root so it is listed again next time"""
+        if self.entries.pop(f"{scan.__name__}:{root}", None) is not None:
+            self.dirty = True
+
+    def locate(self, roots, scan=scan_dirs):
+        """Map every name to the directories providing it, in root priority order"""
+        found = {}
+        for root in roots:
+            for name in self.list_root(root, scan):
+                found.setdefault(name, []).append(os.path.join(root, name))
+        return found
+
+    def themes(self, roots, scan=scan_dirs):
+        """Merge the listings of several roots into one sorted name list"""
+        names = set()
+        for root in roots:
+            names.update(self.list_root(root, scan))
+        return sorted(names, key=str.lower)
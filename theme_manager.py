@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import os
+import configparser
+
+from config_txn import ConfigTransaction
+from desktop_settings import get_backend
+from icon_index import IconIndex, ICON_INDEX_DIR
+from theme_index import (ThemeIndex, CACHE_DIR, INDEX_FILE, gtk_theme_roots,
+                         icon_theme_roots, scan_kvconfigs)
+from theme_profiles import ProfileStore, PROFILES_FILE
+from theme_validate import (ThemeValidator, VERDICT_FILE, theme_dirs, themes_of_kind,
+                            GTK, ICONS, CURSORS)
+from theme_watch import apply_events, watch_roots
+
+RELOAD_COMMANDS = [['qt5ct', '--apply']]
+
+
+class ThemeManager:
+    """Theme lists and config files shared by theme.py and theme-gui.py.
+
+    Every location can be overridden: theme roots, the config directory the
+    settings files live in, the cache directory and the profiles file. The
+    defaults are the user's real ones; bench.py points them at fixtures.
+    """
+
+    def __init__(self, settings_backend=None, gtk_roots=None, icon_roots=None,
+                 config_dir=None, cache_dir=CACHE_DIR, profiles_file=PROFILES_FILE):
+        config_dir = config_dir or os.path.expanduser("~/.config")
+        
+        # Direktori tema
+        self.gtk_theme_roots = gtk_roots if gtk_roots is not None else gtk_theme_roots()
+        self.icon_theme_roots = icon_roots if icon_roots is not None else icon_theme_roots()
+        self.kvantum_themes_dir = os.path.join(config_dir, "Kvantum")
+        
+        # File konfigurasi
+        self.gtk3_settings_file = os.path.join(config_dir, "gtk-3.0", "settings.ini")
+        self.gtk4_settings_file = os.path.join(config_dir, "gtk-4.0", "settings.ini")
+        self.qt_settings_file = os.path.join(config_dir, "qt5ct", "qt5ct.conf")
+        self.kde_globals_file = os.path.join(config_dir, "kdeglobals")
+        self.kvantum_config_file = os.path.join(config_dir, "Kvantum", "kvantum.kvconfig")
+        
+        # Daftar tema
+        self.cache_dir = cache_dir
+        self.theme_index = ThemeIndex(os.path.join(cache_dir, os.path.basename(INDEX_FILE)))
+        self.theme_validator = ThemeValidator(os.path.join(cache_dir, os.path.basename(VERDICT_FILE)))
+        self._get_themes()
+        self.kvantum_themes = self._get_kvantum_themes()
+        self.theme_index.save()
+        self.theme_validator.save()
+        
+        # gsettings/dconf writer
+        self.settings_backend = settings_backend or get_backend()
+        self.current_theme = self._get_current_theme()
+        self.profile_store = ProfileStore(profiles_file)
+
+    def _get_themes(self):
+        # Klasifikasi direktori tema, bukan sekadar daftar direktori
+        self.gtk_theme_dirs = self.theme_index.locate(self.gtk_theme_roots)
+        self.icon_theme_dirs = self.theme_index.locate(self.icon_theme_roots)
+        self.theme_verdicts = self.theme_validator.classify(
+            theme_dirs(self.gtk_theme_dirs, self.icon_theme_dirs))
+        self.gtk_themes = themes_of_kind(self.gtk_theme_dirs, self.theme_verdicts, GTK)
+        self.icon_themes = themes_of_kind(self.icon_theme_dirs, self.theme_verdicts, ICONS)
+        self.cursor_themes = themes_of_kind(self.icon_theme_dirs, self.theme_verdicts, CURSORS)
+        self.icon_index = IconIndex(self.icon_theme_dirs,
+                                    os.path.join(self.cache_dir, os.path.basename(ICON_INDEX_DIR)))
+
+    def _get_kvantum_themes(self):
+        return self.theme_index.themes([self.kvantum_themes_dir], scan_kvconfigs)
+
+    def watch(self):
+        return watch_roots(self)
+
+    def apply_watch_events(self, events, observer=None):
+        return apply_events(self, events, observer)
+
+    def _get_current_theme(self):
+        current = {'gtk': '', 'kvantum': '', 'icon': '', 'cursor': ''}
+        
+        # Get GTK and cursor theme
+        if os.path.exists(self.gtk3_settings_file):
+            config = configparser.ConfigParser()
+            config.read(self.gtk3_settings_file)
+            if 'Settings' in config and 'gtk-theme-name' in config['Settings']:
+                current['gtk'] = config['Settings']['gtk-theme-name']
+            if 'Settings' in config and 'gtk-cursor-theme-name' in config['Settings']:
+                current['cursor'] = config['Settings']['gtk-cursor-theme-name']
+        
+        # Get Kvantum theme
+        if os.path.exists(self.kvantum_config_file):
+            config = configparser.ConfigParser()
+            config.read(self.kvantum_config_file)
+            if 'General' in config and 'theme' in config['General']:
+                current['kvantum'] = config['General']['theme']
+        
+        # Get icon theme
+        if os.path.exists(self.kde_globals_file):
+            config = configparser.ConfigParser()
+            config.read(self.kde_globals_file)
+            if 'Icons' in config and 'Theme' in config['Icons']:
+                current['icon'] = config['Icons']['Theme']
+        
+        return current
+
+    def _theme_targets(self, gtk_theme, kvantum_theme, icon_theme, cursor_theme=None):
+        """Return the (path, updates, create) ini edits and desktop settings of a look"""
+        if cursor_theme not in self.cursor_themes:
+            cursor_theme = None
+        targets = []
+        
+        # GTK themes
+        if gtk_theme and gtk_theme in self.gtk_themes:
+            gtk_settings = self._gtk_settings(gtk_theme, icon_theme, cursor_theme)
+            targets.append((self.gtk3_settings_file, gtk_settings, True))
+            targets.append((self.gtk4_settings_file, gtk_settings, True))
+        
+        # Kvantum theme
+        if kvantum_theme and kvantum_theme in self.kvantum_themes:
+            targets.append((self.kvantum_config_file, self._kvantum_settings(kvantum_theme), True))
+            targets.append((self.qt_settings_file, self._qt_settings(), False))
+        
+        # Icon theme
+        if icon_theme and icon_theme in self.icon_themes:
+            targets.append((self.kde_globals_file, self._kde_settings(icon_theme, cursor_theme), True))
+        
+        settings = {'gtk-theme': gtk_theme, 'icon-theme': icon_theme, 'cursor-theme': cursor_theme}
+        return targets, settings
+
+    def apply_theme(self, gtk_theme, kvantum_theme, icon_theme, cursor_theme=None):
+        # Hitung target semua file konfigurasi, lalu tulis sekaligus
+        targets, settings = self._theme_targets(gtk_theme, kvantum_theme, icon_theme, cursor_theme)
+        txn = ConfigTransaction()
+        for path, updates, create in targets:
+            txn.update_ini(path, updates, create)
+        
+        try:
+            txn.commit()
+        except OSError as e:
+            return f"Error: {e}\nNo configuration files were changed."
+        
+        # Warn about icon themes whose Inherits= chain is broken
+        warning = ""
+        if icon_theme and icon_theme in self.icon_themes:
+            missing = self.icon_index.missing_parents(icon_theme)
+            self.icon_index.save()
+            if missing:
+                warning = f"\nWarning: {icon_theme} inherits missing theme(s): {', '.join(missing)}"
+        
+        # Update environment and reload Qt applications in one batch
+        failures = self.settings_backend.apply(settings, RELOAD_COMMANDS)
+        for what, error in failures:
+            what = what if isinstance(what, str) else ' '.join(what)
+            warning += f"\nWarning: {what} failed: {error}"
+        
+        return "Theme applied successfully!\nYou may need to restart applications to see changes." + warning
+
+    def save_profile(self, name):
+        """Store the look currently written to the config files as a profile"""
+        current = self._get_current_theme()
+        targets, settings = self._theme_targets(
+            current['gtk'], current['kvantum'], current['icon'], current['cursor'])
+        try:
+            self.profile_store.create(name, current, targets, settings, RELOAD_COMMANDS)
+        except OSError as e:
+            return f"Error: {e}\nThe profile was not saved."
+        return f"Profile '{name}' saved."
+
+    def switch_profile(self, name):
+        try:
+            written, elapsed = self.profile_store.switch(name, self.settings_backend)
+        except OSError as e:
+            return f"Error: {e}\nNo configuration files were changed."
+        themes = self.profile_store.get(name)['themes']
+        self.current_theme = dict(themes)
+        
+        result = f"Switched to profile '{name}' in {elapsed * 1000:.1f} ms ({len(written)} file(s) written)."
+        missing = [theme for kind, theme in themes.items()
+                   if theme and theme not in getattr(self, f"{kind}_themes")]
+        if missing:
+            result += f"\nWarning: not installed here: {', '.join(missing)}"
+        return result
+
+    def _gtk_settings(self, theme_name, icon_theme=None, cursor_theme=None):
+        return {'Settings': {
+            'gtk-theme-name': theme_name,
+            'gtk-icon-theme-name': icon_theme or None,
+            'gtk-cursor-theme-name': cursor_theme or None,
+        }}
+
+    def _kvantum_settings(self, theme_name):
+        return {'General': {'theme': theme_name}}
+
+    def _qt_settings(self):
+        return {'appearance': {'style': 'kvantum', 'color_scheme_path': ''}}
+
+    def _kde_settings(self, icon_theme=None, cursor_theme=None):
+        settings = {'Icons': {'Theme': icon_theme or None}}
+        if cursor_theme:
+            settings['Mouse'] = {'cursorTheme': cursor_theme}
+        return settings
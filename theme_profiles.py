@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import hashlib
+
+from config_txn import ConfigTransaction, render_ini
+
+CONFIG_DIR = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+                          "arc-config")
+PROFILES_FILE = os.path.join(CONFIG_DIR, "profiles.json")
+PROFILES_VERSION = 1
+
+
+def _digest(data):
+    if data is None:
+        return None
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _portable(path):
+    """Store paths below $HOME as ~/..., so profiles can be copied between machines"""
+    home = os.path.expanduser("~")
+    if path.startswith(home + os.sep):
+        return "~" + path[len(home):]
+    return path
+
+
+def _compile_file(base, updates, create):
+    if base is None and not create:
+        payload = None
+    else:
+        payload = render_ini(base, updates)
+    return {
+        'updates': updates,
+        'create': create,
+        'base': _digest(base),
+        'payload': payload.decode('utf-8') if payload is not None else None,
+        'digest': _digest(payload),
+    }
+
+
+class ProfileStore:
+    """Named looks, each precompiled into the config files it writes.
+
+    A profile keeps, per config file, the complete file contents produced by
+    its ini updates on top of the file as it was when it was compiled (its
+    base). Switching only reads those few files to check that they still
+    hold the base or the payload of some profile compiled from the same
+    base; if so the stored payloads are written as they are, without any
+    ini parsing. A file edited by something else is merged through
+    configparser once and every profile is recompiled against it.
+    """
+
+    def __init__(self, path=PROFILES_FILE):
+        self.path = path
+        self.profiles = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != PROFILES_VERSION:
+            return {}
+        return data.get('profiles', {})
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': PROFILES_VERSION, 'profiles': self.profiles}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def names(self):
+        return sorted(self.profiles, key=str.lower)
+
+    def get(self, name):
+        return self.profiles.get(name)
+
+    def delete(self, name):
+        if self.profiles.pop(name, None) is not None:
+            self.save()
+
+    def create(self, name, themes, targets, settings, reload_commands):
+        """Compile and store a profile.
+
+        themes is the {kind: name} look it was made from, targets the
+        (path, updates, create) ini edits that produce it, settings and
+        reload_commands what is handed to the settings backend on switch.
+        """
+        txn = ConfigTransaction()
+        files = {}
+        for path, updates, create in targets:
+            files[_portable(path)] = _compile_file(txn.read(path), updates, create)
+        self.profiles[name] = {
+            'themes': themes,
+            'settings': settings,
+            'reload': reload_commands,
+            'files': files,
+        }
+        self.save()
+        return self.profiles[name]
+
+    def _is_current(self, name, path, data):
+        """True if data is what the payload of name can safely replace"""
+        entry = self.profiles[name]['files'][path]
+        digest = _digest(data)
+        if digest == entry['base']:
+            return True
+        for profile in self.profiles.values():
+            other = profile['files'].get(path)
+            if other is not None and other['base'] == entry['base'] and other['digest'] == digest:
+                return True
+        return False
+
+    def _rebase(self, path, base):
+        for profile in self.profiles.values():
+            entry = profile['files'].get(path)
+            if entry is not None:
+                profile['files'][path] = _compile_file(base, entry['updates'], entry['create'])
+
+    def switch(self, name, settings_backend):
+        """Write the files of profile name and reload the desktop once.
+
+        Returns (written paths, seconds taken). Raises KeyError for an
+        unknown profile and OSError if the files could not be written, in
+        which case none of them were changed.
+        """
+        start = time.perf_counter()
+        profile = self.profiles[name]
+        txn = ConfigTransaction()
+        stale = {}
+        for path, entry in profile['files'].items():
+            real_path = os.path.expanduser(path)
+            current = txn.read(real_path)
+            if self._is_current(name, path, current):
+                if entry['payload'] is not None:
+                    txn.stage(real_path, entry['payload'].encode('utf-8'))
+            else:
+                txn.update_ini(real_path, entry['updates'], entry['create'])
+                stale[path] = current
+        written = txn.commit()
+        settings_backend.apply(profile['settings'], profile['reload'])
+        elapsed = time.perf_counter() - start
+
+        # Files changed behind our back: make the next switch fast again
+        if stale:
+            for path, current in stale.items():
+                self._rebase(path, current)
+            try:
+                self.save()
+            except OSError:
+                pass
+        return written, elapsed
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from theme_index import CACHE_DIR
+
+VERDICT_FILE = os.path.join(CACHE_DIR, "theme-verdicts.json")
+VERDICT_VERSION = 3
+# Directories classified per pool task; a warm start sends none
+CLASSIFY_CHUNK = 64
+
+GTK = 'gtk'
+ICONS = 'icons'
+CURSORS = 'cursors'
+
+# The one file whose content classify_theme() reads. Creating, removing or
+# replacing any entry it looks at changes the directory's mtime, but an
+# in-place edit of this file does not
+INDEX_FILE = 'index.theme'
+
+
+def read_index_theme(path):
+    """Return the [Icon Theme] group of an index.theme file as a dict"""
+    group = {}
+    in_group = False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    if in_group:
+                        break
+                    in_group = line == '[Icon Theme]'
+                elif in_group and '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    group[key.strip()] = value.strip()
+    except OSError:
+        return {}
+    return group
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def classify_theme(theme_dir):
+    """Return the kinds of theme found in theme_dir.
+
+    A GTK theme needs a gtk-3.0 or gtk-4.0 subtree, an icon theme needs an
+    index.theme declaring Directories, and a cursor theme needs cursors/.
+    """
+    kinds = []
+    try:
+        with os.scandir(theme_dir) as it:
+            entries = {e.name: e for e in it}
+    except OSError:
+        return kinds
+
+    if any(name in entries and entries[name].is_dir() for name in ('gtk-3.0', 'gtk-4.0')):
+        kinds.append(GTK)
+    if 'index.theme' in entries:
+        group = read_index_theme(os.path.join(theme_dir, 'index.theme'))
+        if split_list(group.get('Directories', '')):
+            kinds.append(ICONS)
+    if 'cursors' in entries and entries['cursors'].is_dir():
+        kinds.append(CURSORS)
+    return kinds
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _classify_chunk(theme_dirs):
+    # [(theme_dir, mtime, kinds)]; mtime is None for a missing directory
+    results = []
+    for theme_dir in theme_dirs:
+        dir_mtime = _mtime(theme_dir)
+        if dir_mtime is None:
+            results.append((theme_dir, None, []))
+            continue
+        mtime = [dir_mtime, _mtime(os.path.join(theme_dir, INDEX_FILE))]
+        results.append((theme_dir, mtime, classify_theme(theme_dir)))
+    return results
+
+
+class ThemeValidator:
+    """Classifies theme directories in parallel, caching verdicts by mtime.
+
+    A verdict is keyed by the mtimes of the directory and of its INDEX_FILE,
+    so an in-place edit of index.theme is noticed too. Cached verdicts are
+    checked inline, with one stat per directory (two if it has an
+    index.theme); only new and stale directories go to the thread pool.
+    """
+
+    def __init__(self, path=VERDICT_FILE, max_workers=8):
+        self.path = path
+        self.max_workers = max_workers
+        self.verdicts = self._load()
+        self.dirty = False
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != VERDICT_VERSION:
+            return {}
+        return data.get('verdicts', {})
+
+    def save(self):
+        """Write the verdict cache back if anything was reclassified"""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': VERDICT_VERSION, 'verdicts': self.verdicts}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _is_current(self, theme_dir, cached):
+        dir_mtime, index_mtime = cached['mtime']
+        if _mtime(theme_dir) != dir_mtime:
+            return False
+        # Without an index.theme, adding one changes the directory's mtime
+        return index_mtime is None or _mtime(os.path.join(theme_dir, INDEX_FILE)) == index_mtime
+
+    def classify(self, theme_dirs):
+        """Return {theme_dir: [kinds]} for every directory in theme_dirs"""
+        result = {}
+        stale = []
+        for theme_dir in theme_dirs:
+            cached = self.verdicts.get(theme_dir)
+            if cached is not None and self._is_current(theme_dir, cached):
+                result[theme_dir] = cached['kinds']
+            else:
+                stale.append(theme_dir)
+        if not stale:
+            return result
+
+        chunks = [stale[i:i + CLASSIFY_CHUNK] for i in range(0, len(stale), CLASSIFY_CHUNK)]
+        if len(chunks) == 1:
+            classified = [_classify_chunk(chunks[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                classified = list(pool.map(_classify_chunk, chunks))
+        for theme_dir, mtime, kinds in (item for chunk in classified for item in chunk):
+            result[theme_dir] = kinds
+            if mtime is None:
+                if self.verdicts.pop(theme_dir, None) is not None:
+                    self.dirty = True
+            else:
+                self.verdicts[theme_dir] = {'mtime': mtime, 'kinds': kinds}
+                self.dirty = True
+        return result
+
+
+def theme_dirs(*candidate_maps):
+    """Flatten {name: [theme_dirs]} maps into one list of directories"""
+    return [d for candidates in candidate_maps for dirs in candidates.values() for d in dirs]
+
+
+def themes_of_kind(candidates, verdicts, kind):
+    """Return the sorted names in candidates with at least one dir of kind"""
+    return sorted((name for name, dirs in candidates.items()
+                   if any(kind in verdicts.get(d, ()) for d in dirs)), key=str.lower)
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import bisect
+import ctypes
+import struct
+
+from theme_index import scan_dirs, scan_kvconfigs
+from theme_validate import GTK, ICONS, CURSORS
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_MASK_ADD = 0x20000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# A theme directory that appeared is still being filled (an icon pack
+# writes index.theme last), so its own entries are followed as well
+THEME_DIR_MASK = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ONLYDIR
+# The nearest existing ancestor of a missing root, until the root appears
+PARENT_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+
+ADD = 'add'
+REMOVE = 'remove'
+RESCAN = 'rescan'
+
+# Wait this long after the last event before applying a burst, but never
+# hold events back for longer than MAX_DELAY
+QUIET_DELAY = 0.3
+MAX_DELAY = 2.0
+
+
+def _existing_ancestor(path):
+    path = os.path.dirname(path)
+    while not os.path.isdir(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+class InotifyWatcher:
+    """Watches theme roots through inotify(7), called via ctypes.
+
+    Roots that hold one directory per theme (those without a scanner of
+    their own) also get a watch on every theme directory that appears
+    while watching, and its changes are reported as ADD of that theme so
+    it is classified again once it is complete. A root that does not
+    exist yet is waited for on its nearest existing ancestor and reported
+    as RESCAN when it is created.
+    """
+
+    def __init__(self, roots, scanners=None):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.scanners = scanners or {}
+        # One path can play several of these parts, so they share the wd
+        # through IN_MASK_ADD and every event is checked against each
+        self.roots = {}
+        self.theme_dirs = {}
+        self.parents = {}
+        for root in roots:
+            self._watch_root(root)
+
+    def _watch(self, path, mask):
+        return self._add_watch(self.fd, os.fsencode(path), mask | IN_MASK_ADD)
+
+    def _watch_root(self, root):
+        """Watch root, or its nearest ancestor while it is missing"""
+        wd = self._watch(root, WATCH_MASK)
+        if wd >= 0:
+            self.roots[wd] = root
+            return True
+        ancestor = _existing_ancestor(root)
+        wd = self._watch(ancestor, PARENT_MASK)
+        if wd >= 0:
+            self.parents.setdefault(wd, (ancestor, set()))[1].add(root)
+        return False
+
+    def _watch_theme_dir(self, root, name):
+        if root in self.scanners or name.startswith('.'):
+            return
+        wd = self._watch(os.path.join(root, name), THEME_DIR_MASK)
+        if wd >= 0:
+            self.theme_dirs[wd] = (root, name)
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        os.close(self.fd)
+
+    def read_events(self):
+        """Return the pending (root, name, action) events without blocking"""
+        data = b''
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.extend((root, None, RESCAN) for root in self.roots.values())
+                continue
+            if wd in self.parents and mask & (IN_CREATE | IN_MOVED_TO | IN_IGNORED):
+                self._parent_event(wd, None if mask & IN_IGNORED else name, events)
+            if wd in self.theme_dirs:
+                if mask & IN_IGNORED:
+                    del self.theme_dirs[wd]
+                elif mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE):
+                    events.append((*self.theme_dirs[wd], ADD))
+            root = self.roots.get(wd)
+            if root is None:
+                continue
+            if mask & IN_IGNORED:
+                # The root itself is gone; wait for it to come back
+                del self.roots[wd]
+                self._watch_root(root)
+                events.append((root, None, RESCAN))
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                events.append((root, None, RESCAN))
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_theme_dir(root, name)
+                events.append((root, name, ADD))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                # A rename inside a root arrives as MOVED_FROM + MOVED_TO
+                events.append((root, name, REMOVE))
+        return events
+
+    def _parent_event(self, wd, name, events):
+        # A directory on the way to a missing root appeared (or the ancestor
+        # went away, name None): retry those roots, which moves the wait one
+        # level down if only part of the path exists yet
+        ancestor, waiting = self.parents[wd]
+        if name is None:
+            retry = set(waiting)
+        else:
+            prefix = os.path.join(ancestor, name)
+            retry = {root for root in waiting
+                     if root == prefix or root.startswith(prefix + os.sep)}
+        waiting -= retry
+        if not waiting:
+            del self.parents[wd]
+        for root in retry:
+            if self._watch_root(root):
+                events.append((root, None, RESCAN))
+                try:
+                    names = self.scanners.get(root, scan_dirs)(root)
+                except OSError:
+                    names = []
+                for name in names:
+                    self._watch_theme_dir(root, name)
+
+
+class PollingWatcher:
+    """Fallback watcher: stats every root and diffs the ones that changed.
+
+    A missing root is polled like any other and listed once it appears.
+    Theme directories that appeared while polling are also followed
+    through their own and their index.theme's mtime, so a theme that was
+    still being unpacked when first seen is classified again.
+    """
+
+    def __init__(self, roots, scanners):
+        self.scanners = scanners
+        self.state = {root: self._snapshot(root) for root in roots}
+        self.theme_dirs = {}
+
+    def fileno(self):
+        return None
+
+    def close(self):
+        pass
+
+    def _snapshot(self, root):
+        try:
+            mtime = os.stat(root).st_mtime_ns
+            names = set(self.scanners.get(root, scan_dirs)(root))
+        except OSError:
+            return None, set()
+        return mtime, names
+
+    def _theme_dir_state(self, root, name):
+        path = os.path.join(root, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        try:
+            return mtime, os.stat(os.path.join(path, 'index.theme')).st_mtime_ns
+        except OSError:
+            return mtime, None
+
+    def read_events(self):
+        events = []
+        for root, (mtime, names) in self.state.items():
+            try:
+                current = os.stat(root).st_mtime_ns
+            except OSError:
+                current = None
+            if current == mtime:
+                continue
+            new_mtime, new_names = self._snapshot(root)
+            self.state[root] = (new_mtime, new_names)
+            added = new_names - names
+            events.extend((root, name, ADD) for name in added)
+            events.extend((root, name, REMOVE) for name in names - new_names)
+            if root not in self.scanners:
+                for name in added:
+                    self.theme_dirs[(root, name)] = self._theme_dir_state(root, name)
+        for (root, name), state in list(self.theme_dirs.items()):
+            current = self._theme_dir_state(root, name)
+            if current is None:
+                del self.theme_dirs[(root, name)]
+            elif current != state:
+                self.theme_dirs[(root, name)] = current
+                events.append((root, name, ADD))
+        return events
+
+
+class ThemeWatcher:
+    """Collects watcher events and releases them coalesced per burst.
+
+    Events are keyed by (root, name) and only the last action for a key is
+    kept, so a package install that drops hundreds of directories turns
+    into one batch with one entry per theme.
+    """
+
+    def __init__(self, roots, scanners=None):
+        scanners = scanners or {}
+        try:
+            self.backend = InotifyWatcher(roots, scanners)
+        except (OSError, AttributeError):
+            self.backend = PollingWatcher(roots, scanners)
+        self.pending = {}
+        self.first_event = None
+        self.last_event = None
+
+    @property
+    def uses_inotify(self):
+        return isinstance(self.backend, InotifyWatcher)
+
+    def fileno(self):
+        return self.backend.fileno()
+
+    def close(self):
+        self.backend.close()
+
+    def poll(self):
+        """Read new events into the pending batch"""
+        events = self.backend.read_events()
+        if not events:
+            return
+        now = time.monotonic()
+        if self.first_event is None:
+            self.first_event = now
+        self.last_event = now
+        for root, name, action in events:
+            self.pending[(root, name)] = action
+
+    def take(self):
+        """Return the coalesced batch once it has settled, else []"""
+        if not self.pending:
+            return []
+        now = time.monotonic()
+        if now - self.last_event < QUIET_DELAY and now - self.first_event < MAX_DELAY:
+            return []
+        events = [(root, name, action) for (root, name), action in self.pending.items()]
+        self.pending = {}
+        self.first_event = self.last_event = None
+        return events
+
+
+def _set_member(themes, name, member, kind, observer, changes):
+    """Insert or remove name in the sorted list themes, notifying observer"""
+    try:
+        index = themes.index(name)
+    except ValueError:
+        index = -1
+    if member and index < 0:
+        index = bisect.bisect_left(themes, name.lower(), key=str.lower)
+        action = ADD
+    elif not member and index >= 0:
+        action = REMOVE
+    else:
+        return
+    if observer is not None:
+        observer.themes_about_to_change(kind, action, index)
+    if action == ADD:
+        themes.insert(index, name)
+    else:
+        del themes[index]
+    if observer is not None:
+        observer.themes_changed(kind, action, index)
+    changes.append((kind, name, action))
+
+
+def _update_theme_dir(manager, root, name, roots, candidates, kinds, observer, changes):
+    path = os.path.join(root, name)
+    dirs = candidates.get(name, [])
+    exists = not name.startswith('.') and os.path.isdir(path)
+    if exists and path not in dirs:
+        # Keep the directories of a name in root priority order
+        dirs.append(path)
+        dirs.sort(key=lambda d: roots.index(os.path.dirname(d)))
+    elif not exists and path in dirs:
+        dirs.remove(path)
+    elif not exists:
+        return
+
+    if exists:
+        manager.theme_verdicts.update(manager.theme_validator.classify([path]))
+    else:
+        manager.theme_verdicts.pop(path, None)
+    if dirs:
+        candidates[name] = dirs
+    else:
+        candidates.pop(name, None)
+
+    for kind, verdict_kind, themes in kinds:
+        member = any(verdict_kind in manager.theme_verdicts.get(d, ()) for d in dirs)
+        _set_member(themes, name, member, kind, observer, changes)
+    if candidates is manager.icon_theme_dirs:
+        manager.icon_index.forget(name)
+
+
+def _expand_rescans(manager, events, scanners):
+    # A rescan compares one root's listing with what the manager knows
+    expanded = []
+    for root, name, action in events:
+        if action != RESCAN:
+            expanded.append((root, name, action))
+            continue
+        scan = scanners.get(root, scan_dirs)
+        try:
+            listed = set(scan(root))
+        except OSError:
+            listed = set()
+        if root == manager.kvantum_themes_dir:
+            # Kvantum events carry file names, the lists carry theme names
+            listed = {f"{n}.kvconfig" for n in listed}
+            known = {f"{n}.kvconfig" for n in manager.kvantum_themes}
+        else:
+            known = {os.path.basename(d)
+                     for found in (manager.gtk_theme_dirs, manager.icon_theme_dirs)
+                     for dirs in found.values() for d in dirs if os.path.dirname(d) == root}
+        expanded.extend((root, n, ADD) for n in listed - known)
+        expanded.extend((root, n, REMOVE) for n in known - listed)
+    return expanded
+
+
+def apply_events(manager, events, observer=None):
+    """Apply coalesced watcher events to a ThemeManager's theme lists.
+
+    Only the named directories are reclassified; nothing is rescanned
+    unless the kernel queue overflowed. observer, if given, is told about
+    every single list change before and after it happens, which is what a
+    Qt model needs to emit row insert/remove signals.
+    Returns a list of (kind, name, action).
+    """
+    scanners = {manager.kvantum_themes_dir: scan_kvconfigs}
+    changes = []
+    touched = set()
+    for root, name, action in _expand_rescans(manager, events, scanners):
+        touched.add(root)
+        if root == manager.kvantum_themes_dir:
+            if not name.endswith('.kvconfig') or name == "Default.kvconfig":
+                continue
+            member = os.path.isfile(os.path.join(root, name))
+            _set_member(manager.kvantum_themes, name[:-len('.kvconfig')], member,
+                        'kvantum', observer, changes)
+        elif root in manager.gtk_theme_roots:
+            _update_theme_dir(manager, root, name, manager.gtk_theme_roots,
+                              manager.gtk_theme_dirs,
+                              [('gtk', GTK, manager.gtk_themes)], observer, changes)
+        elif root in manager.icon_theme_roots:
+            _update_theme_dir(manager, root, name, manager.icon_theme_roots,
+                              manager.icon_theme_dirs,
+                              [('icon', ICONS, manager.icon_themes),
+                               ('cursor', CURSORS, manager.cursor_themes)], observer, changes)
+
+    # The lists are now current; let the next start relist these roots once
+    for root in touched:
+        manager.theme_index.invalidate(root, scanners.get(root, scan_dirs))
+    manager.theme_index.save()
+    manager.theme_validator.save()
+    return changes
+
+
+def watch_roots(manager):
+    """Create a ThemeWatcher over every root a ThemeManager reads"""
+    roots = manager.gtk_theme_roots + manager.icon_theme_roots + [manager.kvantum_themes_dir]
+    return ThemeWatcher(roots, {manager.kvantum_themes_dir: scan_kvconfigs})